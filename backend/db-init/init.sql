@@ -42,6 +42,18 @@ CREATE TABLE IF NOT EXISTS users (
     updated_at TIMESTAMPTZ DEFAULT CURRENT_TIMESTAMP
 );
 
+-- User Profiles Table (frontend/prisma/schema.prisma의 UserProfile과 같은 구조)
+-- 게시글 목록이 닉네임을 조인하므로, 아래 data_versions 트리거를 걸 수 있도록 여기서도 만들어 둡니다.
+CREATE TABLE IF NOT EXISTS user_profiles (
+    user_id INTEGER PRIMARY KEY REFERENCES users(id) ON DELETE CASCADE,
+    nickname VARCHAR(50) UNIQUE,
+    bio TEXT,
+    avatar_url VARCHAR(255),
+    website_url VARCHAR(255),
+    location VARCHAR(100),
+    updated_at TIMESTAMPTZ DEFAULT CURRENT_TIMESTAMP
+);
+
 -- Follows Table
 CREATE TABLE IF NOT EXISTS follows (
     follower_id INTEGER NOT NULL REFERENCES users(id) ON DELETE CASCADE,
@@ -76,6 +88,55 @@ CREATE TABLE IF NOT EXISTS stocks (
     last_updated TIMESTAMPTZ DEFAULT CURRENT_TIMESTAMP
 );
 
+-- 스크리너(/api/screener) 필터/정렬용
+CREATE EXTENSION IF NOT EXISTS pg_trgm;
+CREATE INDEX IF NOT EXISTS idx_stocks_market_cap ON stocks (market_cap DESC NULLS LAST);
+-- 스크리너는 시장 구분을 UPPER(market)으로 비교합니다.
+DROP INDEX IF EXISTS idx_stocks_market_market_cap;
+CREATE INDEX IF NOT EXISTS idx_stocks_upper_market_market_cap ON stocks (UPPER(market), market_cap DESC NULLS LAST);
+CREATE INDEX IF NOT EXISTS idx_stocks_name_trgm ON stocks USING gin (name gin_trgm_ops);
+
+-- 테마 (stock_worker가 키움 테마 그룹으로 동기화. stocks.theme 자유 텍스트 대신 사용)
+CREATE TABLE IF NOT EXISTS themes (
+    id SERIAL PRIMARY KEY,
+    name VARCHAR(100) UNIQUE NOT NULL,
+    source_code VARCHAR(20), -- 키움 테마 그룹 코드
+    stock_count INTEGER NOT NULL DEFAULT 0,
+    updated_at TIMESTAMPTZ DEFAULT CURRENT_TIMESTAMP
+);
+
+CREATE TABLE IF NOT EXISTS stock_themes (
+    theme_id INTEGER NOT NULL REFERENCES themes(id) ON DELETE CASCADE,
+    stock_code VARCHAR(20) NOT NULL REFERENCES stocks(code) ON DELETE CASCADE,
+    PRIMARY KEY (theme_id, stock_code)
+);
+CREATE INDEX IF NOT EXISTS idx_stock_themes_stock_code ON stock_themes (stock_code, theme_id);
+
+-- 기존 stocks.theme 값(쉼표 구분)을 옮겨 둡니다. 이후에는 stock_worker의 동기화가 관리합니다.
+INSERT INTO themes (name)
+SELECT DISTINCT btrim(t) FROM stocks, unnest(string_to_array(theme, ',')) AS t
+WHERE btrim(t) <> '' AND LENGTH(btrim(t)) < 50
+ON CONFLICT (name) DO NOTHING;
+INSERT INTO stock_themes (theme_id, stock_code)
+SELECT DISTINCT th.id, s.code
+FROM stocks s CROSS JOIN LATERAL unnest(string_to_array(s.theme, ',')) AS t(name)
+JOIN themes th ON th.name = btrim(t.name)
+ON CONFLICT DO NOTHING;
+UPDATE themes SET stock_count = (SELECT COUNT(*) FROM stock_themes WHERE theme_id = themes.id);
+
+-- 실시간 틱으로 만든 분봉 (stock_service의 CandleAggregator가 일괄 upsert)
+CREATE TABLE IF NOT EXISTS intraday_candles (
+    code VARCHAR(20) NOT NULL,
+    interval VARCHAR(3) NOT NULL, -- '1m', '5m', '15m'
+    start_at TIMESTAMPTZ NOT NULL,
+    open BIGINT NOT NULL,
+    high BIGINT NOT NULL,
+    low BIGINT NOT NULL,
+    close BIGINT NOT NULL,
+    volume BIGINT NOT NULL DEFAULT 0,
+    PRIMARY KEY (code, interval, start_at)
+);
+
 -- News Articles Table
 CREATE TABLE IF NOT EXISTS news_articles (
     id SERIAL PRIMARY KEY,
@@ -111,14 +172,161 @@ CREATE TABLE IF NOT EXISTS comments (
 );
 
 -- Add other tables like user_visits, etc. as needed...
+-- Raw visits are range-partitioned by month; admin_service creates upcoming partitions and drops expired ones.
 CREATE TABLE IF NOT EXISTS user_visits (
-    id SERIAL PRIMARY KEY,
+    id BIGSERIAL,
     ip_address VARCHAR(45) NOT NULL,
-    visit_time TIMESTAMPTZ DEFAULT CURRENT_TIMESTAMP,
+    visit_time TIMESTAMPTZ DEFAULT CURRENT_TIMESTAMP NOT NULL,
     user_agent TEXT,
-    path TEXT
+    path TEXT,
+    PRIMARY KEY (id, visit_time)
+) PARTITION BY RANGE (visit_time);
+CREATE TABLE IF NOT EXISTS user_visits_default PARTITION OF user_visits DEFAULT;
+-- Current and next month partitions, so fresh installs do not route visits into the default partition.
+DO $$
+DECLARE
+    first_month DATE := date_trunc('month', CURRENT_DATE)::date;
+BEGIN
+    FOR i IN 0..1 LOOP
+        EXECUTE format(
+            'CREATE TABLE IF NOT EXISTS %I PARTITION OF user_visits FOR VALUES FROM (%L) TO (%L)',
+            'user_visits_p' || to_char(first_month + make_interval(months => i), 'YYYYMM'),
+            (first_month + make_interval(months => i))::date,
+            (first_month + make_interval(months => i + 1))::date
+        );
+    END LOOP;
+END $$;
+
+-- Visit rollups (maintained incrementally by the admin_service visit flusher)
+-- The hourly rollup was never read by /api/traffic_stats.
+DROP TABLE IF EXISTS visit_rollup_hourly;
+
+CREATE TABLE IF NOT EXISTS visit_rollup_daily (
+    day DATE PRIMARY KEY,
+    visits BIGINT NOT NULL DEFAULT 0,
+    unique_visitors BIGINT NOT NULL DEFAULT 0, -- HyperLogLog estimate
+    ip_hll BYTEA -- HyperLogLog registers (p=12)
+);
+
+CREATE TABLE IF NOT EXISTS visit_rollup_path_daily (
+    day DATE NOT NULL,
+    path TEXT NOT NULL,
+    visits BIGINT NOT NULL DEFAULT 0,
+    PRIMARY KEY (day, path)
 );
 
+CREATE TABLE IF NOT EXISTS visit_rollup_agent_daily (
+    day DATE NOT NULL,
+    user_agent TEXT NOT NULL,
+    visits BIGINT NOT NULL DEFAULT 0,
+    PRIMARY KEY (day, user_agent)
+);
+
+-- One-time backfill of the daily rollups from raw user_visits that predate them (days are UTC, as in apply_rollups).
+-- Only visits before the earliest rolled-up day are copied, so nothing is counted twice and re-running this is a no-op.
+-- Backfilled days get an exact unique_visitors count and no ip_hll registers.
+DO $$
+DECLARE
+    cutoff TIMESTAMPTZ;
+BEGIN
+    SELECT COALESCE(MIN(day)::timestamp AT TIME ZONE 'UTC', 'infinity') INTO cutoff FROM visit_rollup_daily;
+    INSERT INTO visit_rollup_daily (day, visits, unique_visitors)
+        SELECT (visit_time AT TIME ZONE 'UTC')::date, COUNT(*), COUNT(DISTINCT ip_address)
+        FROM user_visits WHERE visit_time < cutoff
+        GROUP BY 1
+        ON CONFLICT (day) DO NOTHING;
+    INSERT INTO visit_rollup_path_daily (day, path, visits)
+        SELECT (visit_time AT TIME ZONE 'UTC')::date, path, COUNT(*)
+        FROM user_visits WHERE visit_time < cutoff AND path IS NOT NULL
+        GROUP BY 1, 2
+        ON CONFLICT (day, path) DO NOTHING;
+    INSERT INTO visit_rollup_agent_daily (day, user_agent, visits)
+        SELECT (visit_time AT TIME ZONE 'UTC')::date, user_agent, COUNT(*)
+        FROM user_visits WHERE visit_time < cutoff AND user_agent IS NOT NULL
+        GROUP BY 1, 2
+        ON CONFLICT (day, user_agent) DO NOTHING;
+END $$;
+
+-- Backtest sweep jobs and per-combination results (written by backtest_worker)
+CREATE TABLE IF NOT EXISTS backtest_jobs (
+    job_id UUID PRIMARY KEY,
+    strategy_id VARCHAR(50) NOT NULL,
+    status VARCHAR(20) NOT NULL DEFAULT 'queued',
+    total INTEGER NOT NULL DEFAULT 0,
+    completed INTEGER NOT NULL DEFAULT 0,
+    created_at TIMESTAMPTZ DEFAULT CURRENT_TIMESTAMP,
+    finished_at TIMESTAMPTZ
+);
+
+CREATE TABLE IF NOT EXISTS backtest_results (
+    id BIGSERIAL PRIMARY KEY,
+    job_id UUID NOT NULL REFERENCES backtest_jobs(job_id) ON DELETE CASCADE,
+    strategy_id VARCHAR(50) NOT NULL,
+    stock_code VARCHAR(20) NOT NULL,
+    engine VARCHAR(20) NOT NULL DEFAULT 'backtrader', -- 'backtrader' 또는 'vectorized'(사전 선별)
+    params JSONB NOT NULL,
+    final_value DOUBLE PRECISION,
+    total_return DOUBLE PRECISION,
+    sharpe DOUBLE PRECISION,
+    max_drawdown DOUBLE PRECISION,
+    created_at TIMESTAMPTZ DEFAULT CURRENT_TIMESTAMP
+);
+CREATE INDEX IF NOT EXISTS idx_backtest_results_job ON backtest_results (job_id);
+
+-- 백테스트 결과 캐시: cache_key = sha256(전략, 파라미터, 종목, 기간, OHLCV data_version)
+CREATE TABLE IF NOT EXISTS backtest_result_cache (
+    cache_key CHAR(64) PRIMARY KEY,
+    stock_code VARCHAR(20) NOT NULL,
+    data_version INTEGER NOT NULL,
+    result JSONB NOT NULL,
+    hit_count INTEGER NOT NULL DEFAULT 0,
+    created_at TIMESTAMPTZ DEFAULT CURRENT_TIMESTAMP,
+    last_hit_at TIMESTAMPTZ DEFAULT CURRENT_TIMESTAMP
+);
+CREATE INDEX IF NOT EXISTS idx_backtest_result_cache_symbol ON backtest_result_cache (stock_code, data_version);
+CREATE INDEX IF NOT EXISTS idx_backtest_result_cache_last_hit ON backtest_result_cache (last_hit_at);
+
+-- 종목별 OHLCV 일봉 데이터 버전 (stock_worker가 적재할 때마다 올리고, 백테스트 결과 캐시 키에 들어갑니다)
+CREATE TABLE IF NOT EXISTS ohlcv_data_versions (
+    stock_code VARCHAR(20) PRIMARY KEY,
+    version INTEGER NOT NULL DEFAULT 0,
+    updated_at TIMESTAMPTZ DEFAULT CURRENT_TIMESTAMP
+);
+
+-- 데이터별 버전 카운터 (API 응답의 ETag용)
+-- 테이블이 바뀔 때마다 트리거가 카운터를 올리고 pg_notify('data_version', '<이름>:<버전>')로 알립니다.
+-- 시작값을 생성 시각(ms)으로 두어서 DB를 새로 만들어도 이전에 발급한 ETag와 겹치지 않게 합니다.
+CREATE TABLE IF NOT EXISTS data_versions (
+    name VARCHAR(50) PRIMARY KEY,
+    version BIGINT NOT NULL DEFAULT (extract(epoch FROM clock_timestamp()) * 1000)::BIGINT
+);
+INSERT INTO data_versions (name) VALUES ('stocks'), ('news'), ('posts') ON CONFLICT (name) DO NOTHING;
+
+CREATE OR REPLACE FUNCTION bump_data_version() RETURNS trigger AS $$
+DECLARE
+    new_version BIGINT;
+BEGIN
+    UPDATE data_versions SET version = version + 1 WHERE name = TG_ARGV[0] RETURNING version INTO new_version;
+    PERFORM pg_notify('data_version', TG_ARGV[0] || ':' || new_version);
+    RETURN NULL;
+END;
+$$ LANGUAGE plpgsql;
+
+-- 문장 단위 트리거라 배치 upsert 한 번에 한 번만 올라갑니다.
+CREATE OR REPLACE TRIGGER trg_stocks_data_version
+    AFTER INSERT OR UPDATE OR DELETE OR TRUNCATE ON stocks
+    FOR EACH STATEMENT EXECUTE FUNCTION bump_data_version('stocks');
+CREATE OR REPLACE TRIGGER trg_news_articles_data_version
+    AFTER INSERT OR UPDATE OR DELETE OR TRUNCATE ON news_articles
+    FOR EACH STATEMENT EXECUTE FUNCTION bump_data_version('news');
+CREATE OR REPLACE TRIGGER trg_posts_data_version
+    AFTER INSERT OR UPDATE OR DELETE OR TRUNCATE ON posts
+    FOR EACH STATEMENT EXECUTE FUNCTION bump_data_version('posts');
+-- 게시글 목록 응답에 작성자 닉네임(user_profiles.nickname)이 들어가므로 닉네임이 바뀌어도 'posts' 버전을 올립니다.
+CREATE OR REPLACE TRIGGER trg_user_profiles_posts_data_version
+    AFTER INSERT OR UPDATE OF nickname OR DELETE OR TRUNCATE ON user_profiles
+    FOR EACH STATEMENT EXECUTE FUNCTION bump_data_version('posts');
+
 -- Test Data for users (if not already present)
 INSERT INTO users (username, email, hashed_password) VALUES
 ('testuser1', 'test1@example.com', 'hashed_password_1') ON CONFLICT (username) DO NOTHING;
@@ -6,7 +6,7 @@ from fastapi.middleware.cors import CORSMiddleware
 from fastapi.security import OAuth2PasswordRequestForm
 
 from KiwoomGateway.auth.models import UserBase, UserCreate, UserInDB, Token, GoogleLoginRequest
-from KiwoomGateway.auth.security import create_access_token, verify_password, get_password_hash
+from KiwoomGateway.auth.security import create_access_token, verify_password_async, get_password_hash_async
 from KiwoomGateway.auth.dependencies import get_user, get_current_user, get_db_conn
 from KiwoomGateway.board.api import router as board_router
 from KiwoomGateway.profile.api import router as profile_router
@@ -16,6 +16,9 @@ from KiwoomGateway.payment.api import router as payment_router
 from KiwoomGateway.likes.api import router as likes_router
 from KiwoomGateway.tags.api import router as tags_router
 from services.fastapi_server import router as fastapi_server_router # Import the router from fastapi_server.py
+from services.visit_logger import VisitBuffer
+from services.http_cache import CompressionMiddleware
+from services.visit_rollup import run_visit_maintenance
 import httpx # For Google OAuth
 from google.oauth2 import id_token
 from google.auth.transport import requests
@@ -23,6 +26,11 @@ from typing import Optional
 
 app = FastAPI()
 
+visit_buffer = VisitBuffer(
+    capacity=int(os.getenv("VISIT_BUFFER_CAPACITY", "10000")),
+    batch_size=int(os.getenv("VISIT_FLUSH_BATCH_SIZE", "500")),
+    flush_interval_ms=int(os.getenv("VISIT_FLUSH_INTERVAL_MS", "1000")),
+)
 
 app.add_middleware(
     CORSMiddleware,
@@ -35,6 +43,7 @@ app.add_middleware(
     allow_methods=["*"],
     allow_headers=["*"],
 )
+app.add_middleware(CompressionMiddleware)
 
 # COOP 및 COEP 헤더 추가를 위한 미들웨어
 # @app.middleware("http")
@@ -65,9 +74,19 @@ async def startup_event():
                 await asyncio.sleep(delay)
             else:
                 raise
+    visit_buffer.start(app.state.db_pool)
+    app.state.visit_maintenance_task = asyncio.create_task(
+        run_visit_maintenance(
+            app.state.db_pool,
+            retention_days=int(os.getenv("VISIT_RETENTION_DAYS", "90")),
+            rollup_retention_days=int(os.getenv("VISIT_ROLLUP_RETENTION_DAYS", "730")),
+        )
+    )
 
 @app.on_event("shutdown")
 async def shutdown_event():
+    app.state.visit_maintenance_task.cancel()
+    await visit_buffer.stop()
     await app.state.db_pool.close()
 
 
@@ -92,11 +111,8 @@ async def log_visit(request: Request):
         pass
     ip_address = request.client.host
     user_agent = request.headers.get('user-agent', 'unknown')
-    async with app.state.db_pool.acquire() as conn:
-        await conn.execute(
-            "INSERT INTO user_visits (ip_address, user_agent, path) VALUES ($1, $2, $3)",
-            ip_address, user_agent, path
-        )
+    # DB 쓰기는 VisitBuffer가 배치로 처리합니다. 버퍼가 가득 차면 이벤트는 버려지고 요청은 막히지 않습니다.
+    visit_buffer.add(ip_address, user_agent, path)
     return {"success": True}
 
 app.include_router(board_router, prefix="/api", tags=["Board"])
@@ -109,15 +125,22 @@ app.include_router(payment_router, prefix="/api", tags=["Payment"])
 app.include_router(fastapi_server_router, prefix="/api", tags=["User Settings"])
 app.include_router(auth_router, prefix="/api/auth", tags=["Auth"])
 
-@app.get("/api/traffic_stats")
-async def get_traffic_stats(secret_key: str = Header(None)):
+def verify_traffic_secret_key(secret_key: str = Header(None)):
     expected_key = os.getenv("TRAFFIC_SECRET_KEY")
     if not expected_key or secret_key != expected_key:
         raise HTTPException(status_code=403, detail="Forbidden: Invalid secret key")
+
+@app.get("/api/visit_buffer_stats", dependencies=[Depends(verify_traffic_secret_key)])
+async def get_visit_buffer_stats():
+    return {"success": True, "data": visit_buffer.snapshot()}
+
+@app.get("/api/traffic_stats", dependencies=[Depends(verify_traffic_secret_key)])
+async def get_traffic_stats():
+    # 원본 user_visits 대신 VisitBuffer가 유지하는 집계 테이블을 읽습니다. unique_visitors는 HyperLogLog 근사값입니다.
     async with app.state.db_pool.acquire() as conn:
-        daily_stats = await conn.fetch("SELECT CAST(visit_time AS DATE) as date, COUNT(DISTINCT ip_address) as unique_visitors FROM user_visits GROUP BY date ORDER BY date DESC LIMIT 30")
-        top_paths = await conn.fetch("SELECT path, COUNT(*) as visits FROM user_visits GROUP BY path ORDER BY visits DESC LIMIT 10")
-        top_user_agents = await conn.fetch("SELECT user_agent, COUNT(*) as visits FROM user_visits GROUP BY user_agent ORDER BY visits DESC LIMIT 10")
+        daily_stats = await conn.fetch("SELECT day as date, unique_visitors FROM visit_rollup_daily ORDER BY day DESC LIMIT 30")
+        top_paths = await conn.fetch("SELECT path, SUM(visits) as visits FROM visit_rollup_path_daily GROUP BY path ORDER BY visits DESC LIMIT 10")
+        top_user_agents = await conn.fetch("SELECT user_agent, SUM(visits) as visits FROM visit_rollup_agent_daily GROUP BY user_agent ORDER BY visits DESC LIMIT 10")
         return {
             "success": True,
             "data": {
@@ -0,0 +1,170 @@
+import os
+import json
+import hashlib
+
+# --- 백테스트 결과 캐시 ---
+# 키: sha256(전략 클래스, 파라미터, 종목, 기간, OHLCV data_version)
+# Redis(backtest:cache:{key})에 TTL로 두고, Postgres backtest_result_cache에 영구 보관합니다.
+# data_version은 Postgres ohlcv_data_versions에 종목별로 두어 재시작이나 볼륨 교체에도 처음부터 다시 세지 않습니다.
+# data_version이 키에 들어가므로 새 일봉이 적재되면 이전 결과는 더 이상 조회되지 않고,
+# stock_worker가 적재 직후 bump_data_version()과 invalidate_symbol()로 버전을 올리고 해당 종목의 Redis 항목을 지웁니다.
+# 이 모듈은 호출하는 쪽의 psycopg2 커넥션만 받아 쓰고 psycopg2를 직접 import하지 않습니다.
+
+CACHE_PREFIX = "backtest:cache:"
+REDIS_TTL_SECONDS = int(os.getenv("BACKTEST_CACHE_TTL_SECONDS", 7 * 86400))
+MAX_ROWS = int(os.getenv("BACKTEST_CACHE_MAX_ROWS", 200000))
+EVICT_INTERVAL_SECONDS = int(os.getenv("BACKTEST_CACHE_EVICT_INTERVAL_SECONDS", 3600))
+
+
+def _symbol_index_key(symbol):
+    return f"{CACHE_PREFIX}symbol:{symbol}"
+
+
+def cache_key(strategy, params, symbol, start_date, end_date, data_version):
+    payload = json.dumps({
+        "strategy": strategy,
+        "params": params,
+        "symbol": symbol,
+        "start": str(start_date),
+        "end": str(end_date),
+        "data_version": data_version,
+    }, sort_keys=True)
+    return hashlib.sha256(payload.encode()).hexdigest()
+
+
+def get_data_versions(db_conn, symbols):
+    """
+    {종목: data_version}. 아직 일봉이 적재된 적 없는 종목은 0입니다.
+    """
+    with db_conn.cursor() as cur:
+        cur.execute("SELECT stock_code, version FROM ohlcv_data_versions WHERE stock_code = ANY(%s)", (list(symbols),))
+        versions = dict(cur.fetchall())
+    db_conn.commit()
+    return {symbol: versions.get(symbol, 0) for symbol in symbols}
+
+
+def bump_data_version(db_conn, symbol):
+    with db_conn.cursor() as cur:
+        cur.execute("""
+            INSERT INTO ohlcv_data_versions (stock_code, version) VALUES (%s, 1)
+            ON CONFLICT (stock_code) DO UPDATE SET version = ohlcv_data_versions.version + 1, updated_at = NOW()
+            RETURNING version
+        """, (symbol,))
+        version = cur.fetchone()[0]
+    db_conn.commit()
+    return version
+
+
+def invalidate_symbol(redis_client, symbol):
+    """
+    종목의 Redis 캐시 항목을 모두 지웁니다. 일봉을 새로 적재한 쪽에서 호출합니다.
+    """
+    index_key = _symbol_index_key(symbol)
+    keys = redis_client.smembers(index_key)
+    pipe = redis_client.pipeline(transaction=False)
+    for key in keys:
+        pipe.delete(CACHE_PREFIX + key)
+    pipe.delete(index_key)
+    pipe.execute()
+    return len(keys)
+
+
+class BacktestResultCache:
+    def __init__(self, redis_client, db_conn):
+        self.redis = redis_client
+        self.db_conn = db_conn
+
+    def get_many(self, keys):
+        """
+        Redis → Postgres 순서로 조회해서 {key: result}를 반환합니다. Postgres에서 찾은 항목은 Redis에 다시 올립니다.
+        Redis에서 찾은 항목도 Postgres의 last_hit_at을 갱신해야 evict()가 자주 쓰이는 결과를 지우지 않습니다.
+        """
+        keys = list(dict.fromkeys(keys))
+        if not keys:
+            return {}
+        found = {}
+        for key, value in zip(keys, self.redis.mget([CACHE_PREFIX + k for k in keys])):
+            if value is not None:
+                found[key] = json.loads(value)
+
+        missing = [k for k in keys if k not in found]
+        rows = []
+        with self.db_conn.cursor() as cur:
+            if found:
+                cur.execute("""
+                    UPDATE backtest_result_cache SET hit_count = hit_count + 1, last_hit_at = NOW()
+                    WHERE cache_key = ANY(%s)
+                """, (list(found),))
+            if missing:
+                cur.execute("""
+                    UPDATE backtest_result_cache SET hit_count = hit_count + 1, last_hit_at = NOW()
+                    WHERE cache_key = ANY(%s)
+                    RETURNING cache_key, stock_code, result
+                """, (missing,))
+                rows = cur.fetchall()
+        self.db_conn.commit()
+        if rows:
+            self._store_redis([(key, stock_code, result) for key, stock_code, result in rows])
+            found.update({key: result for key, _, result in rows})
+        return found
+
+    def put_many(self, entries):
+        """
+        entries: [(key, stock_code, data_version, result), ...]
+        """
+        if not entries:
+            return
+        self._store_redis([(key, stock_code, result) for key, stock_code, _, result in entries])
+        with self.db_conn.cursor() as cur:
+            values = b",".join(
+                cur.mogrify("(%s, %s, %s, %s)", (key, stock_code, data_version, json.dumps(result)))
+                for key, stock_code, data_version, result in entries
+            )
+            cur.execute(
+                b"INSERT INTO backtest_result_cache (cache_key, stock_code, data_version, result) VALUES " + values +
+                b" ON CONFLICT (cache_key) DO UPDATE SET result = EXCLUDED.result, last_hit_at = NOW()"
+            )
+        self.db_conn.commit()
+
+    def _store_redis(self, entries):
+        pipe = self.redis.pipeline(transaction=False)
+        for key, stock_code, result in entries:
+            pipe.set(CACHE_PREFIX + key, json.dumps(result), ex=REDIS_TTL_SECONDS)
+            pipe.sadd(_symbol_index_key(stock_code), key)
+            pipe.expire(_symbol_index_key(stock_code), REDIS_TTL_SECONDS)
+        pipe.execute()
+
+    def purge_stale(self, symbol, data_version):
+        """
+        현재 data_version이 아닌 종목 결과를 Postgres에서 지웁니다. 키에 버전이 들어 있어 조회되지는 않지만 공간을 차지합니다.
+        """
+        with self.db_conn.cursor() as cur:
+            cur.execute("DELETE FROM backtest_result_cache WHERE stock_code = %s AND data_version <> %s", (symbol, data_version))
+            deleted = cur.rowcount
+        self.db_conn.commit()
+        return deleted
+
+    def evict_if_due(self, interval=EVICT_INTERVAL_SECONDS):
+        """
+        마지막 정리 후 interval초가 지났을 때만 evict()를 실행합니다. 여러 워커가 Redis 키 하나로 주기를 공유합니다.
+        """
+        if not self.redis.set(CACHE_PREFIX + "evicted", "1", nx=True, ex=interval):
+            return 0
+        return self.evict()
+
+    def evict(self, max_rows=MAX_ROWS):
+        """
+        최근에 조회되지 않은 항목부터 지워서 Postgres 캐시를 max_rows 이하로 유지합니다.
+        """
+        with self.db_conn.cursor() as cur:
+            cur.execute("""
+                DELETE FROM backtest_result_cache
+                WHERE cache_key IN (
+                    SELECT cache_key FROM backtest_result_cache
+                    ORDER BY last_hit_at DESC
+                    OFFSET %s
+                )
+            """, (max_rows,))
+            deleted = cur.rowcount
+        self.db_conn.commit()
+        return deleted
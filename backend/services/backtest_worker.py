@@ -1,15 +1,24 @@
 import os
 import time
 import json
+import uuid
+import itertools
+from collections import OrderedDict
 import pika
 import psycopg2
+import psycopg2.extras
+import redis
 import backtrader as bt
 import pandas as pd
+from concurrent.futures import ProcessPoolExecutor, wait, FIRST_COMPLETED
 from datetime import datetime
+from ohlcv_store import OHLCVStore
+from vectorized_backtest import run_sma_sweep
+from backtest_cache import BacktestResultCache, cache_key, get_data_versions
 
 # --- Backtrader Strategy Definition ---
 class SmaCross(bt.Strategy):
-    params = (('fast_ma', 10), ('slow_ma', 50))
+    params = (('fast_ma', 10), ('slow_ma', 50), ('printlog', True))
 
     def __init__(self):
         self.dataclose = self.datas[0].close
@@ -51,6 +60,8 @@ class SmaCross(bt.Strategy):
                 self.order = self.sell()
 
     def log(self, txt, dt=None):
+        if not self.params.printlog:
+            return
         dt = dt or self.datas[0].datetime.date(0)
         print(f'{dt.isoformat()} - {txt}')
 
@@ -70,14 +81,21 @@ def get_db_connection():
             print(f"PostgreSQL 연결 실패: {e}. 5초 후 재시도합니다.")
             time.sleep(5)
 
-def run_backtest(strategy_id, stock_code, start_date, end_date, params):
-    # NOTE: This part needs a data source. For now, we'll generate dummy data.
-    # In a real scenario, this would fetch historical data from Kiwoom/PostgreSQL.
+ohlcv_store = OHLCVStore()
+
+def load_price_data(stock_code, start_date, end_date):
+    # stock_worker가 적재한 일봉 저장소에서 읽습니다. 아직 수집되지 않은 종목은 기존처럼 합성 데이터를 사용합니다.
+    prices = ohlcv_store.load(stock_code, start_date, end_date)
+    if not prices.empty:
+        return prices
+    print(f"{stock_code}의 일봉 데이터가 저장소에 없어 합성 데이터로 백테스트합니다.")
     dates = pd.date_range(start=start_date, end=end_date)
     close_prices = pd.Series(10000 * (1 + (0.001 * pd.Series(range(len(dates)))).cumsum()))
-    dummy_data = pd.DataFrame({'open': close_prices, 'high': close_prices, 'low': close_prices, 'close': close_prices, 'volume': 1000}, index=dates)
+    close_prices.index = dates
+    return pd.DataFrame({'open': close_prices, 'high': close_prices, 'low': close_prices, 'close': close_prices, 'volume': 1000}, index=dates)
 
-    data = bt.feeds.PandasData(dataname=dummy_data)
+def run_backtest(strategy_id, stock_code, start_date, end_date, params):
+    data = bt.feeds.PandasData(dataname=load_price_data(stock_code, start_date, end_date))
 
     cerebro = bt.Cerebro()
     cerebro.addstrategy(SmaCross, fast_ma=params.get('fast_ma', 10), slow_ma=params.get('slow_ma', 50))
@@ -93,10 +111,262 @@ def run_backtest(strategy_id, stock_code, start_date, end_date, params):
     # Save results to DB
     # ... (implementation to save final_value, sharpe, drawdown etc.)
 
+# --- 파라미터 스윕 ---
+INITIAL_CASH = 10000000
+COMMISSION = 0.0015
+RESULT_TTL_SECONDS = 86400
+SWEEP_WORKERS = int(os.getenv("BACKTEST_WORKERS", os.cpu_count() or 2))
+PRESCREEN_CONFIRM_TOP = int(os.getenv("BACKTEST_CONFIRM_TOP", 10))
+CROSS_CHECK_TOLERANCE = 1e-6
+PRICE_CACHE_SIZE = int(os.getenv("BACKTEST_PRICE_CACHE_SIZE", 64))  # 워커 프로세스당 보관할 (종목, 기간) 가격 DataFrame 수
+
+# 워커 프로세스별 가격 캐시. OHLCVStore는 mmap으로 읽으므로 모든 프로세스가 같은 페이지 캐시를 공유합니다.
+# 워커 프로세스는 작업이 바뀌어도 계속 살아 있으므로, 가장 오래 안 쓴 항목부터 버리는 LRU로 크기를 묶어 둡니다.
+_price_cache = OrderedDict()
+
+def _cached_prices(stock_code, start_date, end_date, data_version):
+    # 새 일봉이 적재되면 data_version이 바뀌므로 오래된 가격을 계속 쓰지 않습니다. (이전 버전 항목은 LRU에서 밀려납니다)
+    key = (stock_code, start_date, end_date, data_version)
+    prices = _price_cache.get(key)
+    if prices is None:
+        prices = _price_cache[key] = load_price_data(stock_code, start_date, end_date)
+        while len(_price_cache) > PRICE_CACHE_SIZE:
+            _price_cache.popitem(last=False)
+    else:
+        _price_cache.move_to_end(key)
+    return prices
+
+def evaluate_params(stock_code, start_date, end_date, params, data_version):
+    """
+    프로세스 풀에서 실행되는 단일 (종목, 파라미터) 백테스트. 수익률, 샤프 비율, 최대 낙폭을 반환합니다.
+    """
+    cerebro = bt.Cerebro(stdstats=False)
+    cerebro.addstrategy(SmaCross, fast_ma=params['fast_ma'], slow_ma=params['slow_ma'], printlog=False)
+    cerebro.adddata(bt.feeds.PandasData(dataname=_cached_prices(stock_code, start_date, end_date, data_version)))
+    cerebro.broker.setcash(INITIAL_CASH)
+    cerebro.broker.setcommission(commission=COMMISSION)
+    cerebro.addanalyzer(bt.analyzers.SharpeRatio, _name='sharpe', timeframe=bt.TimeFrame.Days, annualize=True)
+    cerebro.addanalyzer(bt.analyzers.DrawDown, _name='drawdown')
+    strategy = cerebro.run()[0]
+
+    final_value = cerebro.broker.getvalue()
+    sharpe = strategy.analyzers.sharpe.get_analysis().get('sharperatio')
+    return {
+        "stock_code": stock_code,
+        "params": params,
+        "engine": "backtrader",
+        "final_value": final_value,
+        "total_return": final_value / INITIAL_CASH - 1,
+        "sharpe": sharpe,
+        "max_drawdown": strategy.analyzers.drawdown.get_analysis().max.drawdown / 100,
+    }
+
+def prescreen_symbol(stock_code, start_date, end_date, combos, data_version):
+    """
+    프로세스 풀에서 실행되는 벡터화 사전 선별. 한 종목의 모든 조합을 NumPy로 한 번에 평가합니다.
+    """
+    prices = _cached_prices(stock_code, start_date, end_date, data_version)
+    results = run_sma_sweep(prices['open'].to_numpy(), prices['close'].to_numpy(), combos, INITIAL_CASH, COMMISSION)
+    return [{"stock_code": stock_code, "engine": "vectorized", **r} for r in results]
+
+def cross_check(vectorized, confirmed):
+    """
+    같은 조합의 벡터화 결과와 backtrader 결과의 최종 평가금액을 비교합니다. 불일치하면 False를 반환합니다.
+    """
+    expected = confirmed['final_value']
+    if abs(vectorized['final_value'] - expected) <= CROSS_CHECK_TOLERANCE * max(abs(expected), 1):
+        return True
+    print(f"[경고] 벡터화 결과 불일치 {confirmed['stock_code']} {confirmed['params']}: "
+          f"vectorized={vectorized['final_value']:.2f}, backtrader={expected:.2f}")
+    return False
+
+def expand_param_grid(param_grid):
+    """
+    {"fast_ma": [5, 10], "slow_ma": [20, 50]} 형태의 그리드를 파라미터 조합 목록으로 펼칩니다.
+    SMA 교차 전략에서 의미가 없는 fast_ma >= slow_ma 조합은 제외합니다.
+    """
+    keys = list(param_grid)
+    combos = [dict(zip(keys, values)) for values in itertools.product(*(param_grid[k] for k in keys))]
+    return [c for c in combos if c.get('fast_ma', 0) < c.get('slow_ma', float('inf'))]
+
+def save_sweep_results(conn, job_id, strategy_id, results):
+    with conn.cursor() as cur:
+        psycopg2.extras.execute_values(cur, """
+            INSERT INTO backtest_results (job_id, strategy_id, stock_code, engine, params, final_value, total_return, sharpe, max_drawdown)
+            VALUES %s
+        """, [
+            (job_id, strategy_id, r['stock_code'], r.get('engine', 'backtrader'), json.dumps(r['params']), r['final_value'], r['total_return'], r['sharpe'], r['max_drawdown'])
+            for r in results
+        ])
+        cur.execute("UPDATE backtest_jobs SET status = 'done', completed = %s, finished_at = NOW() WHERE job_id = %s", (len(results), job_id))
+    conn.commit()
+
+def mark_job_failed(conn, job_id, strategy_id):
+    # GET /api/backtest/{job_id}는 Postgres 상태를 읽으므로 실패도 여기에 커밋해야 'running'으로 남지 않습니다.
+    with conn.cursor() as cur:
+        cur.execute("""
+            INSERT INTO backtest_jobs (job_id, strategy_id, status, finished_at) VALUES (%s, %s, 'failed', NOW())
+            ON CONFLICT (job_id) DO UPDATE SET status = 'failed', finished_at = NOW()
+        """, (job_id, strategy_id))
+    conn.commit()
+
+def _drain(pending, on_result, heartbeat=None):
+    # 끝난 작업부터 결과를 처리합니다. 1초마다 깨어나 하트비트를 처리합니다.
+    while pending:
+        done, pending = wait(pending, timeout=1, return_when=FIRST_COMPLETED)
+        for future in done:
+            try:
+                result = future.result()
+            except Exception as e:
+                print(f"백테스트 작업 실패: {e}")
+                continue
+            on_result(result)
+        if heartbeat:
+            heartbeat()
+
+def _evaluate_cached(tasks, start_date, end_date, executor, cache, versions, record, heartbeat=None):
+    """
+    (종목, 파라미터) 목록을 backtrader로 평가합니다. 같은 전략·파라미터·종목·기간·data_version의 결과가
+    캐시에 있으면 바로 기록하고, 나머지만 프로세스 풀에서 실행한 뒤 캐시에 저장합니다.
+    """
+    def key_of(symbol, params):
+        return cache_key(SmaCross.__name__, params, symbol, start_date, end_date, versions[symbol])
+
+    keys = [key_of(symbol, params) for symbol, params in tasks]
+    cached = cache.get_many(keys)
+    hits = [cached[key] for key in keys if key in cached]
+    record(hits)
+
+    fresh = []
+
+    def on_result(result):
+        fresh.append(result)
+        record([result])
+
+    pending = {
+        executor.submit(evaluate_params, symbol, start_date, end_date, params, versions[symbol])
+        for (symbol, params), key in zip(tasks, keys) if key not in cached
+    }
+    _drain(pending, on_result, heartbeat)
+    cache.put_many([
+        (key_of(r['stock_code'], r['params']), r['stock_code'], versions[r['stock_code']], r) for r in fresh
+    ])
+    if fresh:
+        cache.evict_if_due()
+    print(f"[*] 백테스트 캐시 적중 {len(hits)}/{len(tasks)}건")
+    return hits + fresh
+
+def run_sweep(job, executor, db_conn, redis_client, heartbeat=None):
+    """
+    종목 × 파라미터 조합을 프로세스 풀에 분배하고, 끝나는 대로 Redis(backtest:job:{id}:results)에 부분 결과를 쌓습니다.
+    모든 조합이 끝나면 최종 지표를 Postgres backtest_results에 저장합니다.
+
+    mode='prescreen'이면 모든 조합을 벡터화 엔진으로 먼저 평가하고, 수익률 상위 confirm_top개만 backtrader로
+    다시 실행해 결과를 확정하면서 두 엔진의 최종 평가금액을 교차 검증합니다.
+    backtrader 결과는 BacktestResultCache를 거치므로 같은 조건의 재요청은 다시 시뮬레이션하지 않습니다.
+    """
+    job_id = job.get('job_id') or str(uuid.uuid4())
+    strategy_id = job.get('strategy_id', 'sma_cross')
+    mode = job.get('mode', 'full')
+    symbols = job.get('symbols') or [job['stock_code']]
+    param_grid = job.get('param_grid') or {k: [v] for k, v in job.get('parameters', {}).items()}
+    combos = expand_param_grid(param_grid)
+    tasks = [(symbol, combo) for symbol in symbols for combo in combos]
+    confirm_top = min(int(job.get('confirm_top') or PRESCREEN_CONFIRM_TOP), len(tasks)) if mode == 'prescreen' else 0
+    total = len(tasks) + confirm_top
+
+    status_key = f"backtest:job:{job_id}"
+    results_key = f"{status_key}:results"
+    redis_client.hset(status_key, mapping={"status": "running", "mode": mode, "total": total, "completed": 0})
+    redis_client.expire(status_key, RESULT_TTL_SECONDS)
+    with db_conn.cursor() as cur:
+        cur.execute("""
+            INSERT INTO backtest_jobs (job_id, strategy_id, status, total) VALUES (%s, %s, 'running', %s)
+            ON CONFLICT (job_id) DO UPDATE SET status = 'running', total = EXCLUDED.total
+        """, (job_id, strategy_id, total))
+    db_conn.commit()
+
+    results = []
+
+    def record(batch):
+        if not batch:
+            return
+        results.extend(batch)
+        redis_client.rpush(results_key, *(json.dumps(r) for r in batch))
+        redis_client.hset(status_key, "completed", len(results))
+        redis_client.expire(results_key, RESULT_TTL_SECONDS)
+
+    start_date, end_date = job['start_date'], job['end_date']
+    cache = BacktestResultCache(redis_client, db_conn)
+    versions = get_data_versions(db_conn, symbols)
+    for symbol, version in versions.items():
+        cache.purge_stale(symbol, version)
+
+    if mode == 'prescreen':
+        pending = {executor.submit(prescreen_symbol, symbol, start_date, end_date, combos, versions[symbol]) for symbol in symbols}
+        _drain(pending, record, heartbeat)
+
+        top = sorted(results, key=lambda r: r['total_return'], reverse=True)[:confirm_top]
+        screened = {(r['stock_code'], json.dumps(r['params'], sort_keys=True)): r for r in top}
+        confirmed = _evaluate_cached(
+            [(r['stock_code'], r['params']) for r in top], start_date, end_date, executor, cache, versions, record, heartbeat
+        )
+        mismatches = sum(
+            not cross_check(screened[(r['stock_code'], json.dumps(r['params'], sort_keys=True))], r) for r in confirmed
+        )
+        redis_client.hset(status_key, "mismatches", mismatches)
+    else:
+        _evaluate_cached(tasks, start_date, end_date, executor, cache, versions, record, heartbeat)
+
+    save_sweep_results(db_conn, job_id, strategy_id, results)
+    redis_client.hset(status_key, "status", "done")
+    print(f"[*] 백테스트 작업 {job_id} 완료: {len(results)}/{total}개 결과")
+    return results
+
+def get_redis_client():
+    return redis.Redis(host=os.getenv("REDIS_HOST", "redis"), port=int(os.getenv("REDIS_PORT", 6379)), decode_responses=True)
+
+def get_rabbitmq_connection():
+    credentials = pika.PlainCredentials(os.getenv("RABBITMQ_USER"), os.getenv("RABBITMQ_PASSWORD"))
+    while True:
+        try:
+            connection = pika.BlockingConnection(pika.ConnectionParameters(host=os.getenv("RABBITMQ_HOST"), credentials=credentials))
+            return connection
+        except pika.exceptions.AMQPConnectionError as e:
+            print(f"RabbitMQ 연결 실패: {e}. 5초 후 재시도합니다.")
+            time.sleep(5)
+
 def main():
-    # ... (RabbitMQ connection setup)
-    # ... (Listen on a 'backtest_queue')
-    print("[*] Backtest worker is waiting for messages.")
+    db_conn = get_db_connection()
+    redis_client = get_redis_client()
+    connection = get_rabbitmq_connection()
+    channel = connection.channel()
+    channel.queue_declare(queue='backtest_queue', durable=True)
+    # 작업 하나가 프로세스 풀 전체를 사용하므로 한 번에 하나씩만 가져옵니다.
+    channel.basic_qos(prefetch_count=1)
+
+    with ProcessPoolExecutor(max_workers=SWEEP_WORKERS) as executor:
+        def on_message(ch, method, properties, body):
+            job = {}
+            try:
+                job = json.loads(body)
+                # 긴 스윕 중에도 RabbitMQ 하트비트가 끊기지 않도록 이벤트를 처리합니다.
+                run_sweep(job, executor, db_conn, redis_client, heartbeat=lambda: connection.process_data_events(time_limit=0))
+            except Exception as e:
+                print(f"백테스트 작업 처리 중 오류 발생: {e}")
+                db_conn.rollback()
+                if job.get('job_id'):
+                    redis_client.hset(f"backtest:job:{job['job_id']}", "status", "failed")
+                    try:
+                        mark_job_failed(db_conn, job['job_id'], job.get('strategy_id', 'sma_cross'))
+                    except Exception as db_error:
+                        print(f"백테스트 작업 {job['job_id']} 실패 상태 저장 중 오류 발생: {db_error}")
+                        db_conn.rollback()
+            ch.basic_ack(delivery_tag=method.delivery_tag)
+
+        channel.basic_consume(queue='backtest_queue', on_message_callback=on_message)
+        print("[*] Backtest worker is waiting for messages.")
+        channel.start_consuming()
 
 if __name__ == '__main__':
     main()
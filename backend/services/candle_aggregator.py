@@ -0,0 +1,133 @@
+import os
+from datetime import datetime, timezone
+
+import numpy as np
+
+# --- 분봉 집계기 ---
+# 실시간 체결 틱으로 종목별 1분/5분/15분 OHLCV 봉을 만듭니다.
+# 봉은 (종목, 주기)마다 고정 크기 numpy 링 버퍼에 두고, 마감된 봉만 모아서 Postgres intraday_candles에 일괄 upsert합니다.
+
+INTERVALS = {"1m": 60, "5m": 300, "15m": 900}
+RING_SIZE = int(os.getenv("CANDLE_RING_SIZE", 400))  # 1분봉 기준 정규장(390분)을 모두 담는 크기
+STALE_GRACE_SECONDS = 2  # 봉 마감 후 이 시간 동안 틱이 없으면 다음 틱을 기다리지 않고 마감으로 봅니다.
+
+START, OPEN, HIGH, LOW, CLOSE, VOLUME = range(6)
+
+
+class CandleRing:
+    def __init__(self, interval_seconds: int, capacity: int = RING_SIZE):
+        self.interval = interval_seconds
+        self.capacity = capacity
+        self.rows = np.zeros((capacity, 6), dtype=np.int64)  # start(epoch초), open, high, low, close, volume
+        self.head = -1    # 현재(가장 최근) 봉 위치
+        self.count = 0
+        self.dirty = False  # 현재 봉이 마지막 flush 이후 바뀌었는지
+
+    def update(self, ts: float, price: int, volume: int):
+        """
+        틱을 반영합니다. 새 주기로 넘어가면 직전 봉을 마감된 행으로 반환합니다.
+        """
+        bucket = int(ts) - int(ts) % self.interval
+        closed = None
+        if self.count and bucket < self.rows[self.head, START]:
+            return None  # 이미 지나간 봉에 늦게 도착한 틱은 버립니다.
+        if not self.count or bucket > self.rows[self.head, START]:
+            if self.count and self.dirty:
+                closed = self.rows[self.head].copy()
+            self.head = (self.head + 1) % self.capacity
+            self.count = min(self.count + 1, self.capacity)
+            self.rows[self.head] = (bucket, price, price, price, price, volume)
+        else:
+            row = self.rows[self.head]
+            if price > row[HIGH]:
+                row[HIGH] = price
+            if price < row[LOW]:
+                row[LOW] = price
+            row[CLOSE] = price
+            row[VOLUME] += volume
+        self.dirty = True
+        return closed
+
+    def take_stale(self, now: float):
+        # 주기가 끝났는데 아직 flush되지 않은 현재 봉을 반환합니다. 이후 틱이 더 오면 다시 dirty가 되어 upsert됩니다.
+        if self.count and self.dirty and self.rows[self.head, START] + self.interval + STALE_GRACE_SECONDS <= now:
+            self.dirty = False
+            return self.rows[self.head].copy()
+        return None
+
+    def recent(self, limit: int) -> np.ndarray:
+        n = min(limit, self.count)
+        if n <= 0:
+            return self.rows[:0]
+        index = (self.head - n + 1 + np.arange(n)) % self.capacity
+        return self.rows[index]
+
+
+class CandleAggregator:
+    def __init__(self, intervals: dict = INTERVALS, capacity: int = RING_SIZE):
+        self.intervals = intervals
+        self.capacity = capacity
+        self.rings: dict[tuple, CandleRing] = {}
+        self.pending: list[tuple] = []  # (code, interval, row) 마감되어 flush를 기다리는 봉
+
+    def add_tick(self, code: str, price: int, volume: int, ts: float):
+        if price <= 0:
+            return
+        volume = abs(volume)
+        for name, seconds in self.intervals.items():
+            ring = self.rings.get((code, name))
+            if ring is None:
+                ring = self.rings[(code, name)] = CandleRing(seconds, self.capacity)
+            closed = ring.update(ts, price, volume)
+            if closed is not None:
+                self.pending.append((code, name, closed))
+
+    def collect_stale(self, now: float):
+        for (code, name), ring in self.rings.items():
+            row = ring.take_stale(now)
+            if row is not None:
+                self.pending.append((code, name, row))
+
+    def recent(self, code: str, interval: str, limit: int) -> list[dict]:
+        ring = self.rings.get((code, interval))
+        if ring is None:
+            return []
+        return [
+            {"time": int(r[START]), "open": int(r[OPEN]), "high": int(r[HIGH]), "low": int(r[LOW]), "close": int(r[CLOSE]), "volume": int(r[VOLUME])}
+            for r in ring.recent(limit).tolist()
+        ]
+
+    async def flush(self, pool) -> int:
+        """
+        마감된 봉을 한 번의 INSERT ... SELECT unnest(...)로 upsert합니다. 실패하면 다음 주기에 다시 시도합니다.
+        """
+        if not self.pending:
+            return 0
+        batch, self.pending = self.pending, []
+        # 같은 봉이 두 번 들어 있으면 마지막 값만 남깁니다.
+        latest = {(code, name, int(row[START])): row for code, name, row in batch}
+        rows = list(latest.items())
+        try:
+            async with pool.acquire() as conn:
+                await conn.execute("""
+                    INSERT INTO intraday_candles (code, interval, start_at, open, high, low, close, volume)
+                    SELECT * FROM unnest($1::text[], $2::text[], $3::timestamptz[], $4::bigint[], $5::bigint[], $6::bigint[], $7::bigint[], $8::bigint[])
+                    ON CONFLICT (code, interval, start_at) DO UPDATE SET
+                        high = GREATEST(intraday_candles.high, EXCLUDED.high),
+                        low = LEAST(intraday_candles.low, EXCLUDED.low),
+                        close = EXCLUDED.close,
+                        volume = EXCLUDED.volume
+                """,
+                    [code for (code, _, _), _ in rows],
+                    [name for (_, name, _), _ in rows],
+                    [datetime.fromtimestamp(start, tz=timezone.utc) for (_, _, start), _ in rows],
+                    [int(row[OPEN]) for _, row in rows],
+                    [int(row[HIGH]) for _, row in rows],
+                    [int(row[LOW]) for _, row in rows],
+                    [int(row[CLOSE]) for _, row in rows],
+                    [int(row[VOLUME]) for _, row in rows],
+                )
+        except Exception:
+            self.pending = batch + self.pending
+            raise
+        return len(rows)
@@ -3,6 +3,7 @@ import asyncio
 import json
 import aio_pika
 import asyncpg
+import redis.asyncio as redis
 from asyncpg.pool import Pool
 import logging
 from dateutil.parser import parse as parse_datetime
@@ -22,34 +23,72 @@ async def get_db_pool() -> Pool:
         max_size=10
     )
 
+# --- 실시간 뉴스 스트림 (api_gateway의 /ws/realtime-news가 구독) ---
+NEWS_STREAM_KEY = "news_stream"
+NEWS_STREAM_MAXLEN = int(os.getenv("NEWS_STREAM_MAXLEN", "1000"))
+
+def get_redis_client() -> redis.Redis:
+    return redis.from_url(
+        f"redis://{os.getenv('REDIS_HOST', 'redis')}:{os.getenv('REDIS_PORT', '6379')}",
+        decode_responses=True
+    )
+
+async def publish_news_articles(redis_client: redis.Redis, rows: list):
+    # 스트림 ID가 곧 클라이언트의 재연결 커서가 됩니다. MAXLEN으로 길이를 제한합니다.
+    for row in rows:
+        article = {
+            "id": row['id'],
+            "title": row['title'],
+            "url": row['url'],
+            "source": row['source'],
+            "published_at": row['published_at'].isoformat() if row['published_at'] else None,
+            "sentiment_score": row['sentiment_score'],
+            "sentiment_label": row['sentiment_label'],
+        }
+        await redis_client.xadd(
+            NEWS_STREAM_KEY, {"article": json.dumps(article, ensure_ascii=False)},
+            maxlen=NEWS_STREAM_MAXLEN, approximate=True
+        )
+
 # --- 데이터 처리 함수들 (비동기 버전) ---
-async def upsert_news_articles(pool: Pool, articles: list):
+async def upsert_news_articles(pool: Pool, articles: list) -> list:
+    """
+    기사를 한 번의 INSERT ... SELECT unnest(...)로 upsert하고, 새로 삽입된 행만 반환합니다.
+    """
     if not articles:
-        return
+        return []
+    # 같은 배치 안에 같은 url이 두 번 있으면 ON CONFLICT DO UPDATE가 실패하므로 마지막 값만 남깁니다.
+    by_url = {a['url']: a for a in articles if a.get('url')}
+    if not by_url:
+        return []
+    columns = list(zip(*[
+        (
+            a.get('title'), a.get('url'), a.get('source'),
+            parse_datetime(a['published_at']) if a.get('published_at') else None, # Convert string to datetime
+            a.get('sentiment_score'), a.get('sentiment_label')
+        ) for a in by_url.values()
+    ]))
     async with pool.acquire() as conn:
-        values = [
-            (
-                a.get('title'), a.get('url'), a.get('source'),
-                parse_datetime(a['published_at']) if a.get('published_at') else None, # Convert string to datetime
-                a.get('sentiment_score'), a.get('sentiment_label')
-            ) for a in articles
-        ]
-        await conn.executemany("""
+        rows = await conn.fetch("""
             INSERT INTO news_articles (title, url, source, published_at, sentiment_score, sentiment_label)
-            VALUES ($1, $2, $3, $4, $5, $6)
+            SELECT * FROM unnest($1::text[], $2::varchar[], $3::text[], $4::timestamptz[], $5::float8[], $6::varchar[])
             ON CONFLICT (url) DO UPDATE SET
                 title = EXCLUDED.title,
                 source = EXCLUDED.source,
                 published_at = EXCLUDED.published_at,
                 sentiment_score = EXCLUDED.sentiment_score,
-                sentiment_label = EXCLUDED.sentiment_label;
-        """, values)
-        logging.info(f"Successfully upserted {len(articles)} news articles.")
+                sentiment_label = EXCLUDED.sentiment_label
+            RETURNING id, title, url, source, published_at, sentiment_score, sentiment_label, (xmax = 0) AS inserted;
+        """, *[list(c) for c in columns])
+        inserted = [row for row in rows if row['inserted']]
+        logging.info(f"Successfully upserted {len(rows)} news articles ({len(inserted)} new).")
+        return inserted
 
 # --- 메인 로직 ---
 async def main():
     logging.info("--- DB Saver Service Started (Async Version) ---")
     db_pool = await get_db_pool()
+    redis_client = get_redis_client()
     
     connection_url = f"amqp://{os.getenv('RABBITMQ_DEFAULT_USER', 'myuser')}:{os.getenv('RABBITMQ_DEFAULT_PASS', 'mypassword')}@{os.getenv('RABBITMQ_HOST', 'rabbitmq')}/"
     
@@ -71,7 +110,12 @@ async def main():
                         async with message.process():
                             try:
                                 data = json.loads(message.body)
-                                await upsert_news_articles(db_pool, data)
+                                inserted = await upsert_news_articles(db_pool, data)
+                                if inserted:
+                                    try:
+                                        await publish_news_articles(redis_client, inserted)
+                                    except redis.RedisError as e:
+                                        logging.error(f"Failed to publish news to Redis stream: {e}")
                             except Exception as e:
                                 logging.error(f"Failed to process message: {e}", exc_info=True)
             
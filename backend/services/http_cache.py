@@ -0,0 +1,140 @@
+import os
+import gzip
+
+from fastapi import Response
+
+try:
+    import brotli
+except ImportError:  # brotli가 설치되어 있지 않으면 gzip만 씁니다.
+    brotli = None
+
+# --- 응답 압축과 ETag 재검증 ---
+# CompressionMiddleware: 클라이언트가 지원하면 일정 크기 이상의 JSON/텍스트 응답을 brotli 또는 gzip으로 압축합니다.
+# 압축한 응답의 강한 ETag에는 인코딩 접미사(-br, -gzip)를 붙여 표현마다 ETag가 달라지게 합니다.
+# not_modified: 엔드포인트가 데이터 버전 카운터로 만든 ETag와 If-None-Match를 비교해서, 같으면 본문을 만들기 전에 304를 돌려줍니다.
+
+MINIMUM_SIZE = int(os.getenv("HTTP_COMPRESSION_MIN_BYTES", 1024))
+GZIP_LEVEL = 6
+BROTLI_QUALITY = 5  # 11은 JSON 응답마다 쓰기에는 너무 느립니다.
+COMPRESSIBLE_TYPES = (b"application/json", b"text/")
+ENCODING_SUFFIXES = {"br": "-br", "gzip": "-gzip"}
+
+
+def choose_encoding(accept_encoding: str):
+    accepted = {}
+    for part in accept_encoding.split(","):
+        name, _, params = part.strip().partition(";")
+        quality = 1.0
+        params = params.strip()
+        if params.startswith("q="):
+            try:
+                quality = float(params[2:])
+            except ValueError:
+                quality = 0.0
+        accepted[name.strip().lower()] = quality
+    if brotli is not None and accepted.get("br", 0) > 0:
+        return "br"
+    if accepted.get("gzip", 0) > 0:
+        return "gzip"
+    return None
+
+
+def compress(body: bytes, encoding: str) -> bytes:
+    if encoding == "br":
+        return brotli.compress(body, quality=BROTLI_QUALITY)
+    return gzip.compress(body, compresslevel=GZIP_LEVEL)
+
+
+def make_etag(*parts) -> str:
+    return '"' + "-".join(str(part) for part in parts) + '"'
+
+
+def _strip_encoding(tag: str) -> str:
+    for suffix in ENCODING_SUFFIXES.values():
+        if tag.endswith(suffix + '"'):
+            return tag[:-len(suffix) - 1] + '"'
+    return tag
+
+
+def not_modified(request, etag: str):
+    """
+    If-None-Match가 etag(압축 접미사는 무시)와 맞으면 304 응답을, 아니면 None을 돌려줍니다.
+    304에는 클라이언트가 보낸 태그를 그대로 실어서, 압축된 표현을 저장한 캐시도 그대로 갱신되게 합니다.
+    """
+    for tag in request.headers.get("if-none-match", "").split(","):
+        tag = tag.strip()
+        if tag.startswith("W/"):
+            tag = tag[2:]
+        if tag == "*" or (tag and _strip_encoding(tag) == etag):
+            return Response(status_code=304, headers={"ETag": etag if tag == "*" else tag, "Vary": "Accept-Encoding"})
+    return None
+
+
+class CompressionMiddleware:
+    """
+    ASGI 미들웨어. 스트리밍 응답(SSE 등)과 이미 인코딩된 응답은 건드리지 않고, 나머지는 본문을 모아서 한 번에 압축합니다.
+    """
+
+    def __init__(self, app, minimum_size: int = MINIMUM_SIZE):
+        self.app = app
+        self.minimum_size = minimum_size
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+        accept = b""
+        for name, value in scope["headers"]:
+            if name == b"accept-encoding":
+                accept = value
+        encoding = choose_encoding(accept.decode("latin-1"))
+        if encoding is None:
+            await self.app(scope, receive, send)
+            return
+
+        start = None
+        chunks = []
+        passthrough = False
+
+        async def send_wrapper(message):
+            nonlocal start, passthrough
+            if passthrough:
+                await send(message)
+                return
+            if message["type"] == "http.response.start":
+                headers = dict((name.lower(), value) for name, value in message.get("headers", []))
+                content_type = headers.get(b"content-type", b"")
+                if (
+                    message["status"] < 200 or message["status"] in (204, 304)
+                    or b"content-encoding" in headers
+                    or not content_type.startswith(COMPRESSIBLE_TYPES)
+                    or content_type.startswith(b"text/event-stream")
+                ):
+                    passthrough = True
+                    await send(message)
+                else:
+                    start = message
+                return
+            chunks.append(message.get("body", b""))
+            if message.get("more_body", False):
+                return
+            body = b"".join(chunks)
+            headers = [(name, value) for name, value in start.get("headers", []) if name.lower() != b"vary"]
+            vary = [value for name, value in start.get("headers", []) if name.lower() == b"vary"]
+            headers.append((b"vary", b", ".join(vary + [b"Accept-Encoding"])))
+            if len(body) >= self.minimum_size:
+                body = compress(body, encoding)
+                suffix = ENCODING_SUFFIXES[encoding].encode()
+                rewritten = []
+                for name, value in headers:
+                    lower = name.lower()
+                    if lower == b"content-length":
+                        continue
+                    if lower == b"etag" and value.endswith(b'"') and not value.startswith(b"W/"):
+                        value = value[:-1] + suffix + b'"'
+                    rewritten.append((name, value))
+                headers = rewritten + [(b"content-encoding", encoding.encode()), (b"content-length", str(len(body)).encode())]
+            await send({**start, "headers": headers})
+            await send({"type": "http.response.body", "body": body})
+
+        await self.app(scope, receive, send_wrapper)
@@ -4,6 +4,7 @@ import asyncio
 import json
 import os
 import site
+import socket
 from PyQt5.QtCore import QCoreApplication
 
 # --- Qt 플랫폼 플러그인 경로 설정 ---
@@ -17,9 +18,11 @@ from logging.handlers import RotatingFileHandler
 from datetime import datetime, timedelta
 from PyQt5.QtWidgets import QApplication
 from PyQt5.QAxContainer import QAxWidget
-from PyQt5.QtCore import QEventLoop, QTimer
+from PyQt5.QtCore import QEventLoop, QTimer, QObject, pyqtSignal, pyqtSlot
 
 import redis.asyncio as redis
+from redis.exceptions import ResponseError
+from tick_codec import encode_tick, realtime_channel, tick_to_legacy_dict
 
 # --- 로깅 설정 ---
 log_dir = "KiwoomGateway/logs"
@@ -38,6 +41,122 @@ real_data_queue: asyncio.Queue = asyncio.Queue()
 kiwoom_api_instance = None
 redis_pub_client = None
 
+BULK_QUOTE_MAX_CODES = 100  # CommKwRqData 한 번에 조회할 수 있는 최대 종목 수
+TR_TIMEOUT_SECONDS = float(os.getenv("KIWOOM_TR_TIMEOUT_SECONDS", 20))
+MAX_OUTSTANDING_TRS = int(os.getenv("KIWOOM_MAX_OUTSTANDING_TRS", 4))
+TR_MIN_INTERVAL_SECONDS = float(os.getenv("KIWOOM_TR_MIN_INTERVAL_SECONDS", 0.25))  # 초당 5건 제한 이내
+
+class TRRequestError(Exception):
+    pass
+
+class _QtInvoker(QObject):
+    # Qt 스레드에서 만든 객체에 다른 스레드가 emit하면 슬롯이 Qt 스레드에서 큐 방식으로 실행됩니다.
+    invoke = pyqtSignal(object)
+
+    def __init__(self):
+        super().__init__()
+        self.invoke.connect(self._run)
+
+    @pyqtSlot(object)
+    def _run(self, fn):
+        fn()
+
+# kiwoom_realtime_data 채널 포맷: "json"(기존 {"type": "realtime", "data": {...}}) 또는 "binary"(tick_codec 프레임)
+# stock_service는 두 포맷을 모두 읽으므로 구독자를 먼저 배포한 뒤 binary로 바꾸면 됩니다.
+# 채널은 REALTIME_CHANNEL_SHARDS에 따라 하나 또는 종목 샤드별입니다. (tick_codec.realtime_channel)
+REALTIME_WIRE_FORMAT = os.getenv("KIWOOM_REALTIME_WIRE_FORMAT", "json")
+
+# --- 실시간 구독 관리 ---
+REALTIME_FIDS = "10;11;12;15"
+REALTIME_SCREEN_BASE = 5000
+REALTIME_CODES_PER_SCREEN = 100  # SetRealReg 화면당 최대 종목 수
+REALTIME_MAX_SCREENS = int(os.getenv("KIWOOM_REALTIME_MAX_SCREENS", 20))
+REALTIME_REBALANCE_SLACK = 2  # 필요한 화면 수보다 이만큼 더 쓰고 있으면 재배치합니다.
+
+class RealtimeSubscriptionManager:
+    """
+    종목별 시청자 수(수요)를 받아 SetRealReg 등록을 화면 단위(최대 100종목)로 나눠 관리합니다.
+    모든 메서드는 Qt 스레드에서 호출해야 합니다(KiwoomAPI.call_in_qt).
+    """
+    def __init__(self, api):
+        self.api = api
+        self.screens: dict[str, set] = {}   # 화면번호 -> 등록된 종목
+        self.code_screen: dict[str, str] = {}
+
+    def _screen_numbers(self):
+        return [str(REALTIME_SCREEN_BASE + i) for i in range(REALTIME_MAX_SCREENS)]
+
+    def _register(self, screen_no, codes):
+        # 화면의 첫 등록은 "0"(교체), 이후는 "1"(추가)로 기존 종목을 유지합니다.
+        opt_type = "1" if self.screens.get(screen_no) else "0"
+        ret = self.api.ocx.dynamicCall("SetRealReg(QString, QString, QString, QString)", screen_no, ";".join(codes), REALTIME_FIDS, opt_type)
+        if ret != 0:
+            kiwoom_logger.error(f"🔥 실시간 등록 실패 (화면 {screen_no}, {len(codes)}개 종목): {ret}")
+            return False
+        self.screens.setdefault(screen_no, set()).update(codes)
+        for code in codes:
+            self.code_screen[code] = screen_no
+        return True
+
+    def _unregister(self, code):
+        screen_no = self.code_screen.pop(code)
+        self.screens[screen_no].discard(code)
+        if self.screens[screen_no]:
+            self.api.ocx.dynamicCall("SetRealRemove(QString, QString)", screen_no, code)
+        else:
+            self.api.ocx.dynamicCall("DisconnectRealData(QString)", screen_no)
+            del self.screens[screen_no]
+
+    def _add(self, codes):
+        codes = list(codes)
+        # 빈 자리가 적은 화면부터 채워서 사용하는 화면 수를 최소로 유지합니다.
+        partial = sorted((s for s in self.screens if len(self.screens[s]) < REALTIME_CODES_PER_SCREEN), key=lambda s: -len(self.screens[s]))
+        free = [s for s in self._screen_numbers() if s not in self.screens]
+        for screen_no in partial + free:
+            if not codes:
+                break
+            room = REALTIME_CODES_PER_SCREEN - len(self.screens.get(screen_no, ()))
+            batch, codes = codes[:room], codes[room:]
+            self._register(screen_no, batch)
+        if codes:
+            kiwoom_logger.warning(f"⚠️ 실시간 화면이 부족해 {len(codes)}개 종목을 구독하지 못했습니다.")
+
+    def _rebalance(self):
+        needed = -(-len(self.code_screen) // REALTIME_CODES_PER_SCREEN)
+        if len(self.screens) - needed < REALTIME_REBALANCE_SLACK:
+            return
+        # 종목이 가장 적은 화면들을 비우고 그 종목을 다른 화면에 다시 채웁니다.
+        moved = []
+        for screen_no in sorted(self.screens, key=lambda s: len(self.screens[s]))[:len(self.screens) - needed]:
+            moved.extend(self.screens[screen_no])
+            for code in self.screens[screen_no]:
+                del self.code_screen[code]
+            self.api.ocx.dynamicCall("DisconnectRealData(QString)", screen_no)
+            del self.screens[screen_no]
+        self._add(moved)
+        kiwoom_logger.info(f"ℹ️ 실시간 구독 재배치: {len(moved)}개 종목, 사용 화면 {len(self.screens)}개")
+
+    def reconcile(self, demand: dict):
+        """
+        demand(종목 -> 시청자 수)에 맞춰 등록을 추가/해제하고, 변경된 종목 수를 반환합니다.
+        수용 한도를 넘으면 시청자가 많은 종목을 우선합니다.
+        """
+        capacity = REALTIME_CODES_PER_SCREEN * REALTIME_MAX_SCREENS
+        wanted = {code for code, viewers in demand.items() if viewers > 0}
+        if len(wanted) > capacity:
+            wanted = set(sorted(wanted, key=lambda code: -demand[code])[:capacity])
+
+        removed = [code for code in self.code_screen if code not in wanted]
+        for code in removed:
+            self._unregister(code)
+        added = sorted(wanted - self.code_screen.keys())
+        self._add(added)
+        if removed:
+            self._rebalance()
+        if added or removed:
+            kiwoom_logger.info(f"✅ 실시간 구독 갱신: +{len(added)} -{len(removed)} (총 {len(self.code_screen)}개 종목, 화면 {len(self.screens)}개)")
+        return len(added) + len(removed)
+
 # --- 키움 API 클래스 ---
 class KiwoomAPI:
     def __init__(self, queue, loop, redis_client):
@@ -50,9 +169,15 @@ class KiwoomAPI:
         self.current_rqname = ""
         self.real_data_queue = queue
         self.main_loop = loop
-        self.pending_tr_requests = {}
+        self.pending_tr_requests = {}  # rqname -> {'future': asyncio.Future, 'parser': callable}
         self._screen_no_counter = 1000
         self.redis_pub_client = redis_client
+        self._invoker = None
+        self._tr_seq = 0
+        self._tr_slots = asyncio.Semaphore(MAX_OUTSTANDING_TRS)
+        self._tr_send_lock = asyncio.Lock()
+        self._last_tr_sent_at = 0.0
+        self.realtime_subscriptions = RealtimeSubscriptionManager(self)
 
     def qt_sleep(self, seconds):
         loop = QEventLoop()
@@ -65,6 +190,7 @@ class KiwoomAPI:
         self.ocx.OnEventConnect.connect(self.login_event)
         self.ocx.OnReceiveTrData.connect(self.receive_tr_data)
         self.ocx.OnReceiveRealData.connect(self._on_receive_real_data)
+        self._invoker = _QtInvoker()
         kiwoom_logger.info("✅ OCX 컨트롤 및 이벤트 루프가 성공적으로 초기화되었습니다.")
 
     def login(self):
@@ -77,62 +203,222 @@ class KiwoomAPI:
         self.login_event_loop.exit()
 
     def receive_tr_data(self, screen_no, rqname, trcode, record_name, next_key):
-        if rqname in self.pending_tr_requests:
-            request_info = self.pending_tr_requests[rqname]
-            def get(field, is_numeric=False):
-                val = self.ocx.dynamicCall("GetCommData(QString,QString,int,QString)", trcode, rqname, 0, field).strip()
-                if not is_numeric: return val
-                try: return str(abs(int(val)))
-                except (ValueError, TypeError): return "0"
-            currentPrice = get("현재가", True)
-            previousClose = get("전일종가", True)
-            if currentPrice == "0" and previousClose != "0": currentPrice = previousClose
-            tr_data = {"name": get("종목명"), "marketCap": get("시가총액"), "per": get("PER"), "volume": get("거래량", True), "currentPrice": currentPrice, "highPrice": get("고가", True), "lowPrice": get("저가", True), "openingPrice": get("시가", True), "change": get("전일대비", True), "changeRate": get("등락율"), "previousClose": previousClose}
-            request_info['data'] = tr_data
-            request_info['event'].set()
-        else: pass
+        # Qt 스레드에서 호출됩니다. GetCommData는 이 스레드에서만 읽을 수 있으므로 여기서 파싱까지 끝내고
+        # 결과만 메인 asyncio 루프의 Future로 넘깁니다.
+        request_info = self.pending_tr_requests.get(rqname)
+        if request_info is None:
+            return
+        try:
+            data = request_info['parser'](trcode, rqname, next_key)
+        except Exception as e:
+            self._resolve_tr(rqname, error=e)
+            return
+        self._resolve_tr(rqname, data=data)
+
+    def _parse_basic_info(self, trcode, rqname, index, previous_close_field):
+        # OPT10001은 단일 행(전일종가), OPTKWFID는 멀티 행(기준가)이라 전일 종가 필드 이름만 다릅니다.
+        def get(field, is_numeric=False):
+            val = self.ocx.dynamicCall("GetCommData(QString,QString,int,QString)", trcode, rqname, index, field).strip()
+            if not is_numeric: return val
+            try: return str(abs(int(val)))
+            except (ValueError, TypeError): return "0"
+        currentPrice = get("현재가", True)
+        previousClose = get(previous_close_field, True)
+        if currentPrice == "0" and previousClose != "0": currentPrice = previousClose
+        return {"stockCode": get("종목코드"), "name": get("종목명"), "marketCap": get("시가총액"), "per": get("PER"), "volume": get("거래량", True), "currentPrice": currentPrice, "highPrice": get("고가", True), "lowPrice": get("저가", True), "openingPrice": get("시가", True), "change": get("전일대비", True), "changeRate": get("등락율"), "previousClose": previousClose}
+
+    def _next_screen_no(self):
+        # TR 화면번호는 1000~4999에서 순환하고, 5000번대는 실시간 구독 화면(RealtimeSubscriptionManager)이 씁니다.
+        screen_no = str(self._screen_no_counter).zfill(4)
+        self._screen_no_counter = self._screen_no_counter + 1 if self._screen_no_counter < 4999 else 1000
+        return screen_no
+
+    def _parse_daily_bars(self, trcode, rqname, next_key):
+        fields = ("일자", "시가", "고가", "저가", "현재가", "거래량")
+        row_count = self.ocx.dynamicCall("GetRepeatCnt(QString, QString)", trcode, rqname)
+        rows = [
+            {field: self.ocx.dynamicCall("GetCommData(QString,QString,int,QString)", trcode, rqname, i, field).strip() for field in fields}
+            for i in range(row_count)
+        ]
+        return rows, next_key == "2"
+
+    def _parse_bulk_basic_info(self, trcode, rqname, next_key):
+        row_count = self.ocx.dynamicCall("GetRepeatCnt(QString, QString)", trcode, rqname)
+        return [self._parse_basic_info(trcode, rqname, i, "기준가") for i in range(row_count)]
 
     def _on_receive_real_data(self, stock_code, real_type, real_data):
         if real_type == "주식체결":
-            def get(fid): return self.ocx.dynamicCall("GetCommRealData(QString, int)", stock_code, fid).strip()
-            price, change = get(10), get(11)
-            info = {"stockCode": stock_code, "currentPrice": str(abs(int(price))) if price and price.replace('-', '').isdigit() else "0", "changeRate": get(12), "change": str(abs(int(change))) if change and change.replace('-', '').isdigit() else "0"}
-            asyncio.run_coroutine_threadsafe(self.real_data_queue.put(info), self.main_loop)
-
-    def get_stock_basic_info(self, stock_code):
-        rqname = f"주식기본정보요청_{stock_code}"
-        tr_event = threading.Event()
-        self.pending_tr_requests[rqname] = {'event': tr_event, 'data': None}
-        screen_no = str(self._screen_no_counter).zfill(4)
-        self._screen_no_counter = (self._screen_no_counter % 9999) + 1
-        self.ocx.dynamicCall("SetInputValue(QString, QString)", "종목코드", stock_code)
-        max_retries = 3
-        for attempt in range(max_retries):
-            ret = self.ocx.dynamicCall("CommRqData(QString, QString, int, QString)", rqname, "OPT10001", 0, screen_no)
-            if ret == 0: break
-            self.qt_sleep(1.0)
-        else:
-            del self.pending_tr_requests[rqname]
+            def get(fid, cast=int):
+                # 키움 실시간 값은 "+71000", "-1.23"처럼 부호가 붙어 옵니다.
+                try: return cast(self.ocx.dynamicCall("GetCommRealData(QString, int)", stock_code, fid).strip())
+                except (ValueError, TypeError): return cast(0)
+            # (종목코드, 현재가, 전일대비, 체결량, 등락률) - tick_codec의 필드 순서
+            tick = (stock_code, abs(get(10)), get(11), get(15), get(12, float))
+            asyncio.run_coroutine_threadsafe(self.real_data_queue.put(tick), self.main_loop)
+
+    # --- 비동기 TR 요청 ---
+    def _resolve_tr(self, rqname, data=None, error=None):
+        # Qt 스레드 → 메인 루프. 이미 타임아웃으로 취소된 Future는 건드리지 않습니다.
+        request_info = self.pending_tr_requests.get(rqname)
+        if request_info is None:
+            return
+        self._settle_threadsafe(request_info['future'], data, error)
+
+    def _settle_threadsafe(self, future, data=None, error=None):
+        def settle():
+            if future.done():
+                return
+            if error is not None:
+                future.set_exception(error)
+            else:
+                future.set_result(data)
+        self.main_loop.call_soon_threadsafe(settle)
+
+    async def call_in_qt(self, fn):
+        """
+        OCX 호출처럼 Qt 스레드에서만 실행할 수 있는 함수를 메인 루프에서 await로 실행합니다.
+        """
+        future = self.main_loop.create_future()
+        def run():
+            try:
+                self._settle_threadsafe(future, data=fn())
+            except Exception as e:
+                self._settle_threadsafe(future, error=e)
+        self._invoker.invoke.emit(run)
+        return await future
+
+    def _send_tr(self, rqname, send):
+        # _QtInvoker를 통해 Qt 스레드에서 실행됩니다. SetInputValue와 CommRqData가 다른 요청과 섞이지 않습니다.
+        if rqname not in self.pending_tr_requests:
+            return
+        ret = send(rqname, self._next_screen_no())
+        if ret != 0:
+            self._resolve_tr(rqname, error=TRRequestError(f"{rqname} 요청 실패: {ret}"))
+
+    async def _pace_tr(self):
+        async with self._tr_send_lock:
+            delay = self._last_tr_sent_at + TR_MIN_INTERVAL_SECONDS - time.monotonic()
+            if delay > 0:
+                await asyncio.sleep(delay)
+            self._last_tr_sent_at = time.monotonic()
+
+    async def request_tr(self, rqname_prefix, send, parser, timeout=TR_TIMEOUT_SECONDS, retries=3):
+        """
+        메인 asyncio 루프에서 호출합니다. send(rqname, screen_no)는 Qt 스레드에서 입력값 설정과 CommRqData(또는
+        CommKwRqData)를 호출해 반환값을 돌려주고, parser(trcode, rqname, next_key)는 OnReceiveTrData에서 결과를 읽습니다.
+        요청마다 고유한 rqname을 쓰므로 같은 종목을 동시에 요청해도 섞이지 않고, 동시에 진행 중인 TR은
+        MAX_OUTSTANDING_TRS개로 제한됩니다. 타임아웃이나 재시도 초과 시 None을 반환합니다.
+        """
+        async with self._tr_slots:
+            for attempt in range(retries):
+                await self._pace_tr()
+                self._tr_seq += 1
+                rqname = f"{rqname_prefix}#{self._tr_seq}"
+                future = self.main_loop.create_future()
+                self.pending_tr_requests[rqname] = {'future': future, 'parser': parser}
+                self._invoker.invoke.emit(lambda rqname=rqname: self._send_tr(rqname, send))
+                try:
+                    return await asyncio.wait_for(future, timeout)
+                except TRRequestError as e:
+                    kiwoom_logger.warning(f"⚠️ {e} (시도 {attempt + 1}/{retries})")
+                    await asyncio.sleep(1.0)
+                except asyncio.TimeoutError:
+                    kiwoom_logger.error(f"🔥 TR 응답 시간 초과: {rqname} ({timeout}초)")
+                    return None
+                finally:
+                    self.pending_tr_requests.pop(rqname, None)
             return None
-        wait_start_time = time.time()
-        while not tr_event.wait(timeout=0.1):
-            if QApplication.instance(): QApplication.instance().processEvents(QEventLoop.AllEvents)
-            if time.time() - wait_start_time > 20:
-                del self.pending_tr_requests[rqname]
-                return None
-        result = self.pending_tr_requests[rqname]['data']
-        del self.pending_tr_requests[rqname]
-        return result
-        
+
+    async def get_stock_basic_info(self, stock_code):
+        def send(rqname, screen_no):
+            self.ocx.dynamicCall("SetInputValue(QString, QString)", "종목코드", stock_code)
+            return self.ocx.dynamicCall("CommRqData(QString, QString, int, QString)", rqname, "OPT10001", 0, screen_no)
+        return await self.request_tr(
+            f"주식기본정보요청_{stock_code}", send,
+            lambda trcode, rqname, next_key: self._parse_basic_info(trcode, rqname, 0, "전일종가")
+        )
+
+    async def get_stock_basic_info_bulk(self, stock_codes):
+        """
+        CommKwRqData(OPTKWFID, 관심종목정보요청)로 한 번의 TR에 최대 100개 종목의 기본 시세를 가져옵니다.
+        100개를 넘으면 나눠서 동시에 요청하고, 결과는 get_stock_basic_info와 같은 형식의 목록으로 반환합니다.
+        """
+        async def fetch(chunk):
+            def send(rqname, screen_no):
+                return self.ocx.dynamicCall(
+                    "CommKwRqData(QString, bool, int, int, QString, QString)",
+                    ";".join(chunk), False, len(chunk), 0, rqname, screen_no
+                )
+            rows = await self.request_tr(f"관심종목정보요청_{chunk[0]}", send, self._parse_bulk_basic_info)
+            if rows is None:
+                kiwoom_logger.error(f"🔥 관심종목 조회 실패 ({len(chunk)}개 종목, {chunk[0]}...)")
+            return rows or []
+
+        chunks = [stock_codes[i:i + BULK_QUOTE_MAX_CODES] for i in range(0, len(stock_codes), BULK_QUOTE_MAX_CODES)]
+        results = await asyncio.gather(*(fetch(chunk) for chunk in chunks))
+        return [row for rows in results for row in rows]
+
+    async def get_all_stock_codes(self):
+        def read_codes():
+            kospi_codes_raw = self.ocx.dynamicCall("GetCodeListByMarket(QString)", "0")
+            kosdaq_codes_raw = self.ocx.dynamicCall("GetCodeListByMarket(QString)", "10")
+            return {
+                "kospi_codes": [code for code in (kospi_codes_raw or "").split(';') if code],
+                "kosdaq_codes": [code for code in (kosdaq_codes_raw or "").split(';') if code],
+            }
+        return await self.call_in_qt(read_codes)
+
+    async def get_theme_groups(self):
+        """
+        GetThemeGroupList/GetThemeGroupCode로 키움 테마 그룹과 소속 종목을 읽습니다. TR이 아니라 조회 제한이 없습니다.
+        반환: [{"code": 테마코드, "name": 테마명, "stocks": [종목코드, ...]}, ...]
+        """
+        def read_themes():
+            raw = self.ocx.dynamicCall("GetThemeGroupList(int)", 1) or ""  # 1: "테마코드|테마명;..."
+            groups = []
+            for entry in raw.split(';'):
+                if '|' not in entry:
+                    continue
+                theme_code, name = entry.split('|', 1)
+                codes_raw = self.ocx.dynamicCall("GetThemeGroupCode(QString)", theme_code) or ""
+                # 종목코드 앞에 시장 구분 문자('A')가 붙어 옵니다.
+                stocks = [code.strip()[-6:] for code in codes_raw.split(';') if code.strip()]
+                groups.append({"code": theme_code.strip(), "name": name.strip(), "stocks": stocks})
+            return groups
+        return await self.call_in_qt(read_themes)
+
+    async def get_daily_bars(self, stock_code, base_date=None, max_pages=10):
+        """
+        OPT10081(주식일봉차트조회)로 base_date(YYYYMMDD, 기본 오늘)부터 과거 방향으로 수정주가 일봉을 가져옵니다.
+        한 페이지는 약 600개 봉이며, 연속조회로 최대 max_pages 페이지까지 요청합니다.
+        """
+        base_date = base_date or datetime.now().strftime("%Y%m%d")
+        rows = []
+        prev_next = 0
+        for _ in range(max_pages):
+            def send(rqname, screen_no, prev_next=prev_next):
+                self.ocx.dynamicCall("SetInputValue(QString, QString)", "종목코드", stock_code)
+                self.ocx.dynamicCall("SetInputValue(QString, QString)", "기준일자", base_date)
+                self.ocx.dynamicCall("SetInputValue(QString, QString)", "수정주가구분", "1")
+                return self.ocx.dynamicCall("CommRqData(QString, QString, int, QString)", rqname, "OPT10081", prev_next, screen_no)
+            result = await self.request_tr(f"주식일봉차트조회_{stock_code}", send, self._parse_daily_bars)
+            if result is None:
+                break
+            page, has_next = result
+            rows.extend(page)
+            if not has_next:
+                break
+            prev_next = 2
+            # 연속조회도 TR 제한에 포함되므로 간격을 둡니다.
+            await asyncio.sleep(3.6)
+        return rows
+
     def subscribe_realtime_data(self, stock_codes: list):
-        codes_str = ";".join(stock_codes)
-        fids = "10;11;12;15"
-        ret = self.ocx.dynamicCall("SetRealReg(QString, QString, QString, QString)", "9001", codes_str, fids, "1")
-        if ret == 0: kiwoom_logger.info(f"✅ {len(stock_codes)}개 종목 실시간 시세 구독 성공")
-        else: kiwoom_logger.error(f"🔥 {len(stock_codes)}개 종목 실시간 시세 구독 실패")
-            
+        # Qt 스레드에서 호출합니다. 수요와 무관하게 고정 구독할 때만 사용합니다.
+        self.realtime_subscriptions.reconcile({code: 1 for code in stock_codes})
+
     def disconnect_all_realtime(self):
-        self.ocx.dynamicCall("DisconnectRealData(QString)", "9001")
+        self.realtime_subscriptions.reconcile({})
         kiwoom_logger.info("ℹ️ 모든 실시간 시세 구독 해제 완료.")
 
     def load_all_company_data(self):
@@ -167,15 +453,159 @@ def run_kiwoom_thread(instance: KiwoomAPI):
 
 async def real_data_publisher(queue: asyncio.Queue, redis_client: redis.Redis):
     while True:
-        data = await queue.get()
-        msg = json.dumps({"type": "realtime", "data": data})
+        tick = await queue.get()
+        if REALTIME_WIRE_FORMAT == "binary":
+            msg = encode_tick(*tick)
+        else:
+            msg = json.dumps({"type": "realtime", "data": tick_to_legacy_dict(*tick)})
         if redis_client:
             try:
-                await redis_client.publish("kiwoom_realtime_data", msg)
-                kiwoom_logger.info(f"✅ Redis에 실시간 데이터 발행: {msg[:50]}...")
+                await redis_client.publish(realtime_channel(tick[0]), msg)
+                kiwoom_logger.info(f"✅ Redis에 실시간 데이터 발행: {tick[0]} {tick[1]}")
             except Exception as e:
                 kiwoom_logger.error(f"🔥 Redis 발행 중 오류 발생: {e}")
 
+# --- TR 요청 브리지 (Redis Streams) ---
+# 워커들은 kiwoom_tr_requests 스트림에 요청을 XADD하고 reply_to 리스트를 BLPOP합니다.
+# 브리지는 컨슈머 그룹으로 읽기 때문에 꺼져 있는 동안 들어온 요청도 유실되지 않고, 처리 중에 죽으면
+# ACK되지 않은 요청을 XAUTOCLAIM으로 다시 가져옵니다. 응답은 request_id별로 잠시 보관해서
+# 같은 요청이 다시 배달되어도 키움 TR을 한 번만 보냅니다.
+TR_REQUEST_STREAM = "kiwoom_tr_requests"
+TR_CONSUMER_GROUP = "kiwoom_bridge"
+TR_BRIDGE_MAX_INFLIGHT = int(os.getenv("KIWOOM_TR_BRIDGE_MAX_INFLIGHT", 16))
+TR_CLAIM_IDLE_MS = int(os.getenv("KIWOOM_TR_CLAIM_IDLE_MS", 120000))
+TR_RESULT_TTL_SECONDS = 600
+TR_RESPONSE_TTL_SECONDS = 120
+
+async def dispatch_tr_request(api: KiwoomAPI, request_type, payload):
+    if request_type == 'get_stock_details':
+        return await api.get_stock_basic_info(payload['code'])
+    if request_type == 'get_stock_details_bulk':
+        return await api.get_stock_basic_info_bulk(payload['codes'])
+    if request_type == 'get_daily_bars':
+        return await api.get_daily_bars(payload['code'], payload.get('base_date'))
+    if request_type == 'get_all_stock_codes':
+        return await api.get_all_stock_codes()
+    if request_type == 'get_theme_groups':
+        return await api.get_theme_groups()
+    raise ValueError(f"알 수 없는 TR 요청 유형: {request_type}")
+
+async def handle_tr_message(api: KiwoomAPI, redis_client: redis.Redis, message_id, fields):
+    request_id = fields.get('request_id', message_id)
+    reply_to = fields.get('reply_to') or f"kiwoom_tr_response:{request_id}"
+    result_key = f"kiwoom_tr_result:{request_id}"
+
+    expires_at = int(fields.get('expires_at') or 0)
+    if expires_at and time.time() * 1000 > expires_at:
+        # 요청한 쪽이 이미 타임아웃된 요청은 TR 한도를 쓰지 않고 버립니다.
+        kiwoom_logger.warning(f"⚠️ 만료된 TR 요청 폐기: {request_id} ({fields.get('request_type')})")
+        await redis_client.xack(TR_REQUEST_STREAM, TR_CONSUMER_GROUP, message_id)
+        return
+
+    response = await redis_client.get(result_key)
+    if response == "":
+        # 같은 request_id를 다른 처리기가 진행 중입니다. ACK하지 않고 두면 나중에 다시 배달될 때 결과를 돌려줍니다.
+        return
+    if response is None:
+        if not await redis_client.set(result_key, "", nx=True, px=TR_CLAIM_IDLE_MS):
+            return
+        try:
+            data = await dispatch_tr_request(api, fields.get('request_type'), json.loads(fields.get('payload') or '{}'))
+            response = json.dumps({"request_id": request_id, "data": data}, ensure_ascii=False)
+        except Exception as e:
+            kiwoom_logger.error(f"🔥 TR 요청 처리 실패 {request_id}: {e}")
+            response = json.dumps({"request_id": request_id, "data": None, "error": str(e)}, ensure_ascii=False)
+        await redis_client.set(result_key, response, ex=TR_RESULT_TTL_SECONDS)
+
+    async with redis_client.pipeline(transaction=True) as pipe:
+        pipe.lpush(reply_to, response)
+        pipe.expire(reply_to, TR_RESPONSE_TTL_SECONDS)
+        pipe.xack(TR_REQUEST_STREAM, TR_CONSUMER_GROUP, message_id)
+        await pipe.execute()
+
+async def tr_request_bridge(api: KiwoomAPI, redis_client: redis.Redis):
+    try:
+        await redis_client.xgroup_create(TR_REQUEST_STREAM, TR_CONSUMER_GROUP, id="0", mkstream=True)
+    except ResponseError as e:
+        if "BUSYGROUP" not in str(e):
+            raise
+    consumer = f"bridge-{socket.gethostname()}-{os.getpid()}"
+
+    while not api.is_connected:
+        await asyncio.sleep(1)
+    kiwoom_logger.info(f"✅ TR 요청 브리지 시작 (consumer={consumer}, 최대 동시 처리 {TR_BRIDGE_MAX_INFLIGHT}건)")
+
+    inflight = set()
+    last_claim_at = 0.0
+
+    def spawn(message_id, fields):
+        task = asyncio.create_task(handle_tr_message(api, redis_client, message_id, fields))
+        inflight.add(task)
+        task.add_done_callback(inflight.discard)
+
+    while True:
+        try:
+            free = TR_BRIDGE_MAX_INFLIGHT - len(inflight)
+            if free <= 0:
+                # 처리 중인 요청이 가득 차면 새로 읽지 않으므로, 나머지는 스트림에 남아 다른 브리지나 다음 차례를 기다립니다.
+                await asyncio.wait(inflight, return_when=asyncio.FIRST_COMPLETED)
+                continue
+            if time.monotonic() - last_claim_at > TR_CLAIM_IDLE_MS / 1000 / 2:
+                last_claim_at = time.monotonic()
+                claimed = await redis_client.xautoclaim(
+                    TR_REQUEST_STREAM, TR_CONSUMER_GROUP, consumer, min_idle_time=TR_CLAIM_IDLE_MS, start_id="0-0", count=free
+                )
+                for message_id, fields in claimed[1]:
+                    if fields:
+                        spawn(message_id, fields)
+                    else:
+                        # MAXLEN으로 잘려 나간 요청은 내용이 없으므로 ACK만 합니다.
+                        await redis_client.xack(TR_REQUEST_STREAM, TR_CONSUMER_GROUP, message_id)
+                continue
+            entries = await redis_client.xreadgroup(TR_CONSUMER_GROUP, consumer, {TR_REQUEST_STREAM: ">"}, count=free, block=1000)
+            for _, messages in entries or []:
+                for message_id, fields in messages:
+                    spawn(message_id, fields)
+        except asyncio.CancelledError:
+            raise
+        except Exception as e:
+            kiwoom_logger.error(f"🔥 TR 요청 브리지 오류: {e}")
+            await asyncio.sleep(1)
+
+# --- 실시간 구독 수요 ---
+# stock_service 인스턴스마다 kiwoom:realtime_demand:{instance} 해시(종목 -> 시청자 수)를 TTL과 함께 갱신하고,
+# 바뀔 때 kiwoom_realtime_demand 채널로 알립니다. 알림이 없더라도 주기적으로 합산해서 죽은 인스턴스의 수요를 정리합니다.
+REALTIME_DEMAND_KEY_PREFIX = "kiwoom:realtime_demand:"
+REALTIME_DEMAND_CHANNEL = "kiwoom_realtime_demand"
+REALTIME_DEMAND_RECONCILE_SECONDS = 10
+
+async def load_realtime_demand(redis_client: redis.Redis):
+    demand = {}
+    async for key in redis_client.scan_iter(match=f"{REALTIME_DEMAND_KEY_PREFIX}*"):
+        for code, viewers in (await redis_client.hgetall(key)).items():
+            demand[code] = demand.get(code, 0) + int(viewers)
+    return demand
+
+async def realtime_demand_watcher(api: KiwoomAPI, redis_client: redis.Redis):
+    while True:
+        try:
+            pubsub = redis_client.pubsub()
+            await pubsub.subscribe(REALTIME_DEMAND_CHANNEL)
+            while True:
+                # 알림이 오거나 주기가 돌아오면 전체 수요를 다시 합산합니다. 몰려오는 알림은 한 번에 처리합니다.
+                await pubsub.get_message(ignore_subscribe_messages=True, timeout=REALTIME_DEMAND_RECONCILE_SECONDS)
+                while await pubsub.get_message(ignore_subscribe_messages=True, timeout=0.2):
+                    pass
+                if not api.is_connected:
+                    continue
+                demand = await load_realtime_demand(redis_client)
+                await api.call_in_qt(lambda: api.realtime_subscriptions.reconcile(demand))
+        except asyncio.CancelledError:
+            raise
+        except Exception as e:
+            kiwoom_logger.error(f"🔥 실시간 구독 수요 처리 오류: {e}")
+            await asyncio.sleep(5)
+
 # --- 메인 실행 ---
 if __name__ == '__main__':
     print("🚀 Kiwoom Realtime Server 시작...")
@@ -193,6 +623,8 @@ if __name__ == '__main__':
 
     # Start the Redis publisher coroutine
     main_loop.create_task(real_data_publisher(real_data_queue, redis_client))
+    main_loop.create_task(tr_request_bridge(kiwoom_api_instance, redis_client))
+    main_loop.create_task(realtime_demand_watcher(kiwoom_api_instance, redis_client))
 
     try:
         main_loop.run_forever()
@@ -0,0 +1,51 @@
+import os
+from datetime import datetime, timedelta, timezone, time as dt_time
+
+# --- 장 시간과 예열 효과 측정 구간 ---
+# stock_service(market_warmup)와 api_gateway가 같은 규칙으로 캐시 적중/미스를 세도록 한 곳에 둡니다.
+# api_gateway 이미지는 이 파일만 따로 복사해 가므로 다른 services 모듈을 import하지 않습니다.
+
+KST = timezone(timedelta(hours=9))
+MARKET_OPEN = dt_time(9, 0)
+MARKET_CLOSE = dt_time(15, 30)
+MEASURE_MINUTES = int(os.getenv("MARKET_WARMUP_MEASURE_MINUTES", 10))
+STATS_KEY = "market_warmup:{day}"
+
+
+def now_kst() -> datetime:
+    return datetime.now(KST)
+
+
+def is_trading_day(day) -> bool:
+    return day.weekday() < 5
+
+
+def is_market_open(now: datetime = None) -> bool:
+    now = now or now_kst()
+    return is_trading_day(now) and MARKET_OPEN <= now.time() <= MARKET_CLOSE
+
+
+def next_market_open(now: datetime = None) -> datetime:
+    """
+    now 이후(같은 날 장 시작 전이면 오늘)의 장 시작 시각.
+    """
+    now = now or now_kst()
+    candidate = now.replace(hour=MARKET_OPEN.hour, minute=MARKET_OPEN.minute, second=0, microsecond=0)
+    if candidate <= now:
+        candidate += timedelta(days=1)
+    while not is_trading_day(candidate):
+        candidate += timedelta(days=1)
+    return candidate
+
+
+def in_measure_window(now: datetime = None) -> bool:
+    now = now or now_kst()
+    opened = now.replace(hour=MARKET_OPEN.hour, minute=MARKET_OPEN.minute, second=0, microsecond=0)
+    return is_trading_day(now) and opened <= now < opened + timedelta(minutes=MEASURE_MINUTES)
+
+
+async def record_cache_access(redis_client, hit: bool):
+    # 장 시작 직후 측정 구간에만 셉니다.
+    now = now_kst()
+    if in_measure_window(now):
+        await redis_client.hincrby(STATS_KEY.format(day=now.strftime("%Y%m%d")), "hits" if hit else "misses", 1)
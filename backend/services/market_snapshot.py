@@ -0,0 +1,187 @@
+import time
+
+import numpy as np
+
+from screener import COLUMNS, encode_cursor
+
+# --- stocks 컬럼형 스냅샷 ---
+# 상장 종목 전체(수천 행)를 컬럼별 NumPy 배열로 메모리에 들고 있으면서, 스크리너와 /api/all-companies의
+# 필터/정렬/상위 N 조회를 DB 왕복 없이 벡터 연산으로 처리합니다.
+# 실시간 틱은 해당 행의 현재가/전일대비/등락률을 바로 덮어쓰고, 재무 지표나 신규 상장 종목은 주기적으로 DB에서 다시 읽습니다.
+# 숫자 컬럼은 float64이고 NULL은 NaN입니다. 행은 종목코드 순이라 행 번호가 곧 code 정렬 순서입니다.
+
+NUMERIC_COLUMNS = ("price", "change_value", "change_rate", "volume", "market_cap", "per", "pbr", "roe")
+INTEGER_COLUMNS = ("price", "change_value", "volume", "market_cap")
+
+SNAPSHOT_QUERY = f"SELECT code, name, COALESCE(market, '') AS market, {', '.join(NUMERIC_COLUMNS)} FROM stocks ORDER BY code"
+THEME_MEMBERS_QUERY = "SELECT t.name, st.stock_code FROM stock_themes st JOIN themes t ON t.id = st.theme_id"
+
+
+class MarketSnapshot:
+    def __init__(self):
+        self.loaded = False
+        # (epoch, version)이 같으면 내용도 같습니다. 프로세스가 다시 뜨면 version이 처음부터 다시 세어지므로 epoch으로 구분합니다.
+        self.epoch = f"{time.time_ns():x}"
+        self.version = 0
+        self.loaded_at = 0.0
+        self.size = 0
+        self.index: dict[str, int] = {}
+        self.codes = np.empty(0, dtype="U20")
+        self.names = np.empty(0, dtype="U100")
+        self.names_lower = np.empty(0, dtype="U100")
+        self.name_rank = np.empty(0, dtype=np.int64)
+        self.markets = np.empty(0, dtype="U50")
+        self.columns: dict[str, np.ndarray] = {name: np.empty(0) for name in NUMERIC_COLUMNS}
+        self.theme_rows: dict[str, np.ndarray] = {}
+
+    async def load(self, pool, latest_ticks=None) -> int:
+        """
+        stocks와 테마 매핑을 다시 읽어 배열을 통째로 바꿉니다.
+        latest_ticks는 DB 값보다 최신인 메모리 시세를 돌려주는 함수로, 읽는 동안 들어온 틱도 포함되도록 읽은 뒤에 부릅니다.
+        """
+        async with pool.acquire() as conn:
+            rows = await conn.fetch(SNAPSHOT_QUERY)
+            members = await conn.fetch(THEME_MEMBERS_QUERY)
+        codes = np.array([row["code"] for row in rows], dtype="U20")
+        names = np.array([row["name"] for row in rows], dtype="U100")
+        columns = {
+            name: np.array([np.nan if row[name] is None else row[name] for row in rows], dtype=np.float64)
+            for name in NUMERIC_COLUMNS
+        }
+        index = {code: i for i, code in enumerate(codes.tolist())}
+        theme_members: dict[str, list] = {}
+        for member in members:
+            row = index.get(member["stock_code"])
+            if row is not None:
+                theme_members.setdefault(member["name"], []).append(row)
+
+        # screener.build_query의 UPPER(market)과 같게 대문자로 비교하고 돌려줍니다.
+        markets = np.array([row["market"].upper() for row in rows], dtype="U50")
+        theme_rows = {name: np.array(sorted(rows_), dtype=np.int64) for name, rows_ in theme_members.items()}
+        for tick in latest_ticks() if latest_ticks else ():
+            row = index.get(tick[0])
+            if row is not None and tick[1] > 0:
+                columns["price"][row], columns["change_value"][row], columns["change_rate"][row] = tick[1], tick[2], tick[4]
+
+        # 버전은 응답 ETag에 쓰이므로 내용이 실제로 바뀐 경우에만 올립니다.
+        changed = not (
+            self.loaded
+            and np.array_equal(codes, self.codes) and np.array_equal(names, self.names) and np.array_equal(markets, self.markets)
+            and all(np.array_equal(columns[name], self.columns[name], equal_nan=True) for name in NUMERIC_COLUMNS)
+            and theme_rows.keys() == self.theme_rows.keys()
+            and all(np.array_equal(rows_, self.theme_rows[name]) for name, rows_ in theme_rows.items())
+        )
+        self.codes, self.names, self.index, self.columns = codes, names, index, columns
+        self.names_lower = np.char.lower(names)
+        self.name_rank = np.unique(names, return_inverse=True)[1].reshape(-1).astype(np.int64)
+        self.markets, self.theme_rows = markets, theme_rows
+        self.size = len(rows)
+        self.loaded, self.loaded_at = True, time.time()
+        if changed:
+            self.version += 1
+        return self.size
+
+    def apply(self, tick: tuple):
+        # tick = (종목코드, 현재가, 전일대비, 체결량, 등락률). 체결량은 건별 수량이라 누적 거래량 컬럼에는 넣지 않습니다.
+        row = self.index.get(tick[0])
+        if row is None or tick[1] <= 0:
+            return
+        price, change_value, change_rate = self.columns["price"], self.columns["change_value"], self.columns["change_rate"]
+        if price[row] == tick[1] and change_value[row] == tick[2] and change_rate[row] == tick[4]:
+            return
+        price[row], change_value[row], change_rate[row] = tick[1], tick[2], tick[4]
+        self.version += 1
+
+    def _column(self, name: str) -> np.ndarray:
+        column = COLUMNS[name]
+        if column == "code":
+            return self.codes
+        if column == "name":
+            return self.names
+        if column == "market":
+            return self.markets
+        return self.columns[column]
+
+    def mask(self, filters: dict) -> np.ndarray:
+        mask = np.ones(self.size, dtype=bool)
+        if filters["markets"]:
+            mask &= np.isin(self.markets, filters["markets"])
+        if filters["themes"]:
+            members = np.zeros(self.size, dtype=bool)
+            for theme in filters["themes"]:
+                rows = self.theme_rows.get(theme)
+                if rows is not None:
+                    members[rows] = True
+            mask &= members
+        if filters["q"]:
+            q = filters["q"]
+            mask &= np.char.startswith(self.codes, q) | (np.char.find(self.names_lower, q.lower()) >= 0)
+        for name, (low, high) in filters["ranges"].items():
+            column = self._column(name)
+            # NaN은 어떤 비교에서도 False라 SQL의 NULL처럼 범위 조건이 있으면 빠집니다.
+            if low is not None:
+                mask &= column >= low
+            if high is not None:
+                mask &= column <= high
+        return mask
+
+    def _sort_parts(self, name: str, descending: bool) -> list:
+        """
+        정렬 키 하나를 (NULL 여부, 값) 두 부분으로 나눕니다. 각 부분은 (정렬용 배열, 커서 비교용 배열, 내림차순 여부)입니다.
+        """
+        if name == "code":
+            return [(np.zeros(self.size, dtype=bool), np.zeros(self.size, dtype=bool), False),
+                    (np.arange(self.size), self.codes, descending)]
+        if name == "name":
+            return [(np.zeros(self.size, dtype=bool), np.zeros(self.size, dtype=bool), False),
+                    (self.name_rank, self.names, descending)]
+        column = self._column(name)
+        nulls = np.isnan(column)
+        values = np.where(nulls, 0.0, column)
+        return [(nulls, nulls, False), (values, values, descending)]
+
+    def screen(self, filters: dict, sort_keys: list, columns: list, cursor: list = None, limit: int = 100):
+        """
+        screener.build_query와 같은 의미의 조회를 배열 연산으로 합니다. (데이터, 다음 페이지 커서)를 돌려줍니다.
+        """
+        mask = self.mask(filters)
+        parts = [part for name, descending in sort_keys for part in self._sort_parts(name, descending)]
+        if cursor is not None:
+            after = np.zeros(self.size, dtype=bool)
+            equal = np.ones(self.size, dtype=bool)
+            bounds = []
+            for value, (name, _) in zip(cursor, sort_keys):
+                bounds += [value is None, value if value is not None else (0.0 if name not in ("code", "name") else "")]
+            for (_, compare, descending), bound in zip(parts, bounds):
+                after |= equal & ((compare < bound) if descending else (compare > bound))
+                equal &= compare == bound
+            mask &= after
+        rows = np.flatnonzero(mask)
+        # lexsort는 마지막 키가 1순위입니다. 내림차순은 부호를 바꿔 오름차순으로 정렬합니다.
+        keys = [(-key if descending else key)[rows] for key, _, descending in reversed(parts)]
+        rows = rows[np.lexsort(keys)] if len(rows) else rows
+        next_cursor = None
+        if len(rows) > limit:
+            rows = rows[:limit]
+            next_cursor = encode_cursor([self._value(name, rows[-1]) for name, _ in sort_keys])
+        return self.rows(rows, columns), next_cursor
+
+    def _value(self, name: str, row: int):
+        value = self._column(name)[row].item()
+        if isinstance(value, float):
+            if value != value:
+                return None
+            if COLUMNS[name] in INTEGER_COLUMNS:
+                return int(value)
+        return value
+
+    def rows(self, rows: np.ndarray, columns: list) -> list[dict]:
+        values = {}
+        for name in columns:
+            column = self._column(name)[rows]
+            if column.dtype.kind == "f":
+                integer = COLUMNS[name] in INTEGER_COLUMNS
+                values[name] = [None if v != v else (int(v) if integer else v) for v in column.tolist()]
+            else:
+                values[name] = column.tolist()
+        return [{name: values[name][i] for name in columns} for i in range(len(rows))]
@@ -0,0 +1,164 @@
+import os
+import json
+import time
+from datetime import timedelta
+
+from market_hours import STATS_KEY, now_kst, is_trading_day, is_market_open, record_cache_access
+from quote_book import QUOTE_HASH_KEY
+from theme_index import THEMES_CACHE_KEY
+from tick_codec import encode_tick
+
+# --- 장 시작 전 캐시 예열 ---
+# 장 시작 MARKET_WARMUP_LEAD_MINUTES분 전에 첫 요청들이 몰리는 데이터를 Redis에 미리 올리고,
+# 많이 보던 종목을 키움 실시간 등록 수요로 걸어 둡니다. 장 시작 후 MARKET_WARMUP_MEASURE_MINUTES분 동안은
+# 캐시 적중/미스를 market_warmup:{YYYYMMDD} 해시에 세어서 예열 효과를 확인할 수 있게 합니다.
+
+WARMUP_LEAD_MINUTES = int(os.getenv("MARKET_WARMUP_LEAD_MINUTES", 5))
+WARMUP_TOP_N = int(os.getenv("MARKET_WARMUP_TOP_N", 300))
+WARMUP_DEMAND_TTL_SECONDS = int(os.getenv("MARKET_WARMUP_DEMAND_TTL_SECONDS", 1800))
+
+ALL_COMPANIES_CACHE_KEY = "cache:all_companies:{limit}"
+LATEST_NEWS_CACHE_KEY = "cache:news:latest:{limit}"
+LATEST_NEWS_LIMIT = 50
+MARKET_HOURS_CACHE_TTL_SECONDS = 10
+OFF_HOURS_CACHE_TTL_SECONDS = 300
+WARMUP_CACHE_TTL_SECONDS = (WARMUP_LEAD_MINUTES + 5) * 60  # 장 시작 직후까지는 살아 있도록
+
+# stock_service가 시청자 수를 하루 단위로 누적하는 정렬 집합. 다음 날 예열할 때 많이 본 종목을 고르는 데 씁니다.
+WATCH_SCORE_KEY = "stock_service:watch_score:{day}"
+WATCH_SCORE_TTL_SECONDS = 7 * 86400
+WARMUP_DEMAND_KEY = "kiwoom:realtime_demand:warmup"  # realtime_demand_watcher가 다른 인스턴스 수요와 함께 합산합니다.
+STATS_TTL_SECONDS = 30 * 86400
+
+ALL_COMPANIES_QUERY = '''SELECT code, name, UPPER(market) AS market, price AS "currentPrice",
+       COALESCE(change_rate, 0) AS change_rate,
+       COALESCE(volume, 0) AS volume,
+       COALESCE(market_cap, 0) AS market_cap
+FROM stocks ORDER BY market_cap DESC NULLS LAST LIMIT $1'''
+THEMES_QUERY = "SELECT id, name, stock_count FROM themes WHERE stock_count > 0 ORDER BY name ASC"
+LATEST_NEWS_QUERY = '''SELECT title, url, source, published_at, sentiment_score, sentiment_label
+FROM news_articles ORDER BY published_at DESC NULLS LAST LIMIT $1'''
+
+
+def _json_default(value):
+    return value.isoformat() if hasattr(value, "isoformat") else str(value)
+
+
+async def cached_query(redis_client, pool, key: str, query: str, *args, ttl: int = None):
+    """
+    Redis에 캐시된 JSON이 있으면 그대로, 없으면 DB에서 읽어 캐시합니다. 적중 여부는 예열 통계에 기록됩니다.
+    """
+    cached = await redis_client.get(key)
+    await record_cache_access(redis_client, cached is not None)
+    if cached is not None:
+        return json.loads(cached)
+    async with pool.acquire() as conn:
+        rows = [dict(row) for row in await conn.fetch(query, *args)]
+    if ttl is None:
+        ttl = MARKET_HOURS_CACHE_TTL_SECONDS if is_market_open() else OFF_HOURS_CACHE_TTL_SECONDS
+    await redis_client.set(key, json.dumps(rows, default=_json_default), ex=ttl)
+    return rows
+
+
+async def most_watched_codes(redis_client, pool, limit: int = WARMUP_TOP_N) -> list[str]:
+    """
+    직전 거래일에 시청자가 많았던 종목, 모자라면 시가총액 상위 종목으로 채웁니다.
+    """
+    day = now_kst().date() - timedelta(days=1)
+    while not is_trading_day(day):
+        day -= timedelta(days=1)
+    codes = list(await redis_client.zrevrange(WATCH_SCORE_KEY.format(day=day.strftime("%Y%m%d")), 0, limit - 1))
+    if len(codes) < limit:
+        async with pool.acquire() as conn:
+            rows = await conn.fetch("SELECT code FROM stocks ORDER BY market_cap DESC NULLS LAST LIMIT $1", limit)
+        seen = set(codes)
+        codes += [row["code"] for row in rows if row["code"] not in seen]
+    return codes[:limit]
+
+
+async def warm_up(redis_client, redis_raw, pool, quotes, demand_channel: str) -> dict:
+    """
+    상위 종목 시세, 테마 목록, 최신 뉴스를 Redis에 올리고 많이 보던 종목을 실시간 등록합니다.
+    전 종목 목록(/api/all-companies)은 stock_service의 메모리 스냅샷이 답하므로 예열하지 않습니다.
+    """
+    started = time.perf_counter()
+    steps = {}
+
+    async def step(name, coro):
+        step_started = time.perf_counter()
+        try:
+            result = await coro
+        except Exception as e:
+            print(f"Market warm-up step '{name}' failed: {e}")
+            result = None
+        steps[name] = round((time.perf_counter() - step_started) * 1000, 1)
+        return result
+
+    async with pool.acquire() as conn:
+        await step("themes", _warm_query(conn, redis_client, THEMES_CACHE_KEY, THEMES_QUERY))
+        await step("news", _warm_query(conn, redis_client, LATEST_NEWS_CACHE_KEY.format(limit=LATEST_NEWS_LIMIT), LATEST_NEWS_QUERY, LATEST_NEWS_LIMIT))
+
+    codes = await step("most_watched", most_watched_codes(redis_client, pool)) or []
+    await step("quotes", _warm_quotes(redis_raw, pool, quotes, codes))
+    await step("realtime_demand", _register_demand(redis_client, codes, demand_channel))
+
+    duration_ms = round((time.perf_counter() - started) * 1000, 1)
+    day = now_kst().strftime("%Y%m%d")
+    stats_key = STATS_KEY.format(day=day)
+    async with redis_client.pipeline(transaction=True) as pipe:
+        pipe.hset(stats_key, mapping={
+            "warmed_at": now_kst().isoformat(),
+            "duration_ms": duration_ms,
+            "steps": json.dumps(steps),
+            "codes": len(codes),
+        })
+        pipe.expire(stats_key, STATS_TTL_SECONDS)
+        await pipe.execute()
+    return {"duration_ms": duration_ms, "steps": steps, "codes": len(codes)}
+
+
+async def _warm_query(conn, redis_client, key, query, *args):
+    rows = [dict(row) for row in await conn.fetch(query, *args)]
+    await redis_client.set(key, json.dumps(rows, default=_json_default), ex=WARMUP_CACHE_TTL_SECONDS)
+    return len(rows)
+
+
+async def _warm_quotes(redis_raw, pool, quotes, codes):
+    # 전날 실시간 시세가 Redis에 없는 종목은 DB 가격으로 채워서, 장 시작 직후 연결해도 스냅샷이 비지 않게 합니다.
+    if not codes:
+        return 0
+    await quotes.refresh(redis_raw, codes)
+    missing = [code for code in codes if code not in quotes.quotes]
+    if not missing:
+        return 0
+    async with pool.acquire() as conn:
+        rows = await conn.fetch(
+            "SELECT code, price, change_value, change_rate FROM stocks WHERE code = ANY($1::text[]) AND price IS NOT NULL", missing
+        )
+    frames = {}
+    for row in rows:
+        tick = (row["code"], int(row["price"]), int(row["change_value"] or 0), 0, float(row["change_rate"] or 0))
+        quotes.quotes[tick[0]] = tick
+        frames[tick[0]] = encode_tick(*tick)
+    if frames:
+        await redis_raw.hset(QUOTE_HASH_KEY, mapping=frames)
+    return len(frames)
+
+
+async def _register_demand(redis_client, codes, demand_channel):
+    if not codes:
+        return 0
+    async with redis_client.pipeline(transaction=True) as pipe:
+        pipe.delete(WARMUP_DEMAND_KEY)
+        pipe.hset(WARMUP_DEMAND_KEY, mapping={code: 1 for code in codes})
+        pipe.expire(WARMUP_DEMAND_KEY, WARMUP_DEMAND_TTL_SECONDS)
+        pipe.publish(demand_channel, WARMUP_DEMAND_KEY)
+        await pipe.execute()
+    return len(codes)
+
+
+async def hit_ratio(redis_client, day: str = None) -> dict:
+    stats = await redis_client.hgetall(STATS_KEY.format(day=day or now_kst().strftime("%Y%m%d")))
+    hits, misses = int(stats.get("hits", 0)), int(stats.get("misses", 0))
+    stats["hit_ratio"] = hits / (hits + misses) if hits + misses else None
+    return stats
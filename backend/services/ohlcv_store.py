@@ -0,0 +1,143 @@
+import os
+import shutil
+import uuid
+
+import numpy as np
+import pandas as pd
+
+# --- 일봉 OHLCV 히스토리 저장소 ---
+# 레이아웃: {root}/{symbol}/{year}/date.npy (int64 ns), {root}/{symbol}/{year}/ohlcv.npy (float64, shape=(n, 5))
+# np.load(mmap_mode='r')로 읽고, 가격 행렬을 DataFrame의 단일 float64 블록으로 그대로 넘기기 때문에
+# 한 해 안의 구간은 복사 없이 메모리 매핑된 뷰로 반환되고, 여러 해는 한 번의 concatenate만 발생합니다.
+
+DATE_FILE = "date.npy"
+VALUES_FILE = "ohlcv.npy"
+PRICE_COLUMNS = ("open", "high", "low", "close", "volume")
+# stock_worker(쓰기)와 backtest_worker(읽기)가 같은 볼륨을 마운트해서 씁니다. (docker-compose의 ohlcv_data)
+DEFAULT_ROOT = os.getenv("OHLCV_STORE_DIR", "/data/ohlcv")
+
+
+class OHLCVStore:
+    def __init__(self, root: str = DEFAULT_ROOT):
+        self.root = root
+
+    def _symbol_dir(self, symbol: str) -> str:
+        return os.path.join(self.root, symbol)
+
+    def _partition_dir(self, symbol: str, year: int) -> str:
+        return os.path.join(self._symbol_dir(symbol), str(year))
+
+    def symbols(self) -> list[str]:
+        if not os.path.isdir(self.root):
+            return []
+        return sorted(name for name in os.listdir(self.root) if os.path.isdir(os.path.join(self.root, name)))
+
+    def years(self, symbol: str) -> list[int]:
+        symbol_dir = self._symbol_dir(symbol)
+        if not os.path.isdir(symbol_dir):
+            return []
+        return sorted(int(name) for name in os.listdir(symbol_dir) if name.isdigit())
+
+    def _read_partition(self, symbol: str, year: int) -> tuple[np.ndarray, np.ndarray]:
+        partition_dir = self._partition_dir(symbol, year)
+        dates = np.load(os.path.join(partition_dir, DATE_FILE), mmap_mode="r")
+        values = np.load(os.path.join(partition_dir, VALUES_FILE), mmap_mode="r")
+        return dates, values
+
+    def _write_partition(self, symbol: str, year: int, frame: pd.DataFrame):
+        # 임시 디렉터리에 모두 쓴 뒤 rename으로 교체해서, 읽는 쪽이 절반만 쓰인 파티션을 보지 않게 합니다.
+        partition_dir = self._partition_dir(symbol, year)
+        tmp_dir = f"{partition_dir}.tmp-{uuid.uuid4().hex}"
+        os.makedirs(tmp_dir)
+        np.save(os.path.join(tmp_dir, DATE_FILE), frame.index.values.astype("datetime64[ns]").view("int64"))
+        np.save(os.path.join(tmp_dir, VALUES_FILE), np.ascontiguousarray(frame[list(PRICE_COLUMNS)].to_numpy(dtype="float64")))
+        old_dir = None
+        if os.path.isdir(partition_dir):
+            old_dir = f"{partition_dir}.old-{uuid.uuid4().hex}"
+            os.rename(partition_dir, old_dir)
+        os.rename(tmp_dir, partition_dir)
+        if old_dir:
+            shutil.rmtree(old_dir, ignore_errors=True)
+
+    def write(self, symbol: str, bars: pd.DataFrame) -> int:
+        """
+        DatetimeIndex와 open/high/low/close/volume 컬럼을 가진 DataFrame을 연도별 파티션에 병합합니다.
+        같은 날짜가 이미 있으면 새 값으로 덮어씁니다. 기록된 행 수를 반환합니다.
+        종목의 data_version은 저장소가 아니라 Postgres(ohlcv_data_versions)에 있으므로 쓰는 쪽이 따로 올립니다.
+        """
+        if bars.empty:
+            return 0
+        bars = bars[list(PRICE_COLUMNS)].astype("float64")
+        bars.index = pd.DatetimeIndex(bars.index).normalize()
+        for year, new_rows in bars.groupby(bars.index.year):
+            if os.path.isdir(self._partition_dir(symbol, year)):
+                merged = pd.concat([self._partition_frame(symbol, year), new_rows])
+            else:
+                merged = new_rows
+            merged = merged[~merged.index.duplicated(keep="last")].sort_index()
+            self._write_partition(symbol, int(year), merged)
+        return len(bars)
+
+    def _partition_frame(self, symbol: str, year: int) -> pd.DataFrame:
+        dates, values = self._read_partition(symbol, year)
+        return pd.DataFrame(np.array(values), index=pd.DatetimeIndex(np.array(dates).view("datetime64[ns]")), columns=list(PRICE_COLUMNS))
+
+    def load(self, symbol: str, start=None, end=None) -> pd.DataFrame:
+        """
+        [start, end] 구간의 일봉을 bt.feeds.PandasData에 바로 넣을 수 있는 DataFrame으로 반환합니다.
+        """
+        start_ts = pd.Timestamp(start) if start is not None else None
+        end_ts = pd.Timestamp(end) if end is not None else None
+        years = [
+            year for year in self.years(symbol)
+            if (start_ts is None or year >= start_ts.year) and (end_ts is None or year <= end_ts.year)
+        ]
+        if not years:
+            return pd.DataFrame(columns=list(PRICE_COLUMNS), index=pd.DatetimeIndex([], name="datetime"))
+
+        date_pieces, value_pieces = [], []
+        for year in years:
+            dates, values = self._read_partition(symbol, year)
+            lo = 0 if start_ts is None else int(np.searchsorted(dates, start_ts.value, side="left"))
+            hi = len(dates) if end_ts is None else int(np.searchsorted(dates, end_ts.value, side="right"))
+            if hi > lo:
+                date_pieces.append(dates[lo:hi])
+                value_pieces.append(values[lo:hi])
+
+        if not date_pieces:
+            return pd.DataFrame(columns=list(PRICE_COLUMNS), index=pd.DatetimeIndex([], name="datetime"))
+        if len(date_pieces) == 1:
+            # np.memmap 서브클래스를 그대로 넘기면 pandas가 복사하므로 일반 ndarray 뷰로 바꿉니다.
+            dates, values = date_pieces[0].view(np.ndarray), value_pieces[0].view(np.ndarray)
+        else:
+            dates, values = np.concatenate(date_pieces), np.concatenate(value_pieces)
+
+        index = pd.DatetimeIndex(dates.view("datetime64[ns]"), name="datetime")
+        return pd.DataFrame(values, index=index, columns=list(PRICE_COLUMNS), copy=False)
+
+
+def parse_kiwoom_daily_bars(rows: list[dict]) -> pd.DataFrame:
+    """
+    키움 OPT10081(주식일봉차트조회) 응답 행(일자/시가/고가/저가/현재가/거래량)을 저장소 형식의 DataFrame으로 변환합니다.
+    키움은 하락 시 가격에 부호를 붙여 보내므로 절댓값을 사용합니다.
+    """
+    def number(value) -> float:
+        try:
+            return abs(float(str(value).strip() or 0))
+        except ValueError:
+            return 0.0
+
+    records = [
+        {
+            "datetime": pd.Timestamp(str(row["일자"]).strip()),
+            "open": number(row.get("시가")),
+            "high": number(row.get("고가")),
+            "low": number(row.get("저가")),
+            "close": number(row.get("현재가")),
+            "volume": number(row.get("거래량")),
+        }
+        for row in rows if str(row.get("일자", "")).strip()
+    ]
+    if not records:
+        return pd.DataFrame(columns=list(PRICE_COLUMNS), index=pd.DatetimeIndex([], name="datetime"))
+    return pd.DataFrame.from_records(records, index="datetime").sort_index()
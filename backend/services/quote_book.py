@@ -0,0 +1,93 @@
+from tick_codec import encode_tick, iter_ticks
+
+# --- 종목별 최신 시세 ---
+# 실시간 틱마다 종목의 마지막 (종목코드, 현재가, 전일대비, 체결량, 등락률)을 메모리에 덮어쓰고,
+# 바뀐 종목만 주기적으로 Redis 해시(kiwoom:latest_quotes, 값은 tick_codec 프레임)에 저장해서 재시작 후에도 바로 스냅샷을 줄 수 있게 합니다.
+# stocks 테이블에도 같은 방식으로 write-behind합니다. 틱이 몇 건 오든 주기마다 종목당 최대 한 행, UPDATE 한 번만 나갑니다.
+
+QUOTE_HASH_KEY = "kiwoom:latest_quotes"
+DB_SYNC_BATCH_SIZE = 5000
+
+
+class QuoteBook:
+    def __init__(self):
+        self.quotes: dict[str, tuple] = {}
+        self.dirty: set = set()
+        self.db_dirty: set = set()
+
+    def update(self, tick: tuple):
+        self.quotes[tick[0]] = tick
+        self.dirty.add(tick[0])
+        self.db_dirty.add(tick[0])
+
+    def snapshot(self, codes=None) -> list[tuple]:
+        if codes is None:
+            return list(self.quotes.values())
+        return [self.quotes[code] for code in codes if code in self.quotes]
+
+    async def load(self, redis_raw) -> int:
+        """
+        Redis에 저장된 시세로 채웁니다. 이미 메모리에 있는 종목(더 최신)은 덮어쓰지 않습니다.
+        """
+        stored = await redis_raw.hgetall(QUOTE_HASH_KEY)
+        for frame in stored.values():
+            for tick in iter_ticks(frame):
+                self.quotes.setdefault(tick[0], tick)
+        return len(stored)
+
+    async def refresh(self, redis_raw, codes=None, keep=()) -> int:
+        """
+        Redis의 시세로 덮어씁니다. 구독하지 않던 동안 놓친 틱을 메우는 용도이고, keep에 있는 종목은 그대로 둡니다.
+        """
+        if codes is None:
+            frames = list((await redis_raw.hgetall(QUOTE_HASH_KEY)).values())
+        else:
+            frames = await redis_raw.hmget(QUOTE_HASH_KEY, list(codes))
+        refreshed = 0
+        for frame in frames:
+            for tick in iter_ticks(frame or b""):
+                if tick[0] not in keep:
+                    self.quotes[tick[0]] = tick
+                    refreshed += 1
+        return refreshed
+
+    async def persist(self, redis_raw) -> int:
+        if not self.dirty:
+            return 0
+        codes, self.dirty = self.dirty, set()
+        try:
+            await redis_raw.hset(QUOTE_HASH_KEY, mapping={code: encode_tick(*self.quotes[code]) for code in codes})
+        except Exception:
+            self.dirty |= codes
+            raise
+        return len(codes)
+
+    async def sync_to_db(self, pool) -> int:
+        """
+        마지막 동기화 이후 바뀐 종목의 현재가/전일대비/등락률을 stocks에 반영합니다. 실패하면 다음 주기에 다시 시도합니다.
+        틱의 체결량은 건별 수량이라 누적 거래량인 stocks.volume과 맞지 않으므로 volume은 건드리지 않습니다.
+        """
+        if not self.db_dirty:
+            return 0
+        codes, self.db_dirty = sorted(self.db_dirty), set()
+        rows = [self.quotes[code] for code in codes if self.quotes[code][1] > 0]
+        try:
+            async with pool.acquire() as conn:
+                for lo in range(0, len(rows), DB_SYNC_BATCH_SIZE):
+                    batch = rows[lo:lo + DB_SYNC_BATCH_SIZE]
+                    await conn.execute("""
+                        UPDATE stocks AS s
+                        SET price = v.price, change_value = v.change, change_rate = v.change_rate, last_updated = NOW()
+                        FROM unnest($1::text[], $2::int[], $3::int[], $4::float8[]) AS v(code, price, change, change_rate)
+                        WHERE s.code = v.code
+                          AND (s.price IS DISTINCT FROM v.price OR s.change_rate IS DISTINCT FROM v.change_rate)
+                    """,
+                        [tick[0] for tick in batch],
+                        [tick[1] for tick in batch],
+                        [tick[2] for tick in batch],
+                        [tick[4] for tick in batch],
+                    )
+        except Exception:
+            self.db_dirty.update(codes)
+            raise
+        return len(rows)
@@ -0,0 +1,195 @@
+import os
+import sys
+import json
+import time
+import random
+import asyncio
+import argparse
+import subprocess
+import multiprocessing
+
+import redis.asyncio as redis
+import websockets
+
+from tick_codec import (
+    DEFAULT_REALTIME_CHANNEL, REALTIME_CHANNEL, REALTIME_CHANNEL_SHARDS, TICK_SIZE, TICK_SUBPROTOCOL,
+    encode_tick, iter_ticks, realtime_channel,
+)
+
+# --- /ws/realtime-price 부하 테스트 ---
+# 가짜 틱을 Redis 실시간 채널에 발행하고, 여러 프로세스에서 WebSocket 클라이언트를 띄워 받은 틱 수와 지연을 잽니다.
+# 지연 측정을 위해 체결량 필드에 발행 시각(ms, 2^31로 나눈 나머지)을 넣습니다.
+# 가짜 종목코드는 실제 KRX 코드와 겹치지 않도록 T00000부터 씁니다.
+# 운영 채널에 가짜 틱이 섞이지 않도록 REALTIME_CHANNEL을 기본값이 아닌 이름으로 지정해야 실행됩니다.
+# 서버도 같은 REALTIME_CHANNEL로 떠 있어야 하고, --spawn은 리더 키와 시세 해시가 운영과 섞이지 않도록 REDIS_DB(0 아님)도 요구합니다.
+# 가짜 틱(체결량 = 발행 시각)이 intraday_candles/stocks에 쓰이지 않도록 --spawn은 서버를 STOCK_DB_WRITES=0으로 띄웁니다.
+#
+# 이미 떠 있는 서버 측정 (서버도 같은 REALTIME_CHANNEL과 STOCK_DB_WRITES=0으로 띄웁니다):
+#   REALTIME_CHANNEL=loadtest_realtime_data python realtime_load_test.py --url ws://localhost:8001/ws/realtime-price
+# 워커 수별 스케일링 비교 (워커 수마다 uvicorn을 직접 띄웠다 내립니다. DB/Redis 환경변수는 그대로 넘깁니다):
+#   REALTIME_CHANNEL=loadtest_realtime_data REDIS_DB=15 python realtime_load_test.py --spawn --workers 1,2,4,8
+# 서버가 틱을 다 전달하지 못할 만큼 --rate와 --clients를 높여야 워커 수에 따른 처리량 차이가 보입니다.
+
+MS_WRAP = 2 ** 31
+PUBLISH_BATCH_SECONDS = 0.01
+LEADER_SETTLE_SECONDS = 6  # 리더 선출이 끝나 워커들의 채널 구독이 안정될 때까지 기다립니다.
+
+
+def now_ms() -> int:
+    return time.time_ns() // 1_000_000 % MS_WRAP
+
+
+def _redis_client():
+    return redis.from_url(
+        f"redis://{os.getenv('REDIS_HOST', 'localhost')}:{os.getenv('REDIS_PORT', 6379)}/{os.getenv('REDIS_DB', 0)}",
+        decode_responses=False,
+    )
+
+
+async def publish_ticks(codes: list[str], rate: int, duration: float) -> int:
+    """
+    초당 rate건의 틱을 PUBLISH_BATCH_SECONDS마다 채널별로 묶어 발행합니다.
+    """
+    client = _redis_client()
+    published = 0
+    per_batch = max(1, int(rate * PUBLISH_BATCH_SECONDS))
+    started = time.monotonic()
+    try:
+        while time.monotonic() - started < duration:
+            stamp = now_ms()
+            batches: dict[str, list] = {}
+            for _ in range(per_batch):
+                code = random.choice(codes)
+                frame = encode_tick(code, random.randint(1000, 200000), random.randint(-500, 500), stamp, random.uniform(-5, 5))
+                batches.setdefault(realtime_channel(code), []).append(frame)
+            async with client.pipeline(transaction=False) as pipe:
+                for channel, frames in batches.items():
+                    pipe.publish(channel, b"".join(frames))
+                await pipe.execute()
+            published += per_batch
+            next_at = started + published / rate
+            await asyncio.sleep(max(0.0, next_at - time.monotonic()))
+    finally:
+        await client.close()
+    return published
+
+
+async def _client(url: str, codes: list[str], stop_at: float, stats: dict):
+    async with websockets.connect(url, subprotocols=[TICK_SUBPROTOCOL], max_size=None) as ws:
+        await ws.send(json.dumps({"action": "set", "codes": codes}))
+        while time.monotonic() < stop_at:
+            try:
+                message = await asyncio.wait_for(ws.recv(), timeout=max(0.01, stop_at - time.monotonic()))
+            except asyncio.TimeoutError:
+                break
+            if isinstance(message, str):
+                stats["snapshots"] += 1
+                continue
+            received = now_ms()
+            stats["ticks"] += len(message) // TICK_SIZE
+            for tick in iter_ticks(message):
+                stats["latency"].append((received - tick[3]) % MS_WRAP)
+
+
+def _client_process(url: str, client_codes: list[list[str]], duration: float, results):
+    async def run():
+        stats = {"ticks": 0, "snapshots": 0, "latency": []}
+        stop_at = time.monotonic() + duration
+        await asyncio.gather(*(_client(url, codes, stop_at, stats) for codes in client_codes), return_exceptions=True)
+        latency = stats["latency"]
+        results.put((stats["ticks"], stats["snapshots"], random.sample(latency, min(len(latency), 20000))))
+    asyncio.run(run())
+
+
+def run_load(url: str, clients: int, codes_per_client: int, symbols: int, rate: int, duration: float, procs: int) -> dict:
+    codes = [f"T{i:05d}" for i in range(symbols)]
+    assignments = [random.sample(codes, codes_per_client) for _ in range(clients)]
+    results = multiprocessing.Queue()
+    workers = [
+        multiprocessing.Process(target=_client_process, args=(url, assignments[i::procs], duration + 2, results))
+        for i in range(procs)
+    ]
+    for worker in workers:
+        worker.start()
+    time.sleep(1.5)  # 연결과 구독, 첫 스냅샷이 끝날 때까지 기다립니다.
+    published = asyncio.run(publish_ticks(codes, rate, duration))
+    ticks, snapshots, latency = 0, 0, []
+    for _ in workers:
+        t, s, l = results.get()
+        ticks, snapshots, latency = ticks + t, snapshots + s, latency + l
+    for worker in workers:
+        worker.join()
+    latency.sort()
+    pick = lambda q: latency[min(len(latency) - 1, int(len(latency) * q))] if latency else None
+    return {
+        "published": published,
+        "delivered": ticks,
+        "delivered_per_second": ticks / duration,
+        "snapshots": snapshots,
+        "p50_ms": pick(0.5),
+        "p99_ms": pick(0.99),
+    }
+
+
+def _wait_for_port(port: int, timeout: float = 60):
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        try:
+            asyncio.run(asyncio.wait_for(asyncio.open_connection("127.0.0.1", port), 1))
+            return
+        except (OSError, asyncio.TimeoutError):
+            time.sleep(0.5)
+    raise RuntimeError(f"stock_service가 {port} 포트에서 응답하지 않습니다.")
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="/ws/realtime-price 부하 테스트")
+    parser.add_argument("--url", default="ws://localhost:8001/ws/realtime-price")
+    parser.add_argument("--clients", type=int, default=500)
+    parser.add_argument("--codes-per-client", type=int, default=30)
+    parser.add_argument("--symbols", type=int, default=2000)
+    parser.add_argument("--rate", type=int, default=20000, help="초당 발행 틱 수")
+    parser.add_argument("--duration", type=float, default=20)
+    parser.add_argument("--procs", type=int, default=max(1, (os.cpu_count() or 2) // 2), help="클라이언트 프로세스 수")
+    parser.add_argument("--spawn", action="store_true", help="워커 수마다 uvicorn stock_service를 직접 띄웁니다.")
+    parser.add_argument("--workers", default="1", help="--spawn과 함께 쓸 워커 수 목록 (예: 1,2,4)")
+    parser.add_argument("--port", type=int, default=8101)
+    args = parser.parse_args(argv)
+    if REALTIME_CHANNEL == DEFAULT_REALTIME_CHANNEL:
+        parser.error(f"운영 채널({DEFAULT_REALTIME_CHANNEL})에는 가짜 틱을 발행하지 않습니다. REALTIME_CHANNEL을 다른 이름으로 지정하세요.")
+    if args.spawn and int(os.getenv("REDIS_DB", 0)) == 0:
+        parser.error("--spawn으로 띄운 서버가 운영 리더 키와 시세 해시를 건드리지 않도록 REDIS_DB를 0이 아닌 번호로 지정하세요.")
+    if args.symbols > 100000:
+        parser.error("--symbols는 100000 이하여야 합니다. (T00000~T99999)")
+
+    print(f"샤드 채널 {REALTIME_CHANNEL_SHARDS or '사용 안 함'}, 클라이언트 {args.clients} x {args.codes_per_client}종목, {args.rate} ticks/s")
+    runs = [int(n) for n in args.workers.split(",")] if args.spawn else [None]
+    baseline = None
+    for workers in runs:
+        server = None
+        url = args.url
+        if workers is not None:
+            url = f"ws://127.0.0.1:{args.port}/ws/realtime-price"
+            server = subprocess.Popen(
+                [sys.executable, "-m", "uvicorn", "stock_service:app", "--host", "127.0.0.1", "--port", str(args.port), "--workers", str(workers)],
+                cwd=os.path.dirname(os.path.abspath(__file__)),
+                env={**os.environ, "STOCK_DB_WRITES": "0"},
+            )
+            _wait_for_port(args.port)
+            time.sleep(LEADER_SETTLE_SECONDS)
+        try:
+            result = run_load(url, args.clients, args.codes_per_client, args.symbols, args.rate, args.duration, args.procs)
+        finally:
+            if server:
+                server.terminate()
+                server.wait()
+        baseline = baseline or result["delivered_per_second"]
+        scale = result["delivered_per_second"] / baseline if baseline else 0
+        print(
+            f"workers={workers or '-'}: delivered {result['delivered_per_second']:,.0f} ticks/s (x{scale:.2f}), "
+            f"p50 {result['p50_ms']} ms, p99 {result['p99_ms']} ms, snapshots {result['snapshots']}"
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,190 @@
+import json
+import base64
+
+# --- 종목 스크리너 ---
+# 시장/테마/PER·PBR·ROE·시가총액 범위/검색어 조건과 다중 정렬로 stocks를 골라 요청한 페이지, 요청한 컬럼만 돌려줍니다.
+# 페이지는 OFFSET 대신 마지막 행의 정렬 키 값을 담은 커서로 넘깁니다(keyset). 뒤 페이지로 갈수록 느려지지 않고,
+# 페이지 사이에 시세가 바뀌어도 같은 종목이 두 번 나오거나 빠지는 일이 적습니다.
+# 정렬 키마다 NULL 여부를 먼저 비교해서 값이 없는 종목은 방향과 상관없이 항상 뒤에 옵니다. 마지막 키는 항상 code입니다.
+# 문자열 키는 DB 기본 collation 대신 COLLATE "C"(UTF-8 바이트 = 코드포인트 순)로 비교해서, market_snapshot의 np.unique 순서와 같게 합니다.
+# 그래야 어느 경로가 발급한 커서든 다른 경로에서도 같은 위치를 가리킵니다.
+
+# API 컬럼 이름 → stocks 컬럼
+COLUMNS = {
+    "code": "code",
+    "name": "name",
+    "market": "market",
+    "currentPrice": "price",
+    "change_value": "change_value",
+    "change_rate": "change_rate",
+    "volume": "volume",
+    "market_cap": "market_cap",
+    "per": "per",
+    "pbr": "pbr",
+    "roe": "roe",
+}
+DEFAULT_COLUMNS = ("code", "name", "market", "currentPrice", "change_rate", "volume", "market_cap")
+SORTABLE = ("name", "currentPrice", "change_rate", "volume", "market_cap", "per", "pbr", "roe")
+TEXT_SORT_KEYS = ("name", "code")
+# 시장 구분은 저장된 대소문자와 상관없이 대문자로 비교하고 돌려줍니다. (market_snapshot도 대문자로 올립니다)
+MARKET_EXPRESSION = "UPPER(market)"
+DEFAULT_SORT = "-market_cap"
+MAX_SORT_KEYS = 3
+MAX_LIMIT = 2000
+
+# 범위 필터: 쿼리 파라미터 접두어 → API 컬럼 이름 (예: per_min=0&per_max=15)
+RANGE_FILTERS = {
+    "per": "per",
+    "pbr": "pbr",
+    "roe": "roe",
+    "market_cap": "market_cap",
+    "change_rate": "change_rate",
+    "volume": "volume",
+    "price": "currentPrice",
+}
+
+
+class ScreenerError(ValueError):
+    pass
+
+
+def parse_columns(columns: str = None) -> list[str]:
+    if not columns:
+        return list(DEFAULT_COLUMNS)
+    names = [name.strip() for name in columns.split(",") if name.strip()]
+    unknown = [name for name in names if name not in COLUMNS]
+    if unknown:
+        raise ScreenerError(f"unknown columns: {unknown}. available: {list(COLUMNS)}")
+    if "code" not in names:
+        names.insert(0, "code")
+    return list(dict.fromkeys(names))
+
+
+def parse_sort(sort: str = None) -> list[tuple[str, bool]]:
+    """
+    "-market_cap,per" → [("market_cap", True), ("per", False), ("code", False)]. 앞에 -가 붙으면 내림차순입니다.
+    """
+    keys = []
+    for part in (sort or DEFAULT_SORT).split(","):
+        part = part.strip()
+        if not part:
+            continue
+        descending = part.startswith("-")
+        name = part.lstrip("-+")
+        if name not in SORTABLE:
+            raise ScreenerError(f"cannot sort by '{name}'. sortable: {list(SORTABLE)}")
+        if name not in (key for key, _ in keys):
+            keys.append((name, descending))
+    if len(keys) > MAX_SORT_KEYS:
+        raise ScreenerError(f"at most {MAX_SORT_KEYS} sort keys are allowed")
+    return keys + [("code", False)]
+
+
+def encode_cursor(values: list) -> str:
+    return base64.urlsafe_b64encode(json.dumps(values, separators=(",", ":")).encode()).decode().rstrip("=")
+
+
+def decode_cursor(cursor: str, sort_keys: list) -> list:
+    try:
+        values = json.loads(base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4)))
+    except (ValueError, TypeError):
+        raise ScreenerError("invalid cursor")
+    if not isinstance(values, list) or len(values) != len(sort_keys):
+        raise ScreenerError("cursor does not match sort")
+    for value, (name, _) in zip(values, sort_keys):
+        expected = str if name in TEXT_SORT_KEYS else (int, float)
+        if value is not None and (isinstance(value, bool) or not isinstance(value, expected)):
+            raise ScreenerError("cursor does not match sort")
+    return values
+
+
+def parse_filters(market=None, theme=None, q=None, ranges: dict = None) -> dict:
+    filters = {
+        "markets": [m.strip().upper() for m in market.split(",") if m.strip()] if market else [],
+        "themes": [t.strip() for t in theme.split(",") if t.strip()] if theme else [],
+        "q": (q or "").strip(),
+        "ranges": {},
+    }
+    for prefix, column in RANGE_FILTERS.items():
+        low, high = (ranges or {}).get(f"{prefix}_min"), (ranges or {}).get(f"{prefix}_max")
+        if low is not None and high is not None and low > high:
+            raise ScreenerError(f"{prefix}_min must not exceed {prefix}_max")
+        if low is not None or high is not None:
+            filters["ranges"][column] = (low, high)
+    return filters
+
+
+def build_query(filters: dict, sort_keys: list, columns: list, cursor: list = None, limit: int = 100):
+    """
+    asyncpg용 (SQL, 인자 목록). 다음 페이지가 있는지 알기 위해 limit + 1행을 가져옵니다.
+    선택 컬럼 외에 커서를 만들 정렬 키 컬럼도 함께 가져옵니다.
+    """
+    args = []
+
+    def arg(value):
+        args.append(value)
+        return f"${len(args)}"
+
+    where = []
+    if filters["markets"]:
+        where.append(f"{MARKET_EXPRESSION} = ANY({arg(filters['markets'])}::text[])")
+    if filters["themes"]:
+        where.append(
+            "EXISTS (SELECT 1 FROM stock_themes st JOIN themes t ON t.id = st.theme_id "
+            f"WHERE st.stock_code = stocks.code AND t.name = ANY({arg(filters['themes'])}::text[]))"
+        )
+    if filters["q"]:
+        # 종목코드 앞부분 또는 종목명 일부 (종목명은 pg_trgm 인덱스를 탑니다)
+        q = filters["q"].replace("\\", "\\\\").replace("%", "\\%").replace("_", "\\_")
+        where.append(f"(code LIKE {arg(q + '%')} OR name ILIKE {arg('%' + q + '%')})")
+    for column, (low, high) in filters["ranges"].items():
+        sql_column = COLUMNS[column]
+        if low is not None:
+            where.append(f"{sql_column} >= {arg(low)}::float8")
+        if high is not None:
+            where.append(f"{sql_column} <= {arg(high)}::float8")
+
+    # 키마다 (col IS NULL, COALESCE(col, 기본값)) 두 개로 비교해서 NULL도 커서 비교가 성립하게 합니다.
+    order_by, parts = [], []
+    for name, descending in sort_keys:
+        sql_column = COLUMNS.get(name, name)
+        fallback = "''" if name in TEXT_SORT_KEYS else "0"
+        parts.append((f"({sql_column} IS NULL)", False, "bool"))
+        if name in TEXT_SORT_KEYS:
+            parts.append((f'COALESCE({sql_column}, {fallback}) COLLATE "C"', descending, "text"))
+        else:
+            parts.append((f"COALESCE({sql_column}, {fallback})", descending, "float8"))
+    for expression, descending, _ in parts:
+        order_by.append(f"{expression} {'DESC' if descending else 'ASC'}")
+
+    if cursor is not None:
+        values = []
+        for value, (name, _) in zip(cursor, sort_keys):
+            values += [value is None, value if value is not None else ("" if name in TEXT_SORT_KEYS else 0)]
+        placeholders = [f"{arg(value)}::{cast}" for value, (_, _, cast) in zip(values, parts)]
+        # (a > x) OR (a = x AND b > y) OR ... 각 키의 방향에 맞춰 부등호를 고릅니다.
+        chain = []
+        for i, (expression, descending, _) in enumerate(parts):
+            equal = [f"{parts[j][0]} = {placeholders[j]}" for j in range(i)]
+            equal.append(f"{expression} {'<' if descending else '>'} {placeholders[i]}")
+            chain.append("(" + " AND ".join(equal) + ")")
+        where.append("(" + " OR ".join(chain) + ")")
+
+    select = [f'{MARKET_EXPRESSION if name == "market" else COLUMNS[name]} AS "{name}"' for name in columns]
+    select += [f'{COLUMNS.get(name, name)} AS "_sort_{name}"' for name, _ in sort_keys]
+    sql = f"SELECT {', '.join(select)} FROM stocks"
+    if where:
+        sql += " WHERE " + " AND ".join(where)
+    sql += f" ORDER BY {', '.join(order_by)} LIMIT {arg(limit + 1)}"
+    return sql, args
+
+
+def page(rows: list[dict], sort_keys: list, columns: list, limit: int) -> tuple[list[dict], str]:
+    """
+    limit + 1행 중 limit행과 다음 페이지 커서(없으면 None)를 돌려줍니다.
+    """
+    next_cursor = None
+    if len(rows) > limit:
+        rows = rows[:limit]
+        next_cursor = encode_cursor([rows[-1][f"_sort_{name}"] for name, _ in sort_keys])
+    return [{name: row[name] for name in columns} for row in rows], next_cursor
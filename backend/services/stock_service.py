@@ -3,9 +3,30 @@ import asyncio
 import asyncpg
 import redis.asyncio as redis
 import json
-from fastapi import FastAPI, WebSocket, WebSocketDisconnect
+import socket
+import time
+from collections import deque
+from fastapi import FastAPI, HTTPException, Request, Response, WebSocket, WebSocketDisconnect
 from fastapi.middleware.cors import CORSMiddleware
-from datetime import datetime, time as dt_time
+from datetime import datetime, timedelta, timezone
+from candle_aggregator import CandleAggregator, INTERVALS
+from market_hours import MEASURE_MINUTES, next_market_open, now_kst
+from market_warmup import (
+    ALL_COMPANIES_CACHE_KEY, ALL_COMPANIES_QUERY, THEMES_CACHE_KEY, THEMES_QUERY,
+    WARMUP_LEAD_MINUTES, WATCH_SCORE_KEY, WATCH_SCORE_TTL_SECONDS,
+    cached_query, hit_ratio, warm_up,
+)
+from http_cache import CompressionMiddleware, make_etag, not_modified
+from market_snapshot import MarketSnapshot
+from quote_book import QuoteBook
+from screener import (
+    MAX_LIMIT as SCREENER_MAX_LIMIT, ScreenerError, build_query, decode_cursor, page, parse_columns, parse_filters, parse_sort,
+)
+from theme_performance import ThemePerformance, load_persisted, rank_themes
+from tick_codec import (
+    REALTIME_CHANNEL, REALTIME_CHANNEL_PATTERN, REALTIME_CHANNEL_SHARDS, TICK_SUBPROTOCOL,
+    encode_tick, is_binary_frame, iter_ticks, legacy_dict_to_tick, realtime_channel, tick_to_json,
+)
 
 app = FastAPI()
 
@@ -14,32 +35,258 @@ app.add_middleware(
     allow_origins=["*"],
     allow_credentials=True,
     allow_methods=["*"],
-    allow_headers=["*"]
+    allow_headers=["*"],
+    expose_headers=["ETag"],
 )
+app.add_middleware(CompressionMiddleware)
+
+# uvicorn --workers N으로 띄우면 워커 프로세스마다 이 모듈을 따로 import하므로 프로세스별로 고유합니다.
+INSTANCE_ID = f"{socket.gethostname()}-{os.getpid()}"
+
+# kiwoom_realtime_server.realtime_demand_watcher가 읽는 키/채널
+REALTIME_DEMAND_KEY = f"kiwoom:realtime_demand:{INSTANCE_ID}"
+REALTIME_DEMAND_CHANNEL = "kiwoom_realtime_demand"
+REALTIME_DEMAND_TTL_SECONDS = 30
+REALTIME_DEMAND_REFRESH_SECONDS = 10
+MAX_CODES_PER_CONNECTION = 200
+OUTBOX_LIMIT = 2000            # 연결별로 보내지 못하고 쌓인 메시지가 이보다 많으면 스냅샷으로 다시 맞춥니다.
+MAX_FRAMES_PER_MESSAGE = 256   # 바이너리 연결에 한 번에 묶어 보내는 틱 프레임 수
+QUOTE_PERSIST_INTERVAL_SECONDS = 1
+PARTIAL_FEED_QUOTE_REFRESH_SECONDS = 1  # 일부 종목만 받는 워커가 전 종목 스냅샷 전에 Redis 시세를 다시 읽는 최소 간격
+STOCK_SYNC_INTERVAL_SECONDS = float(os.getenv("STOCK_SYNC_INTERVAL_SECONDS", 3))
+THEME_PERSIST_INTERVAL_SECONDS = 1
+# 전 종목 틱을 받는 워커는 재무 지표/신규 종목만 가끔 다시 읽으면 되고,
+# 일부 종목만 받는 워커는 나머지 종목 시세를 리더의 stocks write-behind에서 자주 가져옵니다.
+SNAPSHOT_REFRESH_SECONDS = float(os.getenv("MARKET_SNAPSHOT_REFRESH_SECONDS", 60))
+SNAPSHOT_PARTIAL_FEED_REFRESH_SECONDS = float(os.getenv("MARKET_SNAPSHOT_PARTIAL_FEED_REFRESH_SECONDS", 5))
+THEME_VERSION_CHECK_SECONDS = 60
+# 부하 테스트처럼 가짜 틱을 받는 서버는 STOCK_DB_WRITES=0으로 띄워 분봉/stocks 쓰기를 끕니다. (DB 읽기는 그대로 합니다)
+DB_WRITES_ENABLED = os.getenv("STOCK_DB_WRITES", "1") != "0"
+
+# 여러 워커/인스턴스 중 리더 하나만 분봉 flush와 stocks 동기화를 하고, 리더는 항상 전 종목 틱을 구독합니다.
+# 샤드 채널을 쓰는 경우 리더가 아닌 워커는 자기 연결이 보고 있는 종목의 샤드 채널만 구독합니다.
+LEADER_KEY = "stock_service:leader"
+LEADER_TTL_SECONDS = 15
+LEADER_RENEW_SECONDS = 5
+RENEW_LEADER_SCRIPT = """
+if redis.call('get', KEYS[1]) == ARGV[1] then return redis.call('expire', KEYS[1], ARGV[2]) end
+return 0
+"""
+RELEASE_LEADER_SCRIPT = """
+if redis.call('get', KEYS[1]) == ARGV[1] then return redis.call('del', KEYS[1]) end
+return 0
+"""
+
+class Outbox:
+    """
+    연결 하나로 나가는 메시지 큐. 틱 처리 쪽은 큐에 넣기만 하고, 연결마다 하나씩 도는 sender가 순서대로 보냅니다.
+    메시지마다 seq를 1씩 올리므로 (바이너리 프레임은 프레임마다 1) 클라이언트는 누락이나 중복을 알아챌 수 있습니다.
+    """
+
+    def __init__(self, websocket: WebSocket, binary: bool):
+        self.websocket = websocket
+        self.binary = binary
+        self.seq = 0
+        self.pending: deque = deque()
+        self.ready = asyncio.Event()
+        self.task = None
+
+    def push(self, kind: str, payload):
+        self.pending.append((kind, payload))
+        self.ready.set()
+
+    async def run(self):
+        try:
+            while True:
+                await self.ready.wait()
+                self.ready.clear()
+                while self.pending:
+                    kind, payload = self.pending.popleft()
+                    if kind == "bytes":
+                        # 이어진 바이너리 프레임은 메시지 하나로 묶어서 보냅니다.
+                        frames = [payload]
+                        while self.pending and self.pending[0][0] == "bytes" and len(frames) < MAX_FRAMES_PER_MESSAGE:
+                            frames.append(self.pending.popleft()[1])
+                        await self.websocket.send_bytes(b"".join(frames))
+                    else:
+                        await self.websocket.send_text(payload)
+        except Exception:
+            pass  # 연결이 끊기면 receive 쪽에서 disconnect()가 불립니다.
+
 
 class ConnectionManager:
-    def __init__(self):
+    """
+    WebSocket마다 구독 종목을 기록하고 종목별 시청자 수를 세어 둡니다.
+    시세는 해당 종목을 보고 있는 연결에만 보내고, 시청자 수는 Redis를 통해 키움 브리지의 실시간 등록에 반영됩니다.
+    연결 직후와 구독 종목이 늘어날 때는 최신 시세 스냅샷을 먼저 보내고, 그 뒤로는 seq가 이어지는 틱만 보냅니다.
+    구독 메시지를 보내지 않는 기존 JSON 클라이언트는 예전처럼 전 종목 틱을 받습니다(firehose). 한 번이라도 구독하면 구독 종목만 받습니다.
+    """
+    def __init__(self, quotes: QuoteBook):
+        self.quotes = quotes
         self.active_connections: list[WebSocket] = []
+        self.subscriptions: dict[WebSocket, set] = {}
+        self.outboxes: dict[WebSocket, Outbox] = {}
+        self.viewers: dict[str, set] = {}
+        self.firehose: set[WebSocket] = set()
+        self.viewers_version = 0  # 시청 중인 종목 집합이 바뀔 때마다 증가합니다. (샤드 채널 구독 갱신용)
+        self.demand_changed = asyncio.Event()
+        self._refresh_lock = asyncio.Lock()
+        self._refreshed_at = 0.0
+
+    async def refresh_unwatched(self, redis_raw):
+        """
+        일부 샤드만 구독하는 워커는 아무도 보지 않는 종목의 틱을 받지 않아 메모리 시세가 오래됐을 수 있습니다.
+        전 종목 스냅샷을 보내기 전에 리더가 올려 둔 Redis 시세로 덮어씁니다. 보고 있는 종목은 메모리 값이 더 최신이라 그대로 둡니다.
+        연결이 몰려도 PARTIAL_FEED_QUOTE_REFRESH_SECONDS에 한 번만 읽습니다.
+        """
+        async with self._refresh_lock:
+            if time.monotonic() - self._refreshed_at < PARTIAL_FEED_QUOTE_REFRESH_SECONDS:
+                return
+            try:
+                await self.quotes.refresh(redis_raw, keep=set(self.viewers))
+            except Exception as e:
+                print(f"Failed to refresh quotes from Redis before snapshot: {e}")
+            self._refreshed_at = time.monotonic()
 
-    async def connect(self, websocket: WebSocket):
-        await websocket.accept()
+    async def connect(self, websocket: WebSocket, redis_raw=None, full_feed: bool = True):
+        # 클라이언트가 tick.bin.v1 서브프로토콜을 요청하면 바이너리 프레임, 아니면 기존 JSON으로 보냅니다.
+        binary = TICK_SUBPROTOCOL in websocket.scope.get("subprotocols", [])
+        await websocket.accept(subprotocol=TICK_SUBPROTOCOL if binary else None)
+        if not full_feed and redis_raw is not None:
+            await self.refresh_unwatched(redis_raw)
         self.active_connections.append(websocket)
+        self.subscriptions[websocket] = set()
+        if not binary:
+            self._set_firehose(websocket, True)
+        outbox = self.outboxes[websocket] = Outbox(websocket, binary)
+        outbox.task = asyncio.create_task(outbox.run())
+        self.send_snapshot(websocket, None)
 
     def disconnect(self, websocket: WebSocket):
         self.active_connections.remove(websocket)
+        self.set_subscriptions(websocket, set())
+        self._set_firehose(websocket, False)
+        del self.subscriptions[websocket]
+        self.outboxes.pop(websocket).task.cancel()
+
+    def _set_firehose(self, websocket: WebSocket, enabled: bool):
+        was_empty = not self.firehose
+        if enabled:
+            self.firehose.add(websocket)
+        else:
+            self.firehose.discard(websocket)
+        if was_empty != (not self.firehose):
+            # 전 종목을 받아야 하는 연결이 생기거나 없어지면 샤드 채널 구독을 다시 맞춥니다.
+            self.viewers_version += 1
+
+    def _snapshot_codes(self, websocket: WebSocket):
+        return None if websocket in self.firehose else sorted(self.subscriptions[websocket])
+
+    def send_snapshot(self, websocket: WebSocket, codes, replace: bool = False):
+        """
+        {"type": "snapshot", "seq": n, "full": bool, "quotes": [[코드, 현재가, 전일대비, 체결량, 등락률], ...]}
+        codes가 None이면 전 종목입니다. 스냅샷 이후 틱은 seq n+1부터 이어집니다.
+        틱 반영과 같은 이벤트 루프 단계에서 만들어 큐에 넣으므로, 스냅샷에 반영된 틱은 다시 보내지 않고 반영되지 않은 틱은 빠짐없이 뒤따릅니다.
+        replace=True는 스냅샷이 구독 종목을 모두 덮는 경우로, 아직 보내지 않은 틱을 버립니다.
+        """
+        outbox = self.outboxes[websocket]
+        if replace:
+            outbox.pending.clear()
+        outbox.seq += 1
+        outbox.push("text", json.dumps({
+            "type": "snapshot",
+            "seq": outbox.seq,
+            "full": codes is None,
+            "quotes": [list(tick) for tick in self.quotes.snapshot(codes)],
+        }))
+
+    def set_subscriptions(self, websocket: WebSocket, codes: set):
+        current = self.subscriptions[websocket]
+        codes = set(list(codes)[:MAX_CODES_PER_CONNECTION])
+        for code in current - codes:
+            self.viewers[code].discard(websocket)
+            if not self.viewers[code]:
+                del self.viewers[code]
+                self.viewers_version += 1
+                self.demand_changed.set()
+        for code in codes - current:
+            if code not in self.viewers:
+                self.viewers[code] = set()
+                self.viewers_version += 1
+                self.demand_changed.set()
+            self.viewers[code].add(websocket)
+        self.subscriptions[websocket] = codes
+        added = codes - current
+        if added and websocket in self.outboxes:
+            self.send_snapshot(websocket, sorted(added))
+
+    def handle_message(self, websocket: WebSocket, text: str):
+        # {"action": "subscribe" | "unsubscribe" | "set" | "resync", "codes": [...]}
+        try:
+            message = json.loads(text)
+            action, codes = message.get("action"), {str(code) for code in message.get("codes", [])}
+        except (ValueError, AttributeError, TypeError):
+            return
+        current = self.subscriptions[websocket]
+        if action in ("subscribe", "unsubscribe", "set") and websocket in self.firehose:
+            # 구독을 보내는 클라이언트는 구독 종목만 받습니다.
+            self._set_firehose(websocket, False)
+        if action == "subscribe":
+            self.set_subscriptions(websocket, current | codes)
+        elif action == "unsubscribe":
+            self.set_subscriptions(websocket, current - codes)
+        elif action == "set":
+            self.set_subscriptions(websocket, codes)
+        elif action == "resync":
+            # 클라이언트가 seq 누락을 발견했을 때 구독 종목 스냅샷을 다시 받습니다.
+            self.send_snapshot(websocket, self._snapshot_codes(websocket), replace=True)
+
+    def demand(self) -> dict:
+        return {code: len(connections) for code, connections in self.viewers.items()}
+
+    def send_tick(self, tick: tuple):
+        # tick = (종목코드, 현재가, 전일대비, 체결량, 등락률). 포맷별 인코딩은 틱당 한 번만 합니다.
+        self.quotes.update(tick)
+        connections = self.viewers.get(tick[0], ())
+        if self.firehose:
+            connections = self.firehose.union(connections)
+        if not connections:
+            return
+        text = frame = None
+        for connection in connections:
+            outbox = self.outboxes[connection]
+            if len(outbox.pending) >= OUTBOX_LIMIT:
+                # 따라오지 못하는 연결은 밀린 틱을 버리고 구독 종목 스냅샷으로 다시 맞춥니다.
+                self.send_snapshot(connection, self._snapshot_codes(connection), replace=True)
+                continue
+            outbox.seq += 1
+            if outbox.binary:
+                frame = frame or encode_tick(*tick)
+                outbox.push("bytes", frame)
+            else:
+                text = text or tick_to_json(*tick)
+                outbox.push("text", f'{text[:-1]}, "seq": {outbox.seq}}}')
 
     async def broadcast(self, message: str):
         for connection in self.active_connections:
             await connection.send_text(message)
 
-manager = ConnectionManager()
+quotes = QuoteBook()
+manager = ConnectionManager(quotes)
+candles = CandleAggregator()
+themes = ThemePerformance()
+snapshot = MarketSnapshot()
+CANDLE_FLUSH_INTERVAL_SECONDS = float(os.getenv("CANDLE_FLUSH_INTERVAL_SECONDS", 5))
 
-# --- Market Time Logic ---
-def is_market_open():
-    now = datetime.now().time()
-    market_open = dt_time(9, 0, 0)  # 9:00 AM
-    market_close = dt_time(15, 30, 0) # 3:30 PM
-    return market_open <= now <= market_close
+def has_full_feed() -> bool:
+    # 이 워커가 전 종목 틱을 받고 있는지. 아니면 메모리의 분봉은 일부 종목만 담고 있습니다.
+    return not REALTIME_CHANNEL_SHARDS or app.state.is_leader
+
+def wanted_channels() -> set:
+    if has_full_feed() or manager.firehose:
+        return {REALTIME_CHANNEL_PATTERN}
+    # 기본 채널은 틱 저널 재생 등 샤드 없이 발행되는 틱용입니다.
+    return {REALTIME_CHANNEL} | {realtime_channel(code) for code in manager.viewers}
 
 # --- Connection Pools and State ---
 @app.on_event("startup")
@@ -65,21 +312,98 @@ async def startup_event():
                 raise
 
     app.state.redis = redis.from_url(
-        f"redis://{os.getenv('REDIS_HOST')}:{os.getenv('REDIS_PORT')}",
+        f"redis://{os.getenv('REDIS_HOST')}:{os.getenv('REDIS_PORT')}/{os.getenv('REDIS_DB', 0)}",
         decode_responses=True
     )
-    
+    # kiwoom_realtime_data는 바이너리 틱 프레임일 수 있으므로 디코딩하지 않는 연결로 구독합니다.
+    app.state.redis_raw = redis.from_url(
+        f"redis://{os.getenv('REDIS_HOST')}:{os.getenv('REDIS_PORT')}/{os.getenv('REDIS_DB', 0)}",
+        decode_responses=False
+    )
+    app.state.is_leader = False
+    renew_leader = app.state.redis.register_script(RENEW_LEADER_SCRIPT)
+    app.state.release_leader = app.state.redis.register_script(RELEASE_LEADER_SCRIPT)
+    try:
+        print(f"Loaded {await quotes.load(app.state.redis_raw)} latest quotes from Redis.")
+    except Exception as e:
+        print(f"Failed to load latest quotes from Redis: {e}")
+
+    async def elect_leader():
+        while True:
+            try:
+                leader = bool(await app.state.redis.set(LEADER_KEY, INSTANCE_ID, nx=True, ex=LEADER_TTL_SECONDS))
+                if not leader:
+                    leader = await renew_leader(keys=[LEADER_KEY], args=[INSTANCE_ID, LEADER_TTL_SECONDS]) == 1
+            except Exception as e:
+                print(f"Leader election failed: {e}")
+                leader = False
+            if leader != app.state.is_leader:
+                print(f"{INSTANCE_ID}: stock_service leader = {leader}")
+                app.state.is_leader = leader
+            await asyncio.sleep(LEADER_RENEW_SECONDS)
+
+    async def sync_channels(pubsub, subscribed: set) -> set:
+        """
+        구독 채널을 wanted_channels()에 맞춥니다. 새로 구독하고 나서 빼므로 전환 중에 틱이 빠지지는 않고 잠깐 중복될 수 있습니다.
+        새로 구독한 샤드의 종목은 구독 이전 틱을 놓쳤으므로 Redis의 최신 시세로 채우고 해당 연결에 스냅샷을 다시 보냅니다.
+        """
+        wanted = wanted_channels()
+        added, removed = wanted - subscribed, subscribed - wanted
+        if REALTIME_CHANNEL_PATTERN in added:
+            await pubsub.psubscribe(REALTIME_CHANNEL_PATTERN)
+        if added - {REALTIME_CHANNEL_PATTERN}:
+            await pubsub.subscribe(*(added - {REALTIME_CHANNEL_PATTERN}))
+        if REALTIME_CHANNEL_PATTERN in removed:
+            await pubsub.punsubscribe(REALTIME_CHANNEL_PATTERN)
+        if removed - {REALTIME_CHANNEL_PATTERN}:
+            await pubsub.unsubscribe(*(removed - {REALTIME_CHANNEL_PATTERN}))
+        if added and subscribed and REALTIME_CHANNEL_PATTERN in wanted:
+            # 리더가 되어 전 종목을 받기 시작한 경우. 보고 있던 종목 말고는 그동안 갱신되지 않았습니다.
+            await quotes.refresh(app.state.redis_raw, keep=set(manager.viewers))
+        elif added and subscribed:
+            codes = [code for code in manager.viewers if realtime_channel(code) in added]
+            if codes:
+                await quotes.refresh(app.state.redis_raw, codes)
+                for websocket, subscriptions in manager.subscriptions.items():
+                    stale = subscriptions.intersection(codes)
+                    if stale:
+                        manager.send_snapshot(websocket, sorted(stale))
+        return wanted
+
     async def consume_prices():
         while True: # Add a loop for automatic reconnection
+            pubsub = None
             try:
-                pubsub = app.state.redis.pubsub()
-                await pubsub.subscribe("kiwoom_realtime_data")
-                print("Subscribed to kiwoom_realtime_data channel.")
+                pubsub = app.state.redis_raw.pubsub()
+                subscribed = await sync_channels(pubsub, set())
+                viewers_version, full_feed = manager.viewers_version, has_full_feed()
+                print(f"Subscribed to realtime channels: {sorted(subscribed)}")
                 while True:
-                    message = await pubsub.get_message(ignore_subscribe_messages=True, timeout=None) # Block until message
-                    if message:
-                        # print(f"Received from Redis: {message['data']}") # Debugging line
-                        await manager.broadcast(message['data'])
+                    if full_feed != has_full_feed() or (not full_feed and viewers_version != manager.viewers_version):
+                        viewers_version, full_feed = manager.viewers_version, has_full_feed()
+                        subscribed = await sync_channels(pubsub, subscribed)
+                    message = await pubsub.get_message(ignore_subscribe_messages=True, timeout=1.0)
+                    if not message:
+                        continue
+                    payload = message['data']
+                    try:
+                        if is_binary_frame(payload):
+                            ticks = list(iter_ticks(payload))
+                        else:
+                            payload = json.loads(payload)
+                            if payload.get("type") != "realtime":
+                                continue
+                            ticks = [legacy_dict_to_tick(payload["data"])]
+                    except (ValueError, KeyError, TypeError, AttributeError) as e:
+                        # 잘못된 메시지 하나 때문에 구독 전체를 다시 맺지 않도록 그 메시지만 건너뜁니다.
+                        print(f"Skipping malformed realtime message: {e}")
+                        continue
+                    now = time.time()
+                    for tick in ticks:
+                        candles.add_tick(tick[0], tick[1], tick[3], now)
+                        themes.apply(tick[0], tick[4])
+                        snapshot.apply(tick)
+                        manager.send_tick(tick)
             except redis.exceptions.ConnectionError as e:
                 print(f"Redis connection error in consume_prices: {e}. Reconnecting in 5 seconds...")
                 await asyncio.sleep(5)
@@ -87,44 +411,285 @@ async def startup_event():
                 print(f"An unexpected error occurred in consume_prices: {e}. Reconnecting in 5 seconds...")
                 await asyncio.sleep(5)
             finally:
+                if pubsub is not None:
+                    try:
+                        await pubsub.aclose()
+                    except Exception:
+                        pass
                 print("Attempting to re-subscribe to Redis channel.")
 
+    async def publish_demand():
+        # 시청자 수가 바뀌면 바로, 그렇지 않아도 TTL이 끝나기 전에 주기적으로 이 인스턴스의 수요를 다시 씁니다.
+        while True:
+            try:
+                await asyncio.wait_for(manager.demand_changed.wait(), timeout=REALTIME_DEMAND_REFRESH_SECONDS)
+            except asyncio.TimeoutError:
+                pass
+            changed = manager.demand_changed.is_set()
+            manager.demand_changed.clear()
+            try:
+                demand = manager.demand()
+                watch_key = WATCH_SCORE_KEY.format(day=now_kst().strftime("%Y%m%d"))
+                async with app.state.redis.pipeline(transaction=True) as pipe:
+                    pipe.delete(REALTIME_DEMAND_KEY)
+                    if demand:
+                        pipe.hset(REALTIME_DEMAND_KEY, mapping=demand)
+                        pipe.expire(REALTIME_DEMAND_KEY, REALTIME_DEMAND_TTL_SECONDS)
+                        # 다음 거래일 장 시작 전 예열에서 많이 본 종목을 고르는 데 씁니다.
+                        for code, viewers in demand.items():
+                            pipe.zincrby(watch_key, viewers, code)
+                        pipe.expire(watch_key, WATCH_SCORE_TTL_SECONDS)
+                    if changed:
+                        pipe.publish(REALTIME_DEMAND_CHANNEL, REALTIME_DEMAND_KEY)
+                    await pipe.execute()
+            except Exception as e:
+                print(f"Failed to publish realtime demand: {e}")
+                await asyncio.sleep(1)
+
+    async def flush_candles():
+        while True:
+            await asyncio.sleep(CANDLE_FLUSH_INTERVAL_SECONDS)
+            candles.collect_stale(time.time())
+            if not app.state.is_leader or not DB_WRITES_ENABLED:
+                candles.pending.clear()  # 리더가 같은 봉을 씁니다.
+                continue
+            try:
+                await candles.flush(app.state.db_pool)
+            except Exception as e:
+                print(f"Failed to flush intraday candles: {e}")
+
+    async def persist_quotes():
+        while True:
+            await asyncio.sleep(QUOTE_PERSIST_INTERVAL_SECONDS)
+            try:
+                await quotes.persist(app.state.redis_raw)
+            except Exception as e:
+                print(f"Failed to persist latest quotes: {e}")
+
+    async def sync_stocks():
+        # 실시간 시세를 stocks 테이블에 write-behind합니다. 주기당 UPDATE 한 번이므로 틱 속도와 무관하게 DB 쓰기 횟수가 고정됩니다.
+        while True:
+            await asyncio.sleep(STOCK_SYNC_INTERVAL_SECONDS)
+            if not app.state.is_leader or not DB_WRITES_ENABLED:
+                quotes.db_dirty.clear()
+                continue
+            try:
+                await quotes.sync_to_db(app.state.db_pool)
+            except Exception as e:
+                print(f"Failed to sync realtime prices into stocks: {e}")
+
+    async def track_themes():
+        # 전 종목 틱을 받는 워커만 테마 집계를 유지합니다. 매핑이 바뀌었거나 리더가 새로 된 경우 DB에서 다시 만듭니다.
+        loaded, checked_at = False, 0.0
+        while True:
+            await asyncio.sleep(THEME_PERSIST_INTERVAL_SECONDS)
+            if not has_full_feed():
+                loaded = False
+                continue
+            try:
+                if not loaded or (time.monotonic() - checked_at >= THEME_VERSION_CHECK_SECONDS and await themes.is_stale(app.state.redis)):
+                    print(f"Loaded {await themes.load(app.state.db_pool, app.state.redis, quotes)} themes for realtime performance.")
+                    loaded = True
+                if time.monotonic() - checked_at >= THEME_VERSION_CHECK_SECONDS:
+                    checked_at = time.monotonic()
+                if app.state.is_leader:
+                    await themes.persist(app.state.redis)
+            except Exception as e:
+                print(f"Failed to update theme performance: {e}")
+
+    def latest_snapshot_ticks():
+        # 메모리 시세는 DB보다 최신이지만, 일부 종목만 받는 워커에서는 보고 있는 종목의 시세만 믿을 수 있습니다.
+        if has_full_feed():
+            return list(quotes.quotes.values())
+        return [quotes.quotes[code] for code in manager.viewers if code in quotes.quotes]
+
+    async def refresh_snapshot():
+        while True:
+            try:
+                first, started = not snapshot.loaded, time.perf_counter()
+                size = await snapshot.load(app.state.db_pool, latest_snapshot_ticks)
+                if first:
+                    print(f"Loaded market snapshot: {size} stocks in {(time.perf_counter() - started) * 1000:.0f} ms")
+            except Exception as e:
+                print(f"Failed to reload market snapshot: {e}")
+            await asyncio.sleep(SNAPSHOT_REFRESH_SECONDS if has_full_feed() else SNAPSHOT_PARTIAL_FEED_REFRESH_SECONDS)
+
+    async def market_warmup_scheduler():
+        # 거래일 장 시작 WARMUP_LEAD_MINUTES분 전에 리더가 캐시를 예열하고, 측정 구간이 끝나면 적중률을 남깁니다.
+        while True:
+            opens = next_market_open()
+            await asyncio.sleep(max(0, (opens - timedelta(minutes=WARMUP_LEAD_MINUTES) - now_kst()).total_seconds()))
+            if app.state.is_leader and now_kst() < opens:
+                try:
+                    result = await warm_up(app.state.redis, app.state.redis_raw, app.state.db_pool, quotes, REALTIME_DEMAND_CHANNEL)
+                    print(f"Market warm-up finished in {result['duration_ms']} ms: {result['steps']}")
+                except Exception as e:
+                    print(f"Market warm-up failed: {e}")
+            await asyncio.sleep(max(0, (opens + timedelta(minutes=MEASURE_MINUTES) - now_kst()).total_seconds()))
+            if app.state.is_leader:
+                try:
+                    stats = await hit_ratio(app.state.redis, opens.strftime("%Y%m%d"))
+                    print(f"Cache hit ratio in the first {MEASURE_MINUTES} minutes after open: {stats.get('hit_ratio')} ({stats})")
+                except Exception as e:
+                    print(f"Failed to read market warm-up hit ratio: {e}")
+
+    asyncio.create_task(elect_leader())
+    asyncio.create_task(market_warmup_scheduler())
     asyncio.create_task(consume_prices())
+    asyncio.create_task(persist_quotes())
+    asyncio.create_task(sync_stocks())
+    asyncio.create_task(flush_candles())
+    asyncio.create_task(publish_demand())
+    asyncio.create_task(track_themes())
+    asyncio.create_task(refresh_snapshot())
 
 @app.on_event("shutdown")
 async def shutdown_event():
+    if app.state.is_leader:
+        if DB_WRITES_ENABLED:
+            candles.collect_stale(float("inf"))
+            try:
+                await candles.flush(app.state.db_pool)
+            except Exception as e:
+                print(f"Failed to flush intraday candles on shutdown: {e}")
+            try:
+                await quotes.sync_to_db(app.state.db_pool)
+            except Exception as e:
+                print(f"Failed to sync realtime prices into stocks on shutdown: {e}")
+        await app.state.release_leader(keys=[LEADER_KEY], args=[INSTANCE_ID])
+    try:
+        await quotes.persist(app.state.redis_raw)
+    except Exception as e:
+        print(f"Failed to persist latest quotes on shutdown: {e}")
+    await app.state.redis.delete(REALTIME_DEMAND_KEY)
+    await app.state.redis.publish(REALTIME_DEMAND_CHANNEL, REALTIME_DEMAND_KEY)
     await app.state.db_pool.close()
     await app.state.redis.close()
+    await app.state.redis_raw.close()
+
+ALL_COMPANIES_SORT = parse_sort("-market_cap")
+ALL_COMPANIES_COLUMNS = ["code", "name", "market", "currentPrice", "change_rate", "volume", "market_cap"]
 
 @app.get("/api/all-companies")
-async def get_all_companies(limit: int = 1500):
-    print("======== Request received at /api/all-companies! ========")
-    if is_market_open():
-        # During market hours, fetch from Redis cache (updated by kiwoom_realtime_server)
-        # Or, if direct real-time data is needed, stock_service would subscribe to individual codes
-        # For simplicity, we'll assume kiwoom_realtime_server pushes all data to Redis periodically
-        # and stock_service fetches from DB for initial load.
-        # For live data, the websocket is used.
-        pass # This endpoint will primarily serve historical/cached data
-
-    # Always fetch from DB for initial load, real-time updates are via websocket
-    async with app.state.db_pool.acquire() as conn:
-        stocks = await conn.fetch(
-            '''SELECT code, name, market, price AS "currentPrice", 
-                   COALESCE(change_rate, 0) AS change_rate, 
-                   COALESCE(volume, 0) AS volume, 
-                   COALESCE(market_cap, 0) AS market_cap
-            FROM stocks ORDER BY market_cap DESC NULLS LAST LIMIT $1''',
-            limit
-        )
-        return {"success": True, "data": [dict(stock) for stock in stocks]}
+async def get_all_companies(request: Request, response: Response, limit: int = 1500):
+    # 메모리 스냅샷이 있으면 거기서 시가총액 상위 limit개를 바로 고릅니다. (틱이 바로 반영된 시세)
+    # 스냅샷 버전이 그대로면 If-None-Match에 304로 답합니다. 장중에는 틱마다 버전이 바뀝니다.
+    # 시작 직후 스냅샷을 읽기 전에만 Redis 캐시를 씁니다. 스냅샷이 있는 동안은 캐시를 읽지 않으므로 market_warmup도 이 캐시는 예열하지 않습니다.
+    if snapshot.loaded:
+        etag = make_etag(snapshot.epoch, snapshot.version)
+        unchanged = not_modified(request, etag)
+        if unchanged:
+            return unchanged
+        response.headers["ETag"] = etag
+        stocks, _ = snapshot.screen(parse_filters(), ALL_COMPANIES_SORT, ALL_COMPANIES_COLUMNS, limit=max(1, limit))
+        for stock in stocks:
+            for column in ("change_rate", "volume", "market_cap"):
+                if stock[column] is None:
+                    stock[column] = 0
+        return {"success": True, "data": stocks}
+    stocks = await cached_query(
+        app.state.redis, app.state.db_pool, ALL_COMPANIES_CACHE_KEY.format(limit=limit), ALL_COMPANIES_QUERY, limit
+    )
+    return {"success": True, "data": stocks}
+
+@app.get("/api/screener")
+async def get_screener(
+    request: Request, response: Response,
+    market: str = None, theme: str = None, q: str = None,
+    per_min: float = None, per_max: float = None, pbr_min: float = None, pbr_max: float = None,
+    roe_min: float = None, roe_max: float = None, market_cap_min: float = None, market_cap_max: float = None,
+    change_rate_min: float = None, change_rate_max: float = None, volume_min: float = None, volume_max: float = None,
+    price_min: float = None, price_max: float = None,
+    sort: str = None, columns: str = None, cursor: str = None, limit: int = 100,
+):
+    """
+    조건에 맞는 종목을 정렬해 한 페이지씩 돌려줍니다.
+    market/theme는 쉼표로 여러 개, sort는 "-market_cap,per"처럼 -가 붙으면 내림차순, columns는 돌려받을 컬럼 목록입니다.
+    다음 페이지는 응답의 nextCursor를 cursor로 넘겨 받습니다. (같은 조건/정렬일 때만 유효)
+    """
+    ranges = {
+        "per_min": per_min, "per_max": per_max, "pbr_min": pbr_min, "pbr_max": pbr_max,
+        "roe_min": roe_min, "roe_max": roe_max, "market_cap_min": market_cap_min, "market_cap_max": market_cap_max,
+        "change_rate_min": change_rate_min, "change_rate_max": change_rate_max,
+        "volume_min": volume_min, "volume_max": volume_max, "price_min": price_min, "price_max": price_max,
+    }
+    limit = max(1, min(limit, SCREENER_MAX_LIMIT))
+    try:
+        filters = parse_filters(market, theme, q, ranges)
+        sort_keys = parse_sort(sort)
+        selected = parse_columns(columns)
+        after = decode_cursor(cursor, sort_keys) if cursor else None
+    except ScreenerError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    if snapshot.loaded:
+        etag = make_etag(snapshot.epoch, snapshot.version)
+        unchanged = not_modified(request, etag)
+        if unchanged:
+            return unchanged
+        response.headers["ETag"] = etag
+        data, next_cursor = snapshot.screen(filters, sort_keys, selected, after, limit)
+    else:
+        query, args = build_query(filters, sort_keys, selected, after, limit)
+        async with app.state.db_pool.acquire() as conn:
+            rows = await conn.fetch(query, *args)
+        data, next_cursor = page(rows, sort_keys, selected, limit)
+    return {"success": True, "data": data, "nextCursor": next_cursor}
+
+@app.get("/api/themes")
+async def get_themes():
+    # 목록은 stock_worker가 테마를 동기화할 때 캐시를 지우므로 TTL 동안 DB를 다시 읽지 않습니다.
+    data = await cached_query(app.state.redis, app.state.db_pool, THEMES_CACHE_KEY, THEMES_QUERY)
+    return {"success": True, "data": data}
+
+@app.get("/api/themes/performance")
+async def get_theme_performance(limit: int = 20, sort: str = "desc"):
+    """
+    테마별 구성 종목의 실시간 평균 등락률. sort는 desc(상승률 순), asc(하락률 순), count(종목 수 순)입니다.
+    """
+    if sort not in ("desc", "asc", "count"):
+        raise HTTPException(status_code=400, detail="sort must be one of desc, asc, count")
+    limit = max(1, min(limit, 500))
+    if has_full_feed() and themes.totals:
+        updated_at, data = themes.updated_at, themes.summary()
+    else:
+        stored = await load_persisted(app.state.redis)
+        updated_at, data = stored["updatedAt"], stored["themes"]
+    return {"success": True, "updatedAt": updated_at, "data": rank_themes(data, sort, limit)}
+
+@app.get("/api/market/warmup")
+async def get_market_warmup(day: str = None):
+    """
+    예열 소요 시간(단계별 ms)과 장 시작 후 측정 구간의 캐시 적중률. day는 YYYYMMDD, 기본은 오늘입니다.
+    """
+    return {"success": True, "data": await hit_ratio(app.state.redis, day)}
+
+@app.get("/api/candles/{code}")
+async def get_candles(code: str, interval: str = "1m", limit: int = 120):
+    """
+    최근 분봉을 메모리 링 버퍼에서 바로 반환합니다. 재시작 직후처럼 메모리에 부족하면 앞부분을 DB에서 채웁니다.
+    """
+    if interval not in INTERVALS:
+        raise HTTPException(status_code=400, detail=f"interval must be one of {list(INTERVALS)}")
+    limit = max(1, min(limit, 1000))
+    rows = candles.recent(code, interval, limit) if has_full_feed() else []
+    if len(rows) < limit:
+        before = datetime.fromtimestamp(rows[0]["time"], tz=timezone.utc) if rows else datetime.now(timezone.utc) + timedelta(days=1)
+        async with app.state.db_pool.acquire() as conn:
+            older = await conn.fetch(
+                """SELECT extract(epoch FROM start_at)::bigint AS time, open, high, low, close, volume
+                   FROM intraday_candles WHERE code = $1 AND interval = $2 AND start_at < $3
+                   ORDER BY start_at DESC LIMIT $4""",
+                code, interval, before, limit - len(rows)
+            )
+        rows = [dict(r) for r in reversed(older)] + rows
+    return {"success": True, "data": rows}
 
 @app.websocket("/ws/realtime-price")
 async def websocket_realtime_price(websocket: WebSocket):
-    await manager.connect(websocket)
+    await manager.connect(websocket, app.state.redis_raw, has_full_feed())
     try:
         while True:
-            # Keep the connection alive
-            await websocket.receive_text()
+            # 클라이언트는 화면에 보이는 종목을 {"action": "set", "codes": [...]}로 알려 줍니다.
+            manager.handle_message(websocket, await websocket.receive_text())
     except WebSocketDisconnect:
         manager.disconnect(websocket)
\ No newline at end of file
@@ -1,10 +1,21 @@
 import os
 import redis
+import psycopg2
 import json
 import time
 import uuid
 import logging
+from datetime import datetime, timedelta, timezone
 from logging.handlers import RotatingFileHandler
+from ohlcv_store import OHLCVStore, parse_kiwoom_daily_bars
+from backtest_cache import invalidate_symbol, bump_data_version
+from theme_index import sync_themes
+
+TR_REQUEST_STREAM = "kiwoom_tr_requests"  # kiwoom_realtime_server.tr_request_bridge가 컨슈머 그룹으로 읽습니다.
+TR_REQUEST_STREAM_MAXLEN = 10000
+BULK_QUOTE_BATCH_SIZE = 100  # KiwoomAPI.get_stock_basic_info_bulk(CommKwRqData) 한 번의 TR 최대 종목 수
+KST = timezone(timedelta(hours=9))
+DAILY_BARS_HOUR = int(os.getenv("DAILY_BARS_HOUR", 18))  # 장 마감 후 일봉 수집 시각 (KST)
 
 # --- 로깅 설정 ---
 log_dir = "logs"
@@ -22,6 +33,7 @@ worker_logger.addHandler(logging.StreamHandler())
 class StockWorker:
     def __init__(self):
         self.redis_client = self._connect_to_redis()
+        self.ohlcv_store = OHLCVStore()
 
     def _connect_to_redis(self):
         redis_host = os.getenv("REDIS_HOST", "redis")
@@ -37,27 +49,34 @@ class StockWorker:
                 time.sleep(5)
 
     def request_kiwoom_tr(self, request_type, payload=None, timeout=60):
+        """
+        kiwoom_tr_requests 스트림에 요청을 넣고 개인 응답 리스트를 기다립니다.
+        브리지가 잠시 내려가 있어도 요청은 스트림에 남아 있다가 처리되고, timeout이 지난 요청은 브리지가 버립니다.
+        """
         request_id = str(uuid.uuid4())
+        response_key = f'kiwoom_tr_response:{request_id}'
         message = {
             "request_id": request_id,
             "request_type": request_type,
-            "payload": payload or {}
+            "payload": json.dumps(payload or {}),
+            "reply_to": response_key,
+            "expires_at": int((time.time() + timeout) * 1000),
         }
-        
-        response_key = f'kiwoom_tr_response:{request_id}'
-        
-        worker_logger.info(f"Sent TR request '{request_type}' with ID {request_id} to Redis.")
-        self.redis_client.publish('kiwoom_tr_request', json.dumps(message))
-        
-        worker_logger.info(f"Waiting for response in personal mailbox: {response_key}")
+
+        self.redis_client.xadd(TR_REQUEST_STREAM, message, maxlen=TR_REQUEST_STREAM_MAXLEN, approximate=True)
+        worker_logger.info(f"Queued TR request '{request_type}' with ID {request_id} on stream '{TR_REQUEST_STREAM}'.")
+
         response_tuple = self.redis_client.blpop(response_key, timeout=timeout)
-        
+
         if response_tuple is None:
             worker_logger.error(f"TR request {request_id} timed out after {timeout} seconds.")
             return None
-        
+
         response_data = json.loads(response_tuple[1])
-        worker_logger.info(f"Received TR response for request ID {request_id}.")
+        if response_data.get('error'):
+            worker_logger.error(f"TR request {request_id} failed: {response_data['error']}")
+        else:
+            worker_logger.info(f"Received TR response for request ID {request_id}.")
         return response_data.get('data')
 
     def update_all_stock_details(self):
@@ -74,18 +93,22 @@ class StockWorker:
         worker_logger.info(f"Found {total_stocks} total stocks. Fetching details...")
         
         all_stock_data = []
-        for i, code in enumerate(all_codes):
-            worker_logger.info(f" -> [{i+1}/{total_stocks}] Fetching details for {code}...")
-            details = self.request_kiwoom_tr('get_stock_details', {'code': code}, timeout=30)
-            
+        # OPTKWFID(관심종목) TR은 한 번에 최대 100개 종목을 조회하므로 TR 수가 종목 수의 1/100로 줄어듭니다.
+        batches = [all_codes[i:i + BULK_QUOTE_BATCH_SIZE] for i in range(0, total_stocks, BULK_QUOTE_BATCH_SIZE)]
+        for i, batch in enumerate(batches):
+            worker_logger.info(f" -> [{i+1}/{len(batches)}] Fetching details for {len(batch)} stocks ({batch[0]}...)")
+            details = self.request_kiwoom_tr('get_stock_details_bulk', {'codes': batch}, timeout=60)
+
             if details:
-                all_stock_data.append(details)
+                all_stock_data.extend(details)
+                missing = len(batch) - len(details)
+                if missing:
+                    worker_logger.warning(f"{missing} stocks missing from bulk response starting at {batch[0]}.")
             else:
-                worker_logger.warning(f"Could not fetch details for {code}. Skipping.")
-            
-            # <<< 여기가 핵심 변경 사항입니다! >>>
-            # Kiwoom의 시간당 TR 요청 제한을 피하기 위해 3.6초 대기합니다.
-            # 이로 인해 전체 데이터 수집에 약 4시간이 소요될 수 있습니다. (4139 * 3.6 / 3600)
+                worker_logger.warning(f"Could not fetch details for batch starting at {batch[0]}. Skipping.")
+
+            # Kiwoom의 시간당 TR 요청 제한을 피하기 위해 요청 사이에 3.6초 대기합니다.
+            # 종목당 1 TR일 때는 약 4시간이 걸렸지만, 100개 단위로 묶으면 약 3분이면 끝납니다. (42 * 3.6 / 60)
             time.sleep(3.6)
 
         if all_stock_data:
@@ -100,6 +123,97 @@ class StockWorker:
         worker_logger.info("--- Full stock data update cycle finished ---")
         return True # 성공적으로 완료되었음을 반환
 
+    def _connect_to_db(self):
+        while True:
+            try:
+                return psycopg2.connect(
+                    dbname=os.getenv("POSTGRES_DB"),
+                    user=os.getenv("POSTGRES_USER"),
+                    password=os.getenv("POSTGRES_PASSWORD"),
+                    host=os.getenv("POSTGRES_HOST", "postgres"),
+                    port=os.getenv("POSTGRES_PORT", 5432)
+                )
+            except psycopg2.OperationalError as e:
+                worker_logger.error(f"🔥 PostgreSQL 연결 실패: {e}. 5초 후 재시도합니다.")
+                time.sleep(5)
+
+    def update_themes(self):
+        """
+        키움 테마 그룹을 받아 themes / stock_themes 테이블에 동기화합니다.
+        """
+        groups = self.request_kiwoom_tr('get_theme_groups', timeout=120)
+        if not groups:
+            worker_logger.warning("No theme groups returned from Kiwoom. Keeping existing themes.")
+            return None
+        conn = self._connect_to_db()
+        try:
+            result = sync_themes(conn, self.redis_client, groups)
+        except Exception:
+            conn.rollback()
+            raise
+        finally:
+            conn.close()
+        worker_logger.info(f"✅ Synced themes: {result}")
+        return result
+
+    def ingest_daily_bars(self, code, db_conn, base_date=None):
+        """
+        키움 OPT10081 일봉을 받아 OHLCV 저장소(종목/연도 파티션)에 병합합니다. backtest_worker가 이 저장소를 읽습니다.
+        """
+        rows = self.request_kiwoom_tr('get_daily_bars', {'code': code, 'base_date': base_date}, timeout=120)
+        if not rows:
+            worker_logger.warning(f"No daily bars returned for {code}.")
+            return 0
+        written = self.ohlcv_store.write(code, parse_kiwoom_daily_bars(rows))
+        worker_logger.info(f"✅ Stored {written} daily bars for {code}.")
+        if written:
+            # data_version을 올리면 이 종목의 이전 백테스트 결과 캐시는 더 이상 조회되지 않습니다.
+            version = bump_data_version(db_conn, code)
+            evicted = invalidate_symbol(self.redis_client, code)
+            worker_logger.info(f"{code} data_version -> {version}")
+            worker_logger.info(f"Invalidated {evicted} cached backtest results for {code}.")
+        return written
+
+    def ingest_all_daily_bars(self):
+        """
+        전 종목의 일봉을 OHLCV 저장소에 병합합니다. TR 제한 때문에 종목당 3.6초씩 걸려 전체는 2~3시간 정도 걸립니다.
+        """
+        all_codes_data = self.request_kiwoom_tr('get_all_stock_codes', timeout=120)
+        if not all_codes_data:
+            worker_logger.error("Failed to get all stock codes from Kiwoom API. Skipping daily bar ingestion.")
+            return 0
+        all_codes = all_codes_data.get('kospi_codes', []) + all_codes_data.get('kosdaq_codes', [])
+        worker_logger.info(f"--- Starting daily bar ingestion for {len(all_codes)} stocks ---")
+        total = 0
+        conn = self._connect_to_db()
+        try:
+            for i, code in enumerate(all_codes):
+                try:
+                    total += self.ingest_daily_bars(code, conn)
+                except psycopg2.Error as e:
+                    worker_logger.error(f"🔥 Daily bar ingestion failed for {code}: {e}")
+                    conn.close()
+                    conn = self._connect_to_db()
+                except Exception as e:
+                    worker_logger.error(f"🔥 Daily bar ingestion failed for {code}: {e}")
+                if (i + 1) % 100 == 0:
+                    worker_logger.info(f" -> [{i+1}/{len(all_codes)}] daily bars ingested")
+                time.sleep(3.6)
+        finally:
+            conn.close()
+        worker_logger.info(f"--- Daily bar ingestion finished: {total} bars written ---")
+        return total
+
+    def _seconds_until_next_ingestion(self):
+        now = datetime.now(KST)
+        target = now.replace(hour=DAILY_BARS_HOUR, minute=0, second=0, microsecond=0)
+        if target <= now:
+            target += timedelta(days=1)
+        # 주말에는 새 일봉이 없으므로 다음 평일로 넘깁니다.
+        while target.weekday() >= 5:
+            target += timedelta(days=1)
+        return (target - now).total_seconds()
+
     def run(self):
         worker_logger.info("--- Starting Stock Detail Worker ---")
         # 파일 시스템 대신 Redis에 데이터가 있는지 확인하여 최초 실행 여부를 결정합니다.
@@ -109,12 +223,27 @@ class StockWorker:
              self.update_all_stock_details()
         else:
              worker_logger.info("Cached data already exists in Redis. Skipping initial collection.")
-        
-        worker_logger.info("Worker has completed its initial task and will now idle.")
-        # 필요 시 주기적인 업데이트 로직을 여기에 추가할 수 있습니다.
-        # while True:
-        #     time.sleep(60 * 60 * 24) # 24시간 대기
-        #     self.update_all_stock_details()
+
+        try:
+            self.update_themes()
+        except Exception as e:
+            worker_logger.error(f"🔥 Theme sync failed: {e}")
+
+        # 저장소가 비어 있으면(첫 실행, 새 볼륨) 바로 한 번 채우고, 이후에는 매 평일 장 마감 뒤에 갱신합니다.
+        if not self.ohlcv_store.symbols():
+            worker_logger.info("OHLCV store is empty. Starting initial daily bar ingestion.")
+            try:
+                self.ingest_all_daily_bars()
+            except Exception as e:
+                worker_logger.error(f"🔥 Initial daily bar ingestion failed: {e}")
+        while True:
+            wait_seconds = self._seconds_until_next_ingestion()
+            worker_logger.info(f"Next daily bar ingestion in {wait_seconds / 3600:.1f} hours.")
+            time.sleep(wait_seconds)
+            try:
+                self.ingest_all_daily_bars()
+            except Exception as e:
+                worker_logger.error(f"🔥 Daily bar ingestion cycle failed: {e}")
 
 
 if __name__ == "__main__":
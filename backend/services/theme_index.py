@@ -0,0 +1,66 @@
+# --- 테마 인덱스 동기화 ---
+# 키움 테마 그룹(테마 → 종목 목록)을 themes / stock_themes 테이블에 맞춥니다. 바뀐 매핑만 지우고 넣습니다.
+# 동기화가 끝나면 Redis의 테마 목록 캐시를 지우고 theme_index:version을 올려서,
+# stock_service의 테마 등락률 집계가 다음 확인 때 매핑을 다시 읽게 합니다.
+# stock_service도 키 상수를 가져다 쓰므로 이 모듈은 psycopg2를 직접 import하지 않습니다. (커서만 받음)
+
+THEMES_CACHE_KEY = "cache:themes"
+THEME_INDEX_VERSION_KEY = "theme_index:version"
+MAX_THEME_NAME_LENGTH = 100
+
+
+def sync_themes(db_conn, redis_client, groups) -> dict:
+    """
+    groups: [{"code": 테마코드, "name": 테마명, "stocks": [종목코드, ...]}, ...]
+    비어 있으면(키움 조회 실패 등) 기존 테마를 지우지 않고 그대로 둡니다.
+    """
+    by_name = {}
+    for group in groups or []:
+        name = (group.get("name") or "").strip()
+        if name and len(name) <= MAX_THEME_NAME_LENGTH:
+            by_name[name] = group
+    if not by_name:
+        return {"themes": 0, "added": 0, "removed": 0, "deleted_themes": 0}
+
+    with db_conn.cursor() as cur:
+        values = b",".join(cur.mogrify("(%s, %s)", (name, group.get("code"))) for name, group in by_name.items())
+        cur.execute(
+            b"INSERT INTO themes (name, source_code) VALUES " + values +
+            b" ON CONFLICT (name) DO UPDATE SET source_code = EXCLUDED.source_code RETURNING id, name"
+        )
+        theme_ids = {name: theme_id for theme_id, name in cur.fetchall()}
+
+        cur.execute("DELETE FROM themes WHERE NOT (name = ANY(%s))", (list(by_name),))
+        deleted_themes = cur.rowcount
+
+        wanted = {(theme_ids[name], code) for name, group in by_name.items() for code in group.get("stocks", [])}
+        cur.execute("SELECT theme_id, stock_code FROM stock_themes")
+        existing = set(cur.fetchall())
+        stale, added = existing - wanted, wanted - existing
+        if stale:
+            cur.execute("""
+                DELETE FROM stock_themes st USING unnest(%s::int[], %s::text[]) AS v(theme_id, stock_code)
+                WHERE st.theme_id = v.theme_id AND st.stock_code = v.stock_code
+            """, ([t for t, _ in stale], [c for _, c in stale]))
+        inserted = 0
+        if added:
+            # stocks에 아직 없는 종목(신규 상장 등)은 다음 동기화 때 들어갑니다.
+            cur.execute("""
+                INSERT INTO stock_themes (theme_id, stock_code)
+                SELECT v.theme_id, v.stock_code FROM unnest(%s::int[], %s::text[]) AS v(theme_id, stock_code)
+                JOIN stocks s ON s.code = v.stock_code
+                ON CONFLICT DO NOTHING
+            """, ([t for t, _ in added], [c for _, c in added]))
+            inserted = cur.rowcount
+        if stale or inserted or deleted_themes:
+            cur.execute("""
+                UPDATE themes SET stock_count = (SELECT COUNT(*) FROM stock_themes WHERE theme_id = themes.id), updated_at = NOW()
+            """)
+    db_conn.commit()
+
+    if stale or inserted or deleted_themes:
+        pipe = redis_client.pipeline(transaction=False)
+        pipe.delete(THEMES_CACHE_KEY)
+        pipe.incr(THEME_INDEX_VERSION_KEY)
+        pipe.execute()
+    return {"themes": len(by_name), "added": inserted, "removed": len(stale), "deleted_themes": deleted_themes}
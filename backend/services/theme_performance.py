@@ -0,0 +1,122 @@
+import json
+import time
+
+from theme_index import THEME_INDEX_VERSION_KEY
+
+# --- 테마별 실시간 등락률 ---
+# stock_themes 매핑을 메모리에 올려 두고, 틱마다 바뀐 종목의 등락률 차이만 그 종목이 속한 테마 합계에 더합니다.
+# 테마 성과를 볼 때마다 전 종목을 GROUP BY하지 않고, 틱당 작업량은 종목이 속한 테마 수만큼입니다.
+# 전 종목 틱을 받는 리더가 집계 결과를 Redis(theme_performance)에 올리고, 나머지 워커는 그것을 읽어 응답합니다.
+
+THEME_PERFORMANCE_KEY = "theme_performance"
+THEME_PERFORMANCE_TTL_SECONDS = 30
+
+MAPPING_QUERY = """
+SELECT st.theme_id, t.name, st.stock_code, COALESCE(s.change_rate, 0) AS change_rate
+FROM stock_themes st
+JOIN themes t ON t.id = st.theme_id
+JOIN stocks s ON s.code = st.stock_code
+"""
+
+
+class ThemePerformance:
+    def __init__(self):
+        self.version = None
+        self.names: dict[int, str] = {}
+        self.code_themes: dict[str, tuple] = {}
+        self.rates: dict[str, float] = {}
+        # 테마 id → [등락률 합, 종목 수, 상승 종목 수, 하락 종목 수]
+        self.totals: dict[int, list] = {}
+        self.updated_at = 0.0
+
+    async def load(self, pool, redis_client, quotes=None) -> int:
+        """
+        DB의 매핑과 등락률로 집계를 처음부터 다시 만듭니다. 메모리의 최신 시세가 있으면 DB 값보다 우선합니다.
+        """
+        version = await redis_client.get(THEME_INDEX_VERSION_KEY)
+        async with pool.acquire() as conn:
+            rows = await conn.fetch(MAPPING_QUERY)
+        names, code_themes, rates = {}, {}, {}
+        for row in rows:
+            names[row["theme_id"]] = row["name"]
+            code_themes.setdefault(row["stock_code"], []).append(row["theme_id"])
+            rates[row["stock_code"]] = float(row["change_rate"])
+        if quotes is not None:
+            for code in rates:
+                tick = quotes.quotes.get(code)
+                if tick is not None:
+                    rates[code] = tick[4]
+        totals = {theme_id: [0.0, 0, 0, 0] for theme_id in names}
+        for code, theme_ids in code_themes.items():
+            rate = rates[code]
+            for theme_id in theme_ids:
+                total = totals[theme_id]
+                total[0] += rate
+                total[1] += 1
+                total[2] += rate > 0
+                total[3] += rate < 0
+        self.version = version
+        self.names, self.rates, self.totals = names, rates, totals
+        self.code_themes = {code: tuple(theme_ids) for code, theme_ids in code_themes.items()}
+        self.updated_at = time.time()
+        return len(names)
+
+    async def is_stale(self, redis_client) -> bool:
+        # stock_worker가 매핑을 바꾸면 theme_index:version이 올라갑니다.
+        return await redis_client.get(THEME_INDEX_VERSION_KEY) != self.version
+
+    def apply(self, code: str, rate: float):
+        theme_ids = self.code_themes.get(code)
+        if not theme_ids:
+            return
+        previous = self.rates[code]
+        if rate == previous:
+            return
+        self.rates[code] = rate
+        delta = rate - previous
+        up = (rate > 0) - (previous > 0)
+        down = (rate < 0) - (previous < 0)
+        for theme_id in theme_ids:
+            total = self.totals[theme_id]
+            total[0] += delta
+            total[2] += up
+            total[3] += down
+        self.updated_at = time.time()
+
+    def summary(self) -> list[dict]:
+        return [
+            {
+                "id": theme_id,
+                "name": self.names[theme_id],
+                "avgChangeRate": round(total[0] / total[1], 2) if total[1] else 0.0,
+                "stockCount": total[1],
+                "upCount": total[2],
+                "downCount": total[3],
+            }
+            for theme_id, total in self.totals.items()
+        ]
+
+    async def persist(self, redis_client):
+        await redis_client.set(
+            THEME_PERFORMANCE_KEY,
+            json.dumps({"updatedAt": self.updated_at, "themes": self.summary()}, ensure_ascii=False),
+            ex=THEME_PERFORMANCE_TTL_SECONDS,
+        )
+
+
+async def load_persisted(redis_client) -> dict:
+    stored = await redis_client.get(THEME_PERFORMANCE_KEY)
+    return json.loads(stored) if stored else {"updatedAt": None, "themes": []}
+
+
+def rank_themes(themes: list[dict], sort: str = "desc", limit: int = 20) -> list[dict]:
+    """
+    sort: desc(상승률 순), asc(하락률 순), count(종목 수 순)
+    """
+    if sort == "count":
+        key = lambda theme: (-theme["stockCount"], theme["name"])
+    elif sort == "asc":
+        key = lambda theme: (theme["avgChangeRate"], theme["name"])
+    else:
+        key = lambda theme: (-theme["avgChangeRate"], theme["name"])
+    return sorted(themes, key=key)[:limit]
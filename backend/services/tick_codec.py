@@ -0,0 +1,127 @@
+import os
+import json
+import zlib
+import struct
+import time
+
+# --- 실시간 체결 틱 바이너리 프레임 ---
+# 키움 브리지 → Redis → stock_service → WebSocket 구간에서 JSON 대신 쓸 수 있는 고정 길이 포맷입니다.
+# <  little-endian
+# B  프레임 버전 (JSON 메시지의 첫 바이트 '{'와 겹치지 않음). 틱 저널이 재생한 프레임은 TICK_REPLAY_FRAME_VERSION입니다.
+# 6s 종목코드 (ASCII)
+# i  현재가 (원)
+# i  전일대비 (원, 부호 포함)
+# i  체결량 (+매수 / -매도 체결)
+# h  등락률 (0.01% 단위 정수, 예: -1.23% → -123)
+# WebSocket 메시지 하나에 여러 프레임을 이어 붙여 보낼 수 있습니다.
+# /ws/realtime-price에서는 프레임 하나가 seq 하나에 해당합니다. (seq 기준값은 JSON 스냅샷 메시지로 받습니다.)
+
+TICK_SUBPROTOCOL = "tick.bin.v1"
+TICK_FRAME_VERSION = 1
+TICK_REPLAY_FRAME_VERSION = 2  # 형식은 같고, 틱 저널 기록기가 재생된 틱을 다시 기록하지 않도록 구분만 합니다.
+TICK_STRUCT = struct.Struct("<B6siiih")
+TICK_SIZE = TICK_STRUCT.size
+RATE_SCALE = 100
+
+# --- 실시간 채널 ---
+# REALTIME_CHANNEL_SHARDS가 0이면 모든 틱을 kiwoom_realtime_data 하나로 발행하고,
+# N이면 kiwoom_realtime_data:{crc32(코드) % N}으로 나눠 발행합니다. 전 종목이 필요한 구독자는 패턴으로 구독하면 두 경우 모두 받습니다.
+# 부하 테스트처럼 운영 채널과 섞이면 안 되는 경우에만 REALTIME_CHANNEL로 바꿉니다. (Pub/Sub 채널은 Redis DB 번호와 무관합니다)
+DEFAULT_REALTIME_CHANNEL = "kiwoom_realtime_data"
+REALTIME_CHANNEL = os.getenv("REALTIME_CHANNEL", DEFAULT_REALTIME_CHANNEL)
+REALTIME_CHANNEL_PATTERN = REALTIME_CHANNEL + "*"
+REALTIME_CHANNEL_SHARDS = int(os.getenv("REALTIME_CHANNEL_SHARDS", 0))
+
+
+def realtime_channel(code: str) -> str:
+    if not REALTIME_CHANNEL_SHARDS:
+        return REALTIME_CHANNEL
+    return f"{REALTIME_CHANNEL}:{zlib.crc32(code.encode('ascii')) % REALTIME_CHANNEL_SHARDS}"
+
+
+def encode_tick(code: str, price: int, change: int, volume: int, change_rate: float) -> bytes:
+    return TICK_STRUCT.pack(TICK_FRAME_VERSION, code.encode("ascii"), price, change, volume, round(change_rate * RATE_SCALE))
+
+
+def is_binary_frame(payload) -> bool:
+    return isinstance(payload, (bytes, bytearray)) and len(payload) >= TICK_SIZE and payload[0] in (TICK_FRAME_VERSION, TICK_REPLAY_FRAME_VERSION)
+
+
+def is_replay_frame(payload) -> bool:
+    return is_binary_frame(payload) and payload[0] == TICK_REPLAY_FRAME_VERSION
+
+
+def mark_replay(frames: bytes) -> bytes:
+    """
+    이어 붙인 프레임의 버전 바이트를 모두 TICK_REPLAY_FRAME_VERSION으로 바꿉니다.
+    """
+    marked = bytearray(frames)
+    marked[0::TICK_SIZE] = bytes([TICK_REPLAY_FRAME_VERSION]) * (len(marked) // TICK_SIZE + (len(marked) % TICK_SIZE > 0))
+    return bytes(marked)
+
+
+def iter_ticks(buffer: bytes):
+    """
+    이어 붙인 프레임에서 (종목코드, 현재가, 전일대비, 체결량, 등락률) 튜플을 차례로 꺼냅니다.
+    """
+    for version, code, price, change, volume, rate in TICK_STRUCT.iter_unpack(buffer[:len(buffer) - len(buffer) % TICK_SIZE]):
+        yield code.decode("ascii"), price, change, volume, rate / RATE_SCALE
+
+
+def tick_to_json(code: str, price: int, change: int, volume: int, change_rate: float) -> str:
+    # /ws/realtime-price의 기존 JSON 클라이언트용 메시지
+    return json.dumps({"type": "realtime-price", "code": code, "price": price, "change_rate": change_rate})
+
+
+def tick_to_legacy_dict(code: str, price: int, change: int, volume: int, change_rate: float) -> dict:
+    # kiwoom_realtime_data 채널의 기존 JSON 포맷 ({"type": "realtime", "data": ...}의 data)
+    # change는 기존 클라이언트와 맞춰 절댓값이고, 부호 있는 전일대비와 체결량은 signedChange/tradeVolume으로 함께 보냅니다.
+    return {
+        "stockCode": code, "currentPrice": str(price), "changeRate": f"{change_rate:.2f}", "change": str(abs(change)),
+        "signedChange": str(change), "tradeVolume": str(volume),
+    }
+
+
+def legacy_dict_to_tick(data: dict) -> tuple:
+    """
+    tick_to_legacy_dict의 역변환. signedChange/tradeVolume이 없는 예전 메시지는 등락률 부호로 전일대비 부호를 정하고 체결량은 0입니다.
+    """
+    change_rate = float(data.get("changeRate") or 0)
+    if data.get("signedChange") is not None:
+        change = int(data["signedChange"])
+    else:
+        change = int(data.get("change") or 0)
+        change = -abs(change) if change_rate < 0 else abs(change)
+    return data["stockCode"], int(data.get("currentPrice") or 0), change, int(data.get("tradeVolume") or 0), change_rate
+
+
+def benchmark(n: int = 100000):
+    """
+    틱 하나당 바이트 수와 인코딩/디코딩 시간(µs)을 JSON 경로와 비교합니다.
+    python tick_codec.py 로 실행합니다.
+    """
+    ticks = [(f"{i % 2000:06d}", 70000 + i % 500, (i % 300) - 150, (i % 50) - 25, ((i % 600) - 300) / 100) for i in range(n)]
+
+    def measure(encode, decode):
+        start = time.perf_counter()
+        frames = [encode(tick) for tick in ticks]
+        encoded = time.perf_counter()
+        for frame in frames:
+            decode(frame)
+        decoded = time.perf_counter()
+        return sum(len(f) for f in frames) / n, (encoded - start) / n * 1e6, (decoded - encoded) / n * 1e6
+
+    results = {
+        "json": measure(
+            lambda t: json.dumps({"type": "realtime", "data": tick_to_legacy_dict(*t)}).encode(),
+            json.loads,
+        ),
+        "binary": measure(lambda t: encode_tick(*t), lambda f: next(iter_ticks(f))),
+    }
+    for name, (size, encode_us, decode_us) in results.items():
+        print(f"{name:>6}: {size:6.1f} bytes/tick, encode {encode_us:5.2f} µs, decode {decode_us:5.2f} µs")
+    return results
+
+
+if __name__ == "__main__":
+    benchmark()
@@ -0,0 +1,339 @@
+import os
+import sys
+import json
+import time
+import zlib
+import struct
+import asyncio
+import argparse
+from datetime import datetime, timedelta, timezone
+
+import numpy as np
+import redis.asyncio as redis
+from redis.exceptions import ConnectionError as RedisConnectionError
+
+from tick_codec import (
+    REALTIME_CHANNEL, REALTIME_CHANNEL_PATTERN, TICK_SIZE,
+    encode_tick, is_binary_frame, is_replay_frame, legacy_dict_to_tick, mark_replay,
+)
+
+# --- 실시간 틱 저널 ---
+# kiwoom_realtime_data 채널(샤드 채널 포함)의 모든 틱을 append-only 세그먼트 파일에 기록하고, 원하는 시간 구간을 같은 채널로 다시 재생합니다.
+# 레이아웃: {root}/{YYYYMMDD}/shard-{NN}.ticks  레코드 = int64 수신시각(ns) + tick_codec 프레임(21바이트), 고정 29바이트
+#           {root}/{YYYYMMDD}/shard-{NN}.idx    INDEX_STRIDE 레코드마다 (수신시각, 레코드 번호) int64 쌍
+# 종목은 crc32(코드) % SHARDS로 샤드를 정하고, 날짜는 한국 시간 기준입니다.
+# 샤드 안의 수신시각은 단조 증가하므로 np.memmap으로 연 뒤 인덱스 → searchsorted 순서로 구간을 찾습니다.
+# 기록 쪽은 샤드마다 미리 잡아 둔 bytearray에 pack_into로 채워 한 번에 write하므로, 장중 내내 틱 수에 비례하는 객체가 쌓이지 않습니다.
+# 재생은 프레임 버전을 TICK_REPLAY_FRAME_VERSION으로 바꿔 발행하고, 기록기는 그 메시지만 건너뜁니다. 재생 중에도 실시간 틱은 계속 기록됩니다.
+
+DEFAULT_ROOT = os.getenv("TICK_JOURNAL_DIR", "data/tick_journal")
+SHARDS = int(os.getenv("TICK_JOURNAL_SHARDS", 8))
+CHANNEL = REALTIME_CHANNEL
+KST = timezone(timedelta(hours=9))
+
+TS_STRUCT = struct.Struct("<q")
+RECORD_SIZE = TS_STRUCT.size + TICK_SIZE
+RECORD_DTYPE = np.dtype({
+    "names": ["ts_ns", "version", "code", "price", "change", "volume", "rate"],
+    "formats": ["<i8", "u1", "S6", "<i4", "<i4", "<i4", "<i2"],
+    "offsets": [0, 8, 9, 15, 19, 23, 27],
+    "itemsize": RECORD_SIZE,
+})
+# 레코드에서 프레임 부분만 보는 뷰. 재생할 때 다시 인코딩하지 않고 그대로 이어 붙여 발행합니다.
+FRAME_DTYPE = np.dtype({"names": ["frame"], "formats": [f"V{TICK_SIZE}"], "offsets": [TS_STRUCT.size], "itemsize": RECORD_SIZE})
+INDEX_DTYPE = np.dtype([("ts_ns", "<i8"), ("record", "<i8")])
+INDEX_STRUCT = struct.Struct("<qq")
+INDEX_STRIDE = 4096
+
+BUFFER_RECORDS = int(os.getenv("TICK_JOURNAL_BUFFER_RECORDS", 8192))
+FLUSH_INTERVAL_SECONDS = 0.2
+REPLAY_CHUNK_SECONDS = 10       # 저널 시간 기준으로 이만큼씩 읽어서 병합합니다.
+REPLAY_BATCH_MS = 10            # 저널 시간 기준으로 이 간격 안의 틱은 메시지 하나로 묶어 발행합니다.
+
+
+def shard_of(code: str) -> int:
+    return zlib.crc32(code.encode("ascii")) % SHARDS
+
+
+def day_of(ts_ns: int) -> str:
+    return datetime.fromtimestamp(ts_ns / 1e9, tz=KST).strftime("%Y%m%d")
+
+
+def _segment_paths(root: str, day: str, shard: int) -> tuple[str, str]:
+    base = os.path.join(root, day, f"shard-{shard:02d}")
+    return base + ".ticks", base + ".idx"
+
+
+class _Segment:
+    """
+    한 (날짜, 샤드) 세그먼트에 대한 기록 핸들. 버퍼가 차거나 flush()가 불리면 데이터를 먼저 쓰고 인덱스를 씁니다.
+    """
+
+    def __init__(self, root: str, day: str, shard: int):
+        self.data_path, self.index_path = _segment_paths(root, day, shard)
+        os.makedirs(os.path.dirname(self.data_path), exist_ok=True)
+        self.buffer = bytearray(BUFFER_RECORDS * RECORD_SIZE)
+        self.used = 0
+        self.index_pending = bytearray()
+        self.count, self.last_ts = self._recover()
+        self.data = open(self.data_path, "ab", buffering=0)
+        self.index = open(self.index_path, "ab", buffering=0)
+
+    def _recover(self) -> tuple[int, int]:
+        # 중간에 끊긴 마지막 레코드를 잘라내고, 인덱스는 데이터에서 다시 만듭니다.
+        if not os.path.exists(self.data_path):
+            open(self.index_path, "wb").close()
+            return 0, 0
+        count = os.path.getsize(self.data_path) // RECORD_SIZE
+        os.truncate(self.data_path, count * RECORD_SIZE)
+        last_ts = 0
+        index = np.zeros(0, dtype=INDEX_DTYPE)
+        if count:
+            records = np.memmap(self.data_path, dtype=RECORD_DTYPE, mode="r", shape=(count,))
+            last_ts = int(records["ts_ns"][-1])
+            index = np.zeros((count + INDEX_STRIDE - 1) // INDEX_STRIDE, dtype=INDEX_DTYPE)
+            index["ts_ns"] = records["ts_ns"][::INDEX_STRIDE]
+            index["record"] = np.arange(0, count, INDEX_STRIDE)
+            del records
+        index.tofile(self.index_path)
+        return count, last_ts
+
+    def append(self, ts_ns: int, frame: bytes):
+        if self.used == len(self.buffer):
+            self.flush()
+        ts_ns = max(ts_ns, self.last_ts)  # 시계가 뒤로 가도 세그먼트 안의 시각은 단조 증가를 유지합니다.
+        if self.count % INDEX_STRIDE == 0:
+            self.index_pending += INDEX_STRUCT.pack(ts_ns, self.count)
+        TS_STRUCT.pack_into(self.buffer, self.used, ts_ns)
+        self.buffer[self.used + TS_STRUCT.size:self.used + RECORD_SIZE] = frame
+        self.used += RECORD_SIZE
+        self.count += 1
+        self.last_ts = ts_ns
+
+    def flush(self):
+        if self.used:
+            with memoryview(self.buffer) as view:
+                self.data.write(view[:self.used])
+            self.used = 0
+        if self.index_pending:
+            self.index.write(self.index_pending)
+            self.index_pending.clear()
+
+    def close(self):
+        self.flush()
+        os.fsync(self.data.fileno())
+        os.fsync(self.index.fileno())
+        self.data.close()
+        self.index.close()
+
+
+class TickJournalWriter:
+    def __init__(self, root: str = DEFAULT_ROOT):
+        self.root = root
+        self.day = None
+        self.day_range = (0, 0)  # 현재 날짜의 [시작, 끝) ns. 메시지마다 날짜를 다시 계산하지 않기 위해 둡니다.
+        self.segments: dict[int, _Segment] = {}
+
+    def _segment(self, shard: int) -> _Segment:
+        segment = self.segments.get(shard)
+        if segment is None:
+            segment = self.segments[shard] = _Segment(self.root, self.day, shard)
+        return segment
+
+    def append_frames(self, ts_ns: int, payload: bytes) -> int:
+        """
+        한 Redis 메시지에 담긴 프레임(여러 개일 수 있음)을 같은 수신시각으로 기록합니다.
+        """
+        if not self.day_range[0] <= ts_ns < self.day_range[1]:
+            self.close()
+            self.day = day_of(ts_ns)
+            start = datetime.strptime(self.day, "%Y%m%d").replace(tzinfo=KST)
+            self.day_range = (int(start.timestamp()) * 1_000_000_000, int((start + timedelta(days=1)).timestamp()) * 1_000_000_000)
+        n = len(payload) // TICK_SIZE
+        for i in range(n):
+            frame = payload[i * TICK_SIZE:(i + 1) * TICK_SIZE]
+            self._segment(zlib.crc32(frame[1:7]) % SHARDS).append(ts_ns, frame)
+        return n
+
+    def flush(self):
+        for segment in self.segments.values():
+            segment.flush()
+
+    def close(self):
+        for segment in self.segments.values():
+            segment.close()
+        self.segments = {}
+
+
+class TickJournalReader:
+    def __init__(self, root: str = DEFAULT_ROOT):
+        self.root = root
+
+    def _open(self, day: str, shard: int):
+        data_path, index_path = _segment_paths(self.root, day, shard)
+        if not os.path.exists(data_path):
+            return None, None
+        count = os.path.getsize(data_path) // RECORD_SIZE
+        if not count:
+            return None, None
+        records = np.memmap(data_path, dtype=RECORD_DTYPE, mode="r", shape=(count,))
+        index = np.fromfile(index_path, dtype=INDEX_DTYPE) if os.path.exists(index_path) else np.zeros(0, dtype=INDEX_DTYPE)
+        return records, index[index["record"] < count]
+
+    @staticmethod
+    def _locate(records, index, ts_ns: int) -> int:
+        # 인덱스로 INDEX_STRIDE 블록 하나를 고른 뒤 그 안에서만 이진 탐색합니다.
+        lo, hi = 0, len(records)
+        if len(index):
+            block = int(np.searchsorted(index["ts_ns"], ts_ns, side="left"))
+            if block > 0:
+                lo = int(index["record"][block - 1])
+            if block < len(index):
+                hi = int(index["record"][block]) + 1
+        return lo + int(np.searchsorted(records["ts_ns"][lo:hi], ts_ns, side="left"))
+
+    def read_range(self, day: str, start_ns: int, end_ns: int, codes=None, chunk_seconds: int = REPLAY_CHUNK_SECONDS):
+        """
+        [start_ns, end_ns) 구간의 레코드를 수신시각 순으로 chunk_seconds 단위 배열로 반환합니다.
+        codes를 주면 그 종목이 속한 샤드만 열고 해당 종목만 남깁니다.
+        """
+        shards = range(SHARDS) if not codes else sorted({shard_of(code) for code in codes})
+        wanted = np.array([code.encode("ascii") for code in codes], dtype="S6") if codes else None
+        opened = [pair for pair in (self._open(day, shard) for shard in shards) if pair[0] is not None]
+        step = chunk_seconds * 1_000_000_000
+        for lo_ns in range(start_ns, end_ns, step):
+            hi_ns = min(lo_ns + step, end_ns)
+            pieces = []
+            for records, index in opened:
+                lo, hi = self._locate(records, index, lo_ns), self._locate(records, index, hi_ns)
+                if hi > lo:
+                    piece = records[lo:hi]
+                    if wanted is not None:
+                        piece = piece[np.isin(piece["code"], wanted)]
+                    pieces.append(piece)
+            if not pieces:
+                continue
+            chunk = np.concatenate(pieces)
+            yield chunk[np.argsort(chunk["ts_ns"], kind="stable")]
+
+
+def _parse_legacy_json(payload) -> bytes:
+    # JSON 와이어 포맷으로 들어온 틱도 바이너리 프레임으로 바꿔 같은 형식으로 기록합니다.
+    message = json.loads(payload)
+    if message.get("type") != "realtime":
+        return b""
+    return encode_tick(*legacy_dict_to_tick(message["data"]))
+
+
+def _redis_client():
+    return redis.from_url(f"redis://{os.getenv('REDIS_HOST', 'localhost')}:{os.getenv('REDIS_PORT', 6379)}", decode_responses=False)
+
+
+async def record(root: str):
+    writer = TickJournalWriter(root)
+    client = _redis_client()
+    written = 0
+    try:
+        while True:
+            pubsub = None
+            try:
+                pubsub = client.pubsub()
+                await pubsub.psubscribe(REALTIME_CHANNEL_PATTERN)
+                print(f"틱 저널 기록 시작: {root} (샤드 {SHARDS}개)")
+                next_flush = time.monotonic() + FLUSH_INTERVAL_SECONDS
+                while True:
+                    message = await pubsub.get_message(ignore_subscribe_messages=True, timeout=FLUSH_INTERVAL_SECONDS)
+                    if message and not is_replay_frame(message["data"]):
+                        payload = message["data"]
+                        try:
+                            frames = payload if is_binary_frame(payload) else _parse_legacy_json(payload)
+                        except (ValueError, KeyError, UnicodeEncodeError, struct.error) as e:
+                            print(f"틱 저널: 해석할 수 없는 메시지를 건너뜁니다: {e}")
+                            frames = b""
+                        if frames:
+                            written += writer.append_frames(time.time_ns(), frames)
+                    if time.monotonic() >= next_flush:
+                        writer.flush()
+                        next_flush = time.monotonic() + FLUSH_INTERVAL_SECONDS
+            except RedisConnectionError as e:
+                writer.flush()
+                print(f"틱 저널 Redis 연결 오류: {e}. 5초 후 다시 구독합니다. (지금까지 {written}건 기록)")
+                await asyncio.sleep(5)
+            finally:
+                if pubsub is not None:
+                    try:
+                        await pubsub.aclose()
+                    except Exception:
+                        pass
+    finally:
+        writer.close()
+        await client.close()
+
+
+async def replay(root: str, day: str, start_ns: int, end_ns: int, speed: float, codes=None, channel: str = CHANNEL) -> int:
+    """
+    저장된 틱을 원래 간격의 1/speed 배로 channel에 발행합니다. speed <= 0이면 기다리지 않고 최대한 빨리 보냅니다.
+    재생 프레임으로 표시해 보내므로 같은 채널을 구독하는 기록기가 다시 기록하지 않습니다.
+    """
+    reader = TickJournalReader(root)
+    client = _redis_client()
+    batch_ns = int(REPLAY_BATCH_MS * 1_000_000 * max(speed, 1))
+    published = 0
+    first_ts = None
+    started = time.monotonic()
+    try:
+        for chunk in reader.read_range(day, start_ns, end_ns, codes):
+            ts = chunk["ts_ns"]
+            frames = chunk.view(FRAME_DTYPE)["frame"]
+            if first_ts is None:
+                first_ts = int(ts[0])
+            # batch_ns 간격의 경계마다 잘라서 메시지 하나로 발행합니다.
+            bounds = np.searchsorted(ts, np.arange(int(ts[0]), int(ts[-1]) + batch_ns, batch_ns), side="left")
+            bounds = np.unique(np.append(bounds, len(ts)))
+            for lo, hi in zip(bounds[:-1], bounds[1:]):
+                if hi <= lo:
+                    continue
+                if speed > 0:
+                    delay = started + (int(ts[lo]) - first_ts) / 1e9 / speed - time.monotonic()
+                    if delay > 0:
+                        await asyncio.sleep(delay)
+                await client.publish(channel, mark_replay(frames[lo:hi].tobytes()))
+                published += int(hi - lo)
+        return published
+    finally:
+        await client.close()
+
+
+def _parse_clock(day: str, clock: str) -> int:
+    moment = datetime.strptime(f"{day} {clock}", "%Y%m%d %H:%M:%S" if clock.count(":") == 2 else "%Y%m%d %H:%M")
+    return int(moment.replace(tzinfo=KST).timestamp() * 1_000_000_000)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="실시간 틱 저널 기록/재생")
+    parser.add_argument("--root", default=DEFAULT_ROOT)
+    commands = parser.add_subparsers(dest="command", required=True)
+    commands.add_parser("record", help=f"{CHANNEL} 채널을 구독해서 세그먼트 파일에 기록합니다.")
+    replay_parser = commands.add_parser("replay", help="저장된 구간을 Redis 채널로 다시 발행합니다.")
+    replay_parser.add_argument("--date", required=True, help="YYYYMMDD (한국 시간)")
+    replay_parser.add_argument("--start", default="09:00", help="HH:MM[:SS]")
+    replay_parser.add_argument("--end", default="15:30", help="HH:MM[:SS]")
+    replay_parser.add_argument("--speed", type=float, default=1.0, help="재생 배속 (0이면 최대 속도)")
+    replay_parser.add_argument("--codes", default="", help="쉼표로 구분한 종목코드. 비우면 전 종목")
+    replay_parser.add_argument("--channel", default=CHANNEL)
+    args = parser.parse_args(argv)
+
+    if args.command == "record":
+        asyncio.run(record(args.root))
+        return
+    codes = [code.strip() for code in args.codes.split(",") if code.strip()] or None
+    started = time.monotonic()
+    published = asyncio.run(replay(
+        args.root, args.date, _parse_clock(args.date, args.start), _parse_clock(args.date, args.end),
+        args.speed, codes, args.channel,
+    ))
+    print(f"틱 {published}건 재생 완료 ({time.monotonic() - started:.1f}초)")
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,111 @@
+import math
+
+import numpy as np
+from numpy.lib.stride_tricks import sliding_window_view
+
+# --- 벡터화 SMA 교차 백테스트 ---
+# backtrader SmaCross와 같은 규칙을 NumPy 배열 연산으로 계산합니다.
+#  - fast > slow 이면 진입, fast < slow 이면 청산, 같으면 직전 상태 유지
+#  - 신호가 난 봉의 다음 봉 시가에 체결 (backtrader 기본 시장가 주문)
+#  - 수수료는 체결 금액 × commission (setcommission(commission=0.0015)의 주식형 비율 수수료)
+#  - 수량은 backtrader 기본 사이저(SizerFix, stake=1)와 같게 stake주
+# 여러 파라미터 조합을 (조합 × 봉) 2차원 배열로 한 번에 계산하므로 대규모 스윕의 사전 선별에 사용합니다.
+
+TRADING_DAYS = 252
+RISK_FREE_RATE = 0.01  # bt.analyzers.SharpeRatio 기본값
+DEFAULT_CHUNK_SIZE = 256
+
+
+def rolling_mean(values: np.ndarray, period: int) -> np.ndarray:
+    """
+    길이 period의 단순 이동평균. 값이 모이기 전 구간은 NaN입니다.
+    """
+    out = np.full(len(values), np.nan)
+    if 0 < period <= len(values):
+        out[period - 1:] = sliding_window_view(values, period).mean(axis=1)
+    return out
+
+
+def sma_cross_targets(fast: np.ndarray, slow: np.ndarray) -> np.ndarray:
+    """
+    각 봉 종가 시점에 원하는 보유 상태(0/1)를 반환합니다. 입력은 (조합 × 봉) 형태입니다.
+    """
+    sign = np.nan_to_num(np.sign(fast - slow), nan=0.0)
+    # 부호가 0인 봉(교차 없음, 지표 미완성)은 직전의 0이 아닌 부호를 이어받습니다.
+    last = np.where(sign != 0, np.arange(sign.shape[1]), 0)
+    np.maximum.accumulate(last, axis=1, out=last)
+    return (np.take_along_axis(sign, last, axis=1) > 0).astype(np.float64)
+
+
+def simulate(open_: np.ndarray, close: np.ndarray, targets: np.ndarray, initial_cash: float,
+             commission: float, stake: float = 1) -> np.ndarray:
+    """
+    보유 목표로부터 봉별 평가금액(현금 + 보유 수량 × 종가)을 계산합니다.
+    """
+    held = np.zeros_like(targets)
+    held[:, 1:] = targets[:, :-1]  # 다음 봉 시가 체결
+    trades = np.diff(held, axis=1, prepend=0) * stake
+    cost = trades * open_ + np.abs(trades) * open_ * commission
+    cash = initial_cash - np.cumsum(cost, axis=1)
+    return cash + held * stake * close
+
+
+def _metrics(equity: np.ndarray, initial_cash: float) -> tuple[np.ndarray, np.ndarray, np.ndarray]:
+    final_value = equity[:, -1]
+
+    peak = np.maximum.accumulate(np.maximum(equity, initial_cash), axis=1)
+    max_drawdown = ((peak - equity) / peak).max(axis=1)
+
+    # bt.analyzers.SharpeRatio(timeframe=Days, annualize=True)와 같은 방식: 일간 수익률에서 무위험 수익률을 빼고
+    # 모표준편차로 나눈 뒤 sqrt(252)를 곱합니다.
+    prev = np.empty_like(equity)
+    prev[:, 0] = initial_cash
+    prev[:, 1:] = equity[:, :-1]
+    excess = equity / prev - 1 - ((1 + RISK_FREE_RATE) ** (1 / TRADING_DAYS) - 1)
+    std = excess.std(axis=1)
+    with np.errstate(divide="ignore", invalid="ignore"):
+        sharpe = np.where(std > 0, excess.mean(axis=1) / std * math.sqrt(TRADING_DAYS), np.nan)
+    return final_value, max_drawdown, sharpe
+
+
+def run_sma_sweep(open_: np.ndarray, close: np.ndarray, combos: list[dict], initial_cash: float,
+                  commission: float, stake: float = 1, chunk_size: int = DEFAULT_CHUNK_SIZE) -> list[dict]:
+    """
+    한 종목의 가격 배열에 대해 모든 {fast_ma, slow_ma} 조합을 평가합니다.
+    이동평균은 기간별로 한 번만 계산하고, 조합은 chunk_size 단위로 묶어 메모리 사용량을 제한합니다.
+    """
+    open_ = np.asarray(open_, dtype=np.float64)
+    close = np.asarray(close, dtype=np.float64)
+    if not combos:
+        return []
+    if len(close) == 0:
+        return [
+            {"params": combo, "final_value": initial_cash, "total_return": 0.0, "sharpe": None, "max_drawdown": 0.0}
+            for combo in combos
+        ]
+
+    periods = sorted({c["fast_ma"] for c in combos} | {c["slow_ma"] for c in combos})
+    row = {period: i for i, period in enumerate(periods)}
+    smas = np.vstack([rolling_mean(close, period) for period in periods])
+    # backtrader는 두 지표가 모두 준비된 봉부터 next()를 호출하므로, 느린 쪽이 준비되기 전은 NaN으로 둡니다.
+    fast_rows = np.array([row[c["fast_ma"]] for c in combos])
+    slow_rows = np.array([row[c["slow_ma"]] for c in combos])
+    ready = np.array([max(c["fast_ma"], c["slow_ma"]) for c in combos])
+    bar = np.arange(len(close))
+
+    results = []
+    for lo in range(0, len(combos), chunk_size):
+        hi = min(lo + chunk_size, len(combos))
+        fast = smas[fast_rows[lo:hi]]
+        slow = np.where(bar >= ready[lo:hi, None] - 1, smas[slow_rows[lo:hi]], np.nan)
+        equity = simulate(open_, close, sma_cross_targets(fast, slow), initial_cash, commission, stake)
+        final_value, max_drawdown, sharpe = _metrics(equity, initial_cash)
+        for i, combo in enumerate(combos[lo:hi]):
+            results.append({
+                "params": combo,
+                "final_value": float(final_value[i]),
+                "total_return": float(final_value[i] / initial_cash - 1),
+                "sharpe": None if np.isnan(sharpe[i]) else float(sharpe[i]),
+                "max_drawdown": float(max_drawdown[i]),
+            })
+    return results
@@ -0,0 +1,88 @@
+import asyncio
+import logging
+from collections import deque
+from datetime import datetime, timezone
+
+from asyncpg.pool import Pool
+
+from services.visit_rollup import apply_rollups
+
+
+class VisitBuffer:
+    """
+    /api/log_visit 이벤트를 메모리에 모았다가 COPY로 한 번에 적재하는 고정 크기 버퍼.
+    같은 트랜잭션에서 visit_rollup_* 집계 테이블도 증분 갱신합니다.
+
+    요청 경로에서는 append만 하고 DB를 기다리지 않습니다. 버퍼가 가득 차면(예: Postgres가 느릴 때)
+    새 이벤트는 버리고 dropped 카운터만 올립니다.
+    """
+
+    COLUMNS = ("ip_address", "user_agent", "path", "visit_time")
+
+    def __init__(self, capacity: int = 10000, batch_size: int = 500, flush_interval_ms: int = 1000):
+        self.capacity = capacity
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval_ms / 1000
+        self._events: deque = deque()
+        self._wakeup = asyncio.Event()
+        self._task: asyncio.Task | None = None
+        self._pool: Pool | None = None
+        self.stats = {"accepted": 0, "dropped": 0, "flushed": 0, "failed": 0, "flushes": 0}
+
+    def add(self, ip_address: str, user_agent: str, path: str) -> bool:
+        if len(self._events) >= self.capacity:
+            self.stats["dropped"] += 1
+            return False
+        self._events.append((ip_address, user_agent, path, datetime.now(timezone.utc)))
+        self.stats["accepted"] += 1
+        if len(self._events) >= self.batch_size:
+            self._wakeup.set()
+        return True
+
+    def start(self, pool: Pool):
+        self._pool = pool
+        self._task = asyncio.create_task(self._run())
+
+    async def stop(self):
+        if self._task:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+        # 종료 시 남은 이벤트를 최대한 적재합니다.
+        while self._events:
+            if not await self.flush():
+                break
+
+    async def _run(self):
+        while True:
+            try:
+                await asyncio.wait_for(self._wakeup.wait(), timeout=self.flush_interval)
+            except asyncio.TimeoutError:
+                pass
+            self._wakeup.clear()
+            while self._events:
+                if not await self.flush() or len(self._events) < self.batch_size:
+                    break
+
+    async def flush(self) -> bool:
+        count = min(len(self._events), self.batch_size)
+        if count == 0:
+            return True
+        batch = [self._events.popleft() for _ in range(count)]
+        try:
+            async with self._pool.acquire() as conn:
+                async with conn.transaction():
+                    await conn.copy_records_to_table("user_visits", records=batch, columns=self.COLUMNS)
+                    await apply_rollups(conn, batch)
+            self.stats["flushed"] += count
+            self.stats["flushes"] += 1
+            return True
+        except Exception as e:
+            self.stats["failed"] += count
+            logging.error(f"Failed to flush {count} visit events: {e}")
+            return False
+
+    def snapshot(self) -> dict:
+        return {**self.stats, "buffered": len(self._events), "capacity": self.capacity}
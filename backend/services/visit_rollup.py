@@ -0,0 +1,163 @@
+import asyncio
+import hashlib
+import logging
+import math
+from collections import Counter, defaultdict
+from datetime import date, datetime, timedelta, timezone
+
+import asyncpg
+from asyncpg.pool import Pool
+
+
+class HyperLogLog:
+    """
+    일별 순 방문자(IP) 수를 근사하기 위한 HyperLogLog. 레지스터는 bytea로 visit_rollup_daily에 저장됩니다.
+    p=12 (4096 레지스터, 4KB)에서 표준 오차는 약 1.6%입니다.
+    """
+
+    P = 12
+    M = 1 << P
+
+    def __init__(self, registers: bytes | None = None):
+        self.registers = bytearray(registers) if registers else bytearray(self.M)
+
+    def add(self, value: str):
+        h = int.from_bytes(hashlib.blake2b(value.encode(), digest_size=8).digest(), "big")
+        index = h >> (64 - self.P)
+        remainder = h & ((1 << (64 - self.P)) - 1)
+        rank = (64 - self.P) - remainder.bit_length() + 1
+        if rank > self.registers[index]:
+            self.registers[index] = rank
+
+    def merge(self, other: "HyperLogLog"):
+        self.registers = bytearray(map(max, self.registers, other.registers))
+
+    def estimate(self) -> int:
+        alpha = 0.7213 / (1 + 1.079 / self.M)
+        raw = alpha * self.M * self.M / sum(2.0 ** -r for r in self.registers)
+        zeros = self.registers.count(0)
+        if raw <= 2.5 * self.M and zeros:
+            raw = self.M * math.log(self.M / zeros)
+        return int(round(raw))
+
+
+async def apply_rollups(conn: asyncpg.Connection, batch: list):
+    """
+    VisitBuffer가 COPY한 배치와 같은 트랜잭션에서 일 단위 집계 테이블을 증분 갱신합니다.
+    batch 원소는 (ip_address, user_agent, path, visit_time) 입니다.
+    """
+    paths = Counter()
+    agents = Counter()
+    daily = Counter()
+    daily_ips = defaultdict(HyperLogLog)
+    for ip_address, user_agent, path, visit_time in batch:
+        visit_time = visit_time.astimezone(timezone.utc)
+        day = visit_time.date()
+        paths[(day, path)] += 1
+        agents[(day, user_agent)] += 1
+        daily[day] += 1
+        daily_ips[day].add(ip_address)
+
+    # 여러 프로세스가 같은 행들을 서로 다른 순서로 잠그면 교착 상태가 나므로, 항상 키 순서대로 갱신합니다.
+    await conn.executemany("""
+        INSERT INTO visit_rollup_path_daily (day, path, visits) VALUES ($1, $2, $3)
+        ON CONFLICT (day, path) DO UPDATE SET visits = visit_rollup_path_daily.visits + EXCLUDED.visits
+    """, [(day, path, visits) for (day, path), visits in sorted(paths.items())])
+    await conn.executemany("""
+        INSERT INTO visit_rollup_agent_daily (day, user_agent, visits) VALUES ($1, $2, $3)
+        ON CONFLICT (day, user_agent) DO UPDATE SET visits = visit_rollup_agent_daily.visits + EXCLUDED.visits
+    """, [(day, user_agent, visits) for (day, user_agent), visits in sorted(agents.items())])
+
+    for day, hll in sorted(daily_ips.items()):
+        # 빈 행을 먼저 만들어 두고 FOR UPDATE로 잠가야 여러 프로세스가 동시에 병합해도 레지스터가 유실되지 않습니다.
+        await conn.execute("INSERT INTO visit_rollup_daily (day) VALUES ($1) ON CONFLICT (day) DO NOTHING", day)
+        row = await conn.fetchrow("SELECT ip_hll FROM visit_rollup_daily WHERE day = $1 FOR UPDATE", day)
+        if row["ip_hll"]:
+            hll.merge(HyperLogLog(row["ip_hll"]))
+        await conn.execute(
+            "UPDATE visit_rollup_daily SET visits = visits + $2, unique_visitors = $3, ip_hll = $4 WHERE day = $1",
+            day, daily[day], hll.estimate(), bytes(hll.registers)
+        )
+
+
+# --- 원본 user_visits 파티션 관리 ---
+def _month_start(d: date) -> date:
+    return d.replace(day=1)
+
+def _next_month(d: date) -> date:
+    return (d.replace(day=28) + timedelta(days=4)).replace(day=1)
+
+async def _create_month_partition(conn: asyncpg.Connection, month: date):
+    """
+    한 달치 파티션을 만듭니다. 기본 파티션(user_visits_default)에 그 범위의 행이 있으면 PARTITION OF가 실패하므로,
+    빈 테이블을 따로 만들어 해당 행을 옮긴 뒤 ATTACH 합니다. ATTACH 시 기본 파티션 검사는 이미 비운 범위라 통과합니다.
+    """
+    name = f"user_visits_p{month:%Y%m}"
+    if await conn.fetchval("SELECT to_regclass($1)", name) is not None:
+        return
+    lower, upper = month.isoformat(), _next_month(month).isoformat()
+    async with conn.transaction():
+        # 옮기는 동안 새 방문이 기본 파티션에 들어오지 않도록 부모 테이블을 잠급니다.
+        await conn.execute("LOCK TABLE user_visits IN SHARE ROW EXCLUSIVE MODE")
+        await conn.execute(f"CREATE TABLE {name} (LIKE user_visits INCLUDING DEFAULTS INCLUDING CONSTRAINTS)")
+        moved = await conn.execute(f"""
+            WITH moved AS (
+                DELETE FROM user_visits_default WHERE visit_time >= '{lower}' AND visit_time < '{upper}' RETURNING *
+            )
+            INSERT INTO {name} SELECT * FROM moved
+        """)
+        await conn.execute(f"ALTER TABLE user_visits ATTACH PARTITION {name} FOR VALUES FROM ('{lower}') TO ('{upper}')")
+    count = int(moved.split()[-1])
+    if count:
+        logging.info(f"Moved {count} rows from user_visits_default into {name}.")
+
+async def maintain_visit_partitions(conn: asyncpg.Connection, retention_days: int, rollup_retention_days: int, months_ahead: int = 1):
+    """
+    user_visits의 월 단위 파티션을 미리 만들고, 보존 기간이 지난 파티션과 기본 파티션의 오래된 행을 지웁니다.
+    집계 테이블(visit_rollup_*)은 rollup_retention_days가 지난 행을 지웁니다.
+    user_visits가 파티션 테이블이 아니면(구 스키마) 원본 테이블은 건드리지 않습니다.
+    """
+    today = datetime.now(timezone.utc).date()
+    rollup_cutoff = today - timedelta(days=rollup_retention_days)
+    for table in ("visit_rollup_daily", "visit_rollup_path_daily", "visit_rollup_agent_daily"):
+        await conn.execute(f"DELETE FROM {table} WHERE day < $1", rollup_cutoff)
+
+    relkind = await conn.fetchval("SELECT relkind FROM pg_class WHERE relname = 'user_visits'")
+    if relkind != "p":
+        logging.warning("user_visits is not partitioned; skipping partition maintenance.")
+        return
+
+    month = _month_start(today)
+    for _ in range(months_ahead + 1):
+        await _create_month_partition(conn, month)
+        month = _next_month(month)
+
+    cutoff = today - timedelta(days=retention_days)
+    await conn.execute(
+        "DELETE FROM user_visits_default WHERE visit_time < $1",
+        datetime.combine(cutoff, datetime.min.time(), timezone.utc)
+    )
+    partitions = await conn.fetch("""
+        SELECT c.relname FROM pg_inherits i
+        JOIN pg_class c ON c.oid = i.inhrelid
+        JOIN pg_class p ON p.oid = i.inhparent
+        WHERE p.relname = 'user_visits' AND c.relname LIKE 'user_visits_p%'
+    """)
+    for record in partitions:
+        name = record["relname"]
+        try:
+            start = datetime.strptime(name[len("user_visits_p"):], "%Y%m").date()
+        except ValueError:
+            continue
+        if _next_month(start) <= cutoff:
+            await conn.execute(f"DROP TABLE IF EXISTS {name}")
+            logging.info(f"Dropped expired visit partition {name}.")
+
+async def run_visit_maintenance(pool: Pool, retention_days: int, rollup_retention_days: int, interval_seconds: int = 3600):
+    while True:
+        try:
+            async with pool.acquire() as conn:
+                await maintain_visit_partitions(conn, retention_days, rollup_retention_days)
+        except Exception as e:
+            logging.error(f"Visit partition maintenance failed: {e}")
+        await asyncio.sleep(interval_seconds)
@@ -0,0 +1,95 @@
+import os
+import asyncio
+import logging
+
+import asyncpg
+
+DATA_VERSION_CHANNEL = "data_version"
+RECONNECT_SECONDS = 5
+RESYNC_SECONDS = 30
+
+
+class DataVersionWatcher:
+    """
+    data_versions 테이블의 데이터별 버전 카운터를 메모리에 들고 있습니다. (news, posts, stocks)
+    테이블이 바뀌면 DB 트리거가 카운터를 올리고 pg_notify('data_version', '<이름>:<버전>')를 보내므로,
+    요청마다 DB를 읽지 않고도 ETag를 만들고 If-None-Match에 304로 답할 수 있습니다.
+
+    LISTEN 연결이 끊긴 동안에는 알림을 놓칠 수 있으므로 버전을 비워서(ETag 없이 항상 200) 오래된 304를 막고,
+    다시 연결한 뒤 테이블에서 읽어 채웁니다. 놓친 알림에 대비해 RESYNC_SECONDS마다 테이블 값과도 맞춥니다.
+    on_change(name)는 새 버전을 공개하기 전에 기다리므로, 그 안에서 해당 데이터의 캐시를 지우면 새 ETag로 옛 본문이 나가지 않습니다.
+    """
+
+    def __init__(self, on_change=None):
+        self.versions: dict[str, int] = {}
+        self.on_change = on_change
+        self._task = None
+        self._conn = None
+
+    def get(self, name: str):
+        return self.versions.get(name)
+
+    def start(self, pool):
+        if self._task is None:
+            self._task = asyncio.create_task(self._run(pool))
+
+    async def stop(self):
+        if self._task:
+            self._task.cancel()
+            self._task = None
+        if self._conn and not self._conn.is_closed():
+            await self._conn.close()
+
+    async def _update(self, name: str, version: int):
+        if version <= self.versions.get(name, -1):
+            return
+        if self.on_change:
+            try:
+                await self.on_change(name)
+            except Exception as e:
+                logging.error(f"데이터 버전 변경 처리 실패 ({name}): {e}")
+        self.versions[name] = max(version, self.versions.get(name, -1))
+
+    def _on_notify(self, conn, pid, channel, payload):
+        name, _, version = payload.partition(":")
+        if version.isdigit():
+            asyncio.create_task(self._update(name, int(version)))
+
+    def _on_terminate(self, conn):
+        self.versions = {}
+
+    async def _resync(self, pool):
+        async with pool.acquire() as conn:
+            rows = await conn.fetch("SELECT name, version FROM data_versions")
+        for row in rows:
+            await self._update(row["name"], row["version"])
+
+    async def _run(self, pool):
+        while True:
+            try:
+                if self._conn is None or self._conn.is_closed():
+                    self.versions = {}
+                    self._conn = await asyncpg.connect(
+                        user=os.getenv("POSTGRES_USER"),
+                        password=os.getenv("POSTGRES_PASSWORD"),
+                        database=os.getenv("POSTGRES_DB"),
+                        host=os.getenv("POSTGRES_HOST"),
+                        port=os.getenv("POSTGRES_PORT"),
+                    )
+                    self._conn.add_termination_listener(self._on_terminate)
+                    await self._conn.add_listener(DATA_VERSION_CHANNEL, self._on_notify)
+                await self._resync(pool)
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                logging.error(f"데이터 버전 감시 연결 실패: {e}. {RECONNECT_SECONDS}초 후 재시도합니다.")
+                self.versions = {}
+                if self._conn and not self._conn.is_closed():
+                    await self._conn.close()
+                self._conn = None
+                await asyncio.sleep(RECONNECT_SECONDS)
+                continue
+            for _ in range(RESYNC_SECONDS // RECONNECT_SECONDS):
+                await asyncio.sleep(RECONNECT_SECONDS)
+                if self._conn.is_closed():
+                    break
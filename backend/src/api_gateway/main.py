@@ -3,16 +3,33 @@ import json
 import asyncio
 import redis.asyncio as redis
 import asyncpg
-from fastapi import FastAPI, WebSocket, WebSocketDisconnect, Request, Header, HTTPException, Depends
-from typing import Optional
+from fastapi import FastAPI, WebSocket, WebSocketDisconnect, Request, Response, Header, HTTPException, Depends
+from typing import Literal, Optional
+from pydantic import BaseModel
 from datetime import date, datetime, timedelta
 from fastapi.middleware.cors import CORSMiddleware
 from datetime import date
 import aio_pika
 import httpx
 import logging
+import uuid
+from .news_stream import NewsStreamHub
+from .data_versions import DataVersionWatcher
+# backend/services의 공용 모듈 (게이트웨이 이미지에서는 /app/shared로 복사됩니다)
+from http_cache import CompressionMiddleware, make_etag, not_modified
+from market_hours import record_cache_access
 
 app = FastAPI()
+news_hub = NewsStreamHub()
+
+async def invalidate_data_cache(name: str):
+    # 새 뉴스 버전을 ETag에 쓰기 전에 캐시된 목록부터 지웁니다. (새 ETag에 옛 목록이 실리지 않도록)
+    if name == "news" and getattr(app.state, "redis", None):
+        keys = [key async for key in app.state.redis.scan_iter(match=NEWS_CACHE_KEY.format(limit="*"))]
+        if keys:
+            await app.state.redis.delete(*keys)
+
+data_versions = DataVersionWatcher(on_change=invalidate_data_cache)
 
 # CORS Middleware
 app.add_middleware(
@@ -21,7 +38,9 @@ app.add_middleware(
     allow_credentials=True,
     allow_methods=["*"],
     allow_headers=["*"],
+    expose_headers=["ETag"],
 )
+app.add_middleware(CompressionMiddleware)
 
 # Custom middleware to add security headers
 @app.middleware("http")
@@ -58,6 +77,9 @@ async def startup_event():
             else:
                 app.state.db_pool = None
 
+    if app.state.db_pool:
+        data_versions.start(app.state.db_pool)
+
     # Connect to Redis
     try:
         app.state.redis = redis.from_url(
@@ -66,6 +88,7 @@ async def startup_event():
         )
         await app.state.redis.ping()
         print("✅ Redis에 성공적으로 연결되었습니다.")
+        news_hub.start(app.state.redis)
     except Exception as e:
         print(f"🔥 Redis 연결 실패: {e}")
         app.state.redis = None
@@ -94,6 +117,8 @@ async def startup_event():
 
 @app.on_event("shutdown")
 async def shutdown_event():
+    await news_hub.stop()
+    await data_versions.stop()
     if hasattr(app.state, 'db_pool') and app.state.db_pool:
         await app.state.db_pool.close()
         print("asyncpg 커넥션 풀이 종료되었습니다.")
@@ -105,9 +130,16 @@ async def shutdown_event():
 # --- API Endpoints ---
 
 @app.get("/api/all-companies")
-async def get_all_companies(limit: int = 100):
+async def get_all_companies(request: Request, response: Response, limit: int = 100):
     if not app.state.db_pool:
         raise HTTPException(status_code=503, detail="Database connection pool not available")
+    version = data_versions.get("stocks")
+    if version is not None:
+        etag = make_etag("stocks", version)
+        unchanged = not_modified(request, etag)
+        if unchanged:
+            return unchanged
+        response.headers["ETag"] = etag
     async with app.state.db_pool.acquire() as conn:
         query = """
             SELECT code, name, market, price AS "currentPrice", 
@@ -121,10 +153,42 @@ async def get_all_companies(limit: int = 100):
         stocks = await conn.fetch(query, limit)
         return {"success": True, "data": [dict(stock) for stock in stocks]}
 
+@app.websocket("/ws/realtime-news")
+async def websocket_realtime_news(websocket: WebSocket):
+    if not app.state.redis:
+        await websocket.close(code=1011)
+        return
+    await websocket.accept()
+    try:
+        await news_hub.serve(websocket, app.state.redis)
+    except WebSocketDisconnect:
+        pass
+
+# stock_service의 market_warmup이 장 시작 전에 같은 키(cache:news:latest:{limit})로 최신 뉴스를 올려 둡니다.
+NEWS_CACHE_KEY = "cache:news:latest:{limit}"
+NEWS_CACHE_TTL_SECONDS = 30
+
 @app.get("/api/news")
-async def get_news(limit: int = 50):
+async def get_news(request: Request, response: Response, limit: int = 50):
     if not app.state.db_pool:
         raise HTTPException(status_code=503, detail="Database connection pool not available")
+    # 버전을 먼저 읽고 본문을 만들므로 본문은 항상 ETag의 버전과 같거나 더 최신입니다.
+    version = data_versions.get("news")
+    if version is not None:
+        etag = make_etag("news", version)
+        unchanged = not_modified(request, etag)
+        if unchanged:
+            return unchanged
+        response.headers["ETag"] = etag
+    cache_key = NEWS_CACHE_KEY.format(limit=limit)
+    if app.state.redis:
+        try:
+            cached = await app.state.redis.get(cache_key)
+            await record_cache_access(app.state.redis, cached is not None)
+            if cached is not None:
+                return {"success": True, "data": json.loads(cached)}
+        except Exception as e:
+            print(f"🔥 뉴스 캐시 조회 실패: {e}")
     async with app.state.db_pool.acquire() as conn:
         query = """
             SELECT title, url, source, published_at, sentiment_score, sentiment_label 
@@ -132,15 +196,27 @@ async def get_news(limit: int = 50):
             ORDER BY published_at DESC NULLS LAST 
             LIMIT $1
         """
-        news = await conn.fetch(query, limit)
-        return {"success": True, "data": [dict(n) for n in news]}
+        news = [dict(n) for n in await conn.fetch(query, limit)]
+    if app.state.redis:
+        try:
+            await app.state.redis.set(cache_key, json.dumps(news, default=lambda v: v.isoformat() if hasattr(v, "isoformat") else str(v)), ex=NEWS_CACHE_TTL_SECONDS)
+        except Exception as e:
+            print(f"🔥 뉴스 캐시 저장 실패: {e}")
+    return {"success": True, "data": news}
 
 
 
 @app.get("/api/posts")
-async def get_posts(q: Optional[str] = None, page: int = 1, category: Optional[str] = None):
+async def get_posts(request: Request, response: Response, q: Optional[str] = None, page: int = 1, category: Optional[str] = None):
     if not app.state.db_pool:
         raise HTTPException(status_code=503, detail="Database connection pool not available")
+    version = data_versions.get("posts")
+    if version is not None:
+        etag = make_etag("posts", version)
+        unchanged = not_modified(request, etag)
+        if unchanged:
+            return unchanged
+        response.headers["ETag"] = etag
     try:
         async with app.state.db_pool.acquire() as conn:
             base_query = """
@@ -289,4 +365,65 @@ async def get_comments(postId: int):
         raise HTTPException(status_code=500, detail="Internal Server Error while fetching comments")
 
 
+# --- Backtest jobs (consumed by services/backtest_worker.py) ---
+class BacktestRequest(BaseModel):
+    stock_code: Optional[str] = None
+    symbols: Optional[list[str]] = None
+    start_date: str
+    end_date: str
+    strategy_id: str = "sma_cross"
+    parameters: Optional[dict] = None
+    param_grid: Optional[dict[str, list]] = None
+    mode: Literal["full", "prescreen"] = "full"
+    confirm_top: Optional[int] = None
 
+@app.post("/api/backtest/run")
+async def run_backtest(request: BacktestRequest):
+    if not app.state.rabbitmq_channel:
+        raise HTTPException(status_code=503, detail="Message queue not available")
+    if not (request.symbols or request.stock_code):
+        raise HTTPException(status_code=400, detail="stock_code or symbols is required")
+    job = request.model_dump()
+    job["job_id"] = str(uuid.uuid4())
+    await app.state.rabbitmq_channel.declare_queue('backtest_queue', durable=True)
+    await app.state.rabbitmq_channel.default_exchange.publish(
+        aio_pika.Message(body=json.dumps(job).encode(), delivery_mode=aio_pika.DeliveryMode.PERSISTENT),
+        routing_key='backtest_queue',
+    )
+    return {"success": True, "job_id": job["job_id"]}
+
+@app.get("/api/backtest/{job_id}")
+async def get_backtest_status(job_id: str, offset: int = 0):
+    """
+    작업 상태와 offset 이후의 부분 결과를 반환합니다. 클라이언트는 next_offset으로 이어서 폴링합니다.
+    """
+    if not app.state.redis:
+        raise HTTPException(status_code=503, detail="Redis not available")
+    try:
+        uuid.UUID(job_id)
+    except ValueError:
+        raise HTTPException(status_code=400, detail="Invalid job id")
+    status_key = f"backtest:job:{job_id}"
+    status = await app.state.redis.hgetall(status_key)
+    results = await app.state.redis.lrange(f"{status_key}:results", offset, -1)
+    if not status and app.state.db_pool:
+        # Redis 부분 결과가 만료된 오래된 작업은 Postgres에 저장된 최종 결과로 응답합니다.
+        async with app.state.db_pool.acquire() as conn:
+            job = await conn.fetchrow("SELECT status, total, completed FROM backtest_jobs WHERE job_id = $1::uuid", job_id)
+            if job:
+                rows = await conn.fetch(
+                    "SELECT stock_code, engine, params, final_value, total_return, sharpe, max_drawdown FROM backtest_results WHERE job_id = $1::uuid ORDER BY id OFFSET $2",
+                    job_id, offset
+                )
+                status = {"status": job["status"], "total": job["total"], "completed": job["completed"]}
+                results = [json.dumps({**dict(row), "params": json.loads(row["params"])}) for row in rows]
+    return {
+        "success": True,
+        "data": {
+            "status": status.get("status", "queued"),
+            "total": int(status.get("total", 0)),
+            "completed": int(status.get("completed", 0)),
+            "results": [json.loads(r) for r in results],
+            "next_offset": offset + len(results),
+        },
+    }
@@ -0,0 +1,131 @@
+import asyncio
+import json
+import logging
+import re
+
+import redis.asyncio as redis
+from fastapi import WebSocket
+from redis.exceptions import ResponseError
+
+NEWS_STREAM_KEY = "news_stream"
+
+
+def _stream_id(entry_id: str) -> tuple[int, int]:
+    ms, _, seq = entry_id.partition("-")
+    return int(ms), int(seq or 0)
+
+
+def _valid_cursor(cursor) -> bool:
+    # 클라이언트가 보낸 커서는 "<ms>-<seq>" 또는 "<ms>" 형식이고 각 값이 64비트 안에 들어야 Redis가 받아줍니다.
+    if not isinstance(cursor, str) or not re.fullmatch(r"[0-9]{1,20}(-[0-9]{1,20})?", cursor):
+        return False
+    return max(_stream_id(cursor)) < 2 ** 64
+
+
+def _format(entry_id: str, fields: dict) -> str:
+    article = json.loads(fields["article"])
+    article["link"] = article.get("url")
+    return json.dumps({"type": "news", "cursor": entry_id, "data": article}, ensure_ascii=False)
+
+
+class NewsStreamHub:
+    """
+    db_saver가 기록하는 Redis 스트림(news_stream)을 하나의 XREAD 루프로 읽어 모든 /ws/realtime-news 클라이언트에 전달합니다.
+
+    연결 시 클라이언트가 ?cursor=<마지막으로 받은 스트림 ID>를 보내면 그 이후 기사만 재전송하고,
+    커서가 없으면 현재 커서만 알려줍니다({"type": "hello"}). 커서 이후의 기사가 잘려나갔거나 형식이 잘못되었으면 {"type": "reset"}을 보내
+    클라이언트가 REST(/api/news)로 다시 받아오도록 합니다.
+    """
+
+    def __init__(self, queue_size: int = 256):
+        self.queue_size = queue_size
+        self._clients: set[asyncio.Queue] = set()
+        self._task: asyncio.Task | None = None
+
+    def start(self, redis_client: redis.Redis):
+        self._task = asyncio.create_task(self._run(redis_client))
+
+    async def stop(self):
+        if self._task:
+            self._task.cancel()
+
+    async def _run(self, redis_client: redis.Redis):
+        last_id = "$"
+        while True:
+            try:
+                response = await redis_client.xread({NEWS_STREAM_KEY: last_id}, block=5000, count=100)
+                for _, entries in response or []:
+                    for entry_id, fields in entries:
+                        last_id = entry_id
+                        message = (entry_id, _format(entry_id, fields))
+                        for queue in list(self._clients):
+                            if queue.full():
+                                # 느린 클라이언트 때문에 허브가 막히지 않도록 가장 오래된 메시지를 버립니다.
+                                queue.get_nowait()
+                            queue.put_nowait(message)
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                logging.error(f"News stream reader error: {e}. Retrying in 5 seconds...")
+                await asyncio.sleep(5)
+
+    @staticmethod
+    async def _missed_after(redis_client: redis.Redis, cursor: str) -> bool:
+        """
+        커서 다음 기사가 스트림에서 잘려나갔는지 확인합니다.
+        커서 자신만 잘려나간 경우(클라이언트가 마지막 기사까지 받은 뒤 MAXLEN으로 잘린 경우)는 놓친 기사가 없으므로 reset하지 않습니다.
+        """
+        try:
+            info = await redis_client.xinfo_stream(NEWS_STREAM_KEY)
+        except ResponseError:
+            return True  # 스트림이 없으면 커서 이후를 알 수 없습니다.
+        position = _stream_id(cursor)
+        # XTRIM/MAXLEN으로 지운 가장 큰 ID (Redis 7+). 이 값이 커서보다 크면 커서 다음 기사 중 일부가 지워졌습니다.
+        deleted = _stream_id(info.get("max-deleted-entry-id") or "0-0")
+        if deleted > position:
+            return True
+        # 지운 기록은 커서 이전까지인데 첫 기사가 커서보다 뒤라면 스트림이 새로 만들어진 경우입니다.
+        first = info.get("first-entry")
+        return bool(first) and _stream_id(first[0]) > position and deleted < position
+
+    async def serve(self, websocket: WebSocket, redis_client: redis.Redis):
+        queue: asyncio.Queue = asyncio.Queue(maxsize=self.queue_size)
+        # 재전송보다 먼저 등록해야 재전송과 실시간 수신 사이의 기사를 놓치지 않습니다.
+        self._clients.add(queue)
+        try:
+            cursor = websocket.query_params.get("cursor")
+            last_sent = (0, 0)
+            if cursor and not _valid_cursor(cursor):
+                # 형식이 잘못된 커서는 잘려나간 커서와 같이 reset 후 남아 있는 기사를 모두 보냅니다.
+                await websocket.send_text(json.dumps({"type": "reset"}))
+                cursor = "0-0"
+            elif cursor and await self._missed_after(redis_client, cursor):
+                await websocket.send_text(json.dumps({"type": "reset"}))
+            if cursor:
+                last_sent = _stream_id(cursor)
+                for entry_id, fields in await redis_client.xrange(NEWS_STREAM_KEY, min=f"({cursor}", max="+"):
+                    await websocket.send_text(_format(entry_id, fields))
+                    last_sent = _stream_id(entry_id)
+            else:
+                latest = await redis_client.xrevrange(NEWS_STREAM_KEY, count=1)
+                if latest:
+                    last_sent = _stream_id(latest[0][0])
+                await websocket.send_text(json.dumps({"type": "hello", "cursor": latest[0][0] if latest else "0-0"}))
+
+            async def pump(last_sent: tuple[int, int]):
+                while True:
+                    entry_id, message = await queue.get()
+                    if _stream_id(entry_id) <= last_sent:
+                        continue
+                    await websocket.send_text(message)
+                    last_sent = _stream_id(entry_id)
+
+            pump_task = asyncio.create_task(pump(last_sent))
+            try:
+                # 클라이언트 연결 종료를 감지하기 위해 수신 루프를 유지합니다 (WebSocketDisconnect로 빠져나감).
+                while True:
+                    await websocket.receive_text()
+            finally:
+                pump_task.cancel()
+        finally:
+            self._clients.discard(queue)
@@ -5,7 +5,7 @@ import os
 from typing import Optional
 
 from .models import UserBase, UserCreate, UserInDB, Token
-from .security import create_access_token, verify_password, get_password_hash
+from .security import create_access_token, verify_password_async, get_password_hash_async, get_hash_pool_stats
 from .dependencies import get_user, get_db_conn # get_db_conn will be added/modified in dependencies.py
 
 router = APIRouter()
@@ -29,7 +29,7 @@ async def register_user(user: UserCreate, conn: asyncpg.Connection = Depends(get
         if existing_google_user:
             raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="Google ID already registered")
 
-    hashed_password = get_password_hash(user.password) if user.password else None
+    hashed_password = await get_password_hash_async(user.password) if user.password else None
     
     new_user = await conn.fetchrow(
         "INSERT INTO users (username, hashed_password, email, google_id) VALUES ($1, $2, $3, $4) RETURNING id, username, email, google_id",
@@ -40,7 +40,7 @@ async def register_user(user: UserCreate, conn: asyncpg.Connection = Depends(get
 @router.post("/token", response_model=Token)
 async def login_for_access_token(form_data: OAuth2PasswordRequestForm = Depends(), conn: asyncpg.Connection = Depends(get_db_conn)):
     user = await get_user(conn, username=form_data.username)
-    if not user or not verify_password(form_data.password, user.hashed_password):
+    if not user or not await verify_password_async(form_data.password, user.hashed_password):
         raise HTTPException(
             status_code=status.HTTP_401_UNAUTHORIZED,
             detail="Incorrect username or password",
@@ -48,3 +48,7 @@ async def login_for_access_token(form_data: OAuth2PasswordRequestForm = Depends(
         )
     access_token = create_access_token(data={"sub": user.username})
     return {"access_token": access_token, "token_type": "bearer"}
+
+@router.get("/metrics/hash-pool")
+async def read_hash_pool_stats():
+    return get_hash_pool_stats()
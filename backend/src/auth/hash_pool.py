@@ -0,0 +1,47 @@
+from concurrent.futures import ThreadPoolExecutor
+from fastapi import HTTPException, status
+import asyncio
+import os
+
+# --- bcrypt 전용 스레드 풀 ---
+# bcrypt 연산(약 100~300ms)을 이벤트 루프 밖에서 실행하고, 대기열이 가득 차면 429로 요청을 거절합니다.
+# 게이트웨이(src/auth), 인증 서비스(src/auth_service), 관리자 서비스(KiwoomGateway/auth)가 함께 씁니다.
+
+class HashPool:
+    def __init__(self, workers: int = None, max_queue: int = None):
+        self.workers = workers or int(os.getenv("HASH_POOL_WORKERS", "4"))
+        self.max_queue = max_queue if max_queue is not None else int(os.getenv("HASH_POOL_MAX_QUEUE", "32"))
+        self._executor = ThreadPoolExecutor(max_workers=self.workers, thread_name_prefix="bcrypt")
+        self._stats = {"in_flight": 0, "completed": 0, "failed": 0, "rejected": 0}
+
+    async def run(self, func, *args):
+        if self._stats["in_flight"] >= self.workers + self.max_queue:
+            self._stats["rejected"] += 1
+            raise HTTPException(
+                status_code=status.HTTP_429_TOO_MANY_REQUESTS,
+                detail="Too many authentication requests. Please retry shortly.",
+                headers={"Retry-After": "1"},
+            )
+        self._stats["in_flight"] += 1
+        try:
+            result = await asyncio.get_running_loop().run_in_executor(self._executor, func, *args)
+        except Exception:
+            # 잘못된 해시 형식 등으로 실패한 작업은 완료 건수와 따로 셉니다.
+            self._stats["failed"] += 1
+            raise
+        finally:
+            self._stats["in_flight"] -= 1
+        self._stats["completed"] += 1
+        return result
+
+    def stats(self) -> dict:
+        in_flight = self._stats["in_flight"]
+        return {
+            "workers": self.workers,
+            "max_queue": self.max_queue,
+            "in_flight": in_flight,
+            "queue_depth": max(0, in_flight - self.workers),
+            "completed": self._stats["completed"],
+            "failed": self._stats["failed"],
+            "rejected": self._stats["rejected"],
+        }
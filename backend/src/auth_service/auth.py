@@ -3,6 +3,7 @@ from typing import Optional
 from jose import JWTError, jwt
 from passlib.context import CryptContext
 from pydantic_settings import BaseSettings, SettingsConfigDict
+from src.auth.hash_pool import HashPool
 import os
 
 class Settings(BaseSettings):
@@ -10,6 +11,8 @@ class Settings(BaseSettings):
     ALGORITHM: str = "HS256"
     ACCESS_TOKEN_EXPIRE_MINUTES: int = 1440
     GOOGLE_CLIENT_ID: str = os.environ.get("GOOGLE_CLIENT_ID", "your-google-client-id") # Fallback for local development
+    HASH_POOL_WORKERS: int = 4 # bcrypt 전용 스레드 수
+    HASH_POOL_MAX_QUEUE: int = 32 # 이 이상 대기 중이면 429로 거절
 
     model_config = SettingsConfigDict(env_file=".env", extra="ignore")
 
@@ -26,6 +29,17 @@ def verify_password(plain_password, hashed_password):
 def get_password_hash(password):
     return pwd_context.hash(password)
 
+hash_pool = HashPool(settings.HASH_POOL_WORKERS, settings.HASH_POOL_MAX_QUEUE)
+
+async def verify_password_async(plain_password, hashed_password):
+    return await hash_pool.run(verify_password, plain_password, hashed_password)
+
+async def get_password_hash_async(password):
+    return await hash_pool.run(get_password_hash, password)
+
+def get_hash_pool_stats():
+    return hash_pool.stats()
+
 def create_access_token(data: dict, expires_delta: Optional[timedelta] = None):
     to_encode = data.copy()
     if expires_delta:
@@ -0,0 +1,155 @@
+import asyncio
+import hashlib
+import os
+import uuid
+from concurrent.futures import ProcessPoolExecutor
+
+import anyio
+from fastapi import HTTPException, UploadFile, status
+from fastapi.responses import JSONResponse
+from fastapi.staticfiles import StaticFiles
+from PIL import Image
+from pydantic_settings import BaseSettings, SettingsConfigDict
+
+class Settings(BaseSettings):
+    AVATAR_DIR: str = "static/avatars"
+    AVATAR_MAX_BYTES: int = 5 * 1024 * 1024 # 5MB
+    AVATAR_CHUNK_SIZE: int = 64 * 1024
+    AVATAR_MULTIPART_OVERHEAD: int = 64 * 1024 # multipart 경계/헤더 여유분
+    AVATAR_THUMBNAIL_SIZES: list[int] = [64, 128, 256]
+    AVATAR_WORKERS: int = 2
+
+    model_config = SettingsConfigDict(env_file=".env", extra="ignore")
+
+settings = Settings()
+
+# Pillow 포맷 이름 -> 저장 확장자
+ALLOWED_FORMATS = {"JPEG": "jpg", "PNG": "png", "GIF": "gif", "WEBP": "webp"}
+# 압축 폭탄 방지 (약 40MP 초과 이미지는 거부)
+Image.MAX_IMAGE_PIXELS = 40_000_000
+
+_thumbnail_executor = ProcessPoolExecutor(max_workers=settings.AVATAR_WORKERS)
+
+class ImmutableStaticFiles(StaticFiles):
+    """
+    콘텐츠 해시 파일명으로 저장된 자산 전용 StaticFiles. 내용이 바뀌면 이름도 바뀌므로 1년 immutable 캐시를 붙입니다.
+    """
+    def file_response(self, *args, **kwargs):
+        response = super().file_response(*args, **kwargs)
+        response.headers["Cache-Control"] = "public, max-age=31536000, immutable"
+        return response
+
+class AvatarUploadLimitMiddleware:
+    """
+    업로드 요청 본문을 multipart 파싱 전에 제한하는 ASGI 미들웨어.
+    UploadFile은 파싱이 끝난 뒤에야 핸들러에 전달되므로, 본문 전체가 임시 파일에 쌓이기 전에 여기서 끊어야 합니다.
+    Content-Length가 한도를 넘으면 바로 413을 보내고, 헤더가 없는 chunked 업로드는 받은 바이트 수를 세다가 한도를 넘는 순간 413을 던집니다.
+    """
+    def __init__(self, app, path: str, max_bytes: int = None):
+        self.app = app
+        self.path = path
+        self.max_bytes = max_bytes or settings.AVATAR_MAX_BYTES + settings.AVATAR_MULTIPART_OVERHEAD
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or scope["path"] != self.path:
+            await self.app(scope, receive, send)
+            return
+
+        content_length = dict(scope["headers"]).get(b"content-length", b"")
+        if content_length.isdigit() and int(content_length) > self.max_bytes:
+            response = JSONResponse(
+                {"detail": f"Avatar exceeds {settings.AVATAR_MAX_BYTES} bytes"},
+                status_code=status.HTTP_413_REQUEST_ENTITY_TOO_LARGE,
+            )
+            await response(scope, receive, send)
+            return
+
+        received = 0
+
+        async def limited_receive():
+            nonlocal received
+            message = await receive()
+            if message["type"] == "http.request":
+                received += len(message.get("body", b""))
+                if received > self.max_bytes:
+                    # 폼 파싱 중에 던진 HTTPException은 FastAPI가 그대로 응답으로 바꿉니다.
+                    raise HTTPException(
+                        status_code=status.HTTP_413_REQUEST_ENTITY_TOO_LARGE,
+                        detail=f"Avatar exceeds {settings.AVATAR_MAX_BYTES} bytes",
+                    )
+            return message
+
+        await self.app(scope, limited_receive, send)
+
+def _thumbnail_name(digest: str, size: int) -> str:
+    return f"{digest}_{size}.webp"
+
+def _process_image(tmp_path: str, digest: str, avatar_dir: str, sizes: list[int]) -> str:
+    """
+    워커 프로세스에서 실행됩니다. 이미지 포맷을 검증하고 원본과 WebP 썸네일을 저장한 뒤 원본 파일명을 반환합니다.
+    """
+    with Image.open(tmp_path) as img:
+        if img.format not in ALLOWED_FORMATS:
+            raise ValueError(f"Unsupported image format: {img.format}")
+        image_format = img.format
+        img.load()
+        for size in sizes:
+            thumb_path = os.path.join(avatar_dir, _thumbnail_name(digest, size))
+            if os.path.exists(thumb_path):
+                continue
+            thumb = img.convert("RGBA" if img.mode in ("RGBA", "LA", "P") else "RGB")
+            thumb.thumbnail((size, size))
+            thumb.save(thumb_path + ".tmp", format="WEBP", quality=85, method=4)
+            os.replace(thumb_path + ".tmp", thumb_path)
+
+    file_name = f"{digest}.{ALLOWED_FORMATS[image_format]}"
+    final_path = os.path.join(avatar_dir, file_name)
+    if os.path.exists(final_path):
+        os.remove(tmp_path)
+    else:
+        os.replace(tmp_path, final_path)
+    return file_name
+
+async def _stream_to_disk(file: UploadFile, tmp_path: str) -> str:
+    hasher = hashlib.sha256()
+    written = 0
+    async with await anyio.open_file(tmp_path, "wb") as buffer:
+        while chunk := await file.read(settings.AVATAR_CHUNK_SIZE):
+            written += len(chunk)
+            if written > settings.AVATAR_MAX_BYTES:
+                raise HTTPException(
+                    status_code=status.HTTP_413_REQUEST_ENTITY_TOO_LARGE,
+                    detail=f"Avatar exceeds {settings.AVATAR_MAX_BYTES} bytes",
+                )
+            hasher.update(chunk)
+            await buffer.write(chunk)
+    if written == 0:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="Empty file")
+    return hasher.hexdigest()
+
+async def save_avatar(file: UploadFile, url_prefix: str) -> dict:
+    """
+    업로드를 청크 단위로 디스크에 기록하면서 크기 제한과 SHA-256 해시를 계산하고,
+    썸네일 생성은 프로세스 풀에 맡깁니다. 동일한 이미지는 같은 파일명으로 중복 제거됩니다.
+    """
+    if file.content_type and not file.content_type.startswith("image/"):
+        raise HTTPException(status_code=status.HTTP_415_UNSUPPORTED_MEDIA_TYPE, detail="Only image uploads are allowed")
+
+    tmp_path = os.path.join(settings.AVATAR_DIR, f".upload-{uuid.uuid4().hex}")
+    try:
+        digest = await _stream_to_disk(file, tmp_path)
+        try:
+            file_name = await asyncio.get_running_loop().run_in_executor(
+                _thumbnail_executor, _process_image, tmp_path, digest, settings.AVATAR_DIR, settings.AVATAR_THUMBNAIL_SIZES
+            )
+        except (ValueError, OSError, Image.DecompressionBombError) as e:
+            raise HTTPException(status_code=status.HTTP_415_UNSUPPORTED_MEDIA_TYPE, detail=f"Invalid image: {e}")
+    finally:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+
+    return {
+        "filename": file_name,
+        "url": f"{url_prefix}/{file_name}",
+        "thumbnails": {str(size): f"{url_prefix}/{_thumbnail_name(digest, size)}" for size in settings.AVATAR_THUMBNAIL_SIZES},
+    }
@@ -1,14 +1,18 @@
-from sqlalchemy.orm import Session
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
+from typing import Optional
 from . import models, schemas, auth
 
-def get_user(db: Session, user_id: int):
-    return db.query(models.User).filter(models.User.id == user_id).first()
+async def get_user(db: AsyncSession, user_id: int):
+    return await db.get(models.User, user_id)
 
-def get_user_by_email(db: Session, email: str):
-    return db.query(models.User).filter(models.User.email == email).first()
+async def get_user_by_email(db: AsyncSession, email: str):
+    result = await db.execute(select(models.User).where(models.User.email == email))
+    return result.scalars().first()
 
-def create_user(db: Session, user: schemas.UserCreate):
-    hashed_password = auth.get_password_hash(user.password)
+async def create_user(db: AsyncSession, user: schemas.UserCreate, hashed_password: Optional[str] = None):
+    if hashed_password is None:
+        hashed_password = await auth.get_password_hash_async(user.password)
     db_user = models.User(
         email=user.email, 
         hashed_password=hashed_password,
@@ -16,12 +20,12 @@ def create_user(db: Session, user: schemas.UserCreate):
         avatar_url=user.avatar_url
     )
     db.add(db_user)
-    db.commit()
-    db.refresh(db_user)
+    await db.commit()
+    await db.refresh(db_user)
     return db_user
 
-def update_user_profile(db: Session, user_id: int, user_update: schemas.UserUpdate):
-    db_user = db.query(models.User).filter(models.User.id == user_id).first()
+async def update_user_profile(db: AsyncSession, user_id: int, user_update: schemas.UserUpdate):
+    db_user = await get_user(db, user_id)
     if db_user:
         print(f"DEBUG: update_user_profile - User found: {db_user.email}")
         print(f"DEBUG: update_user_profile - Incoming avatar_url: {user_update.avatar_url}")
@@ -32,33 +36,33 @@ def update_user_profile(db: Session, user_id: int, user_update: schemas.UserUpda
         if user_update.avatar_url is not None:
             db_user.avatar_url = user_update.avatar_url
         
-        db.commit()
-        db.refresh(db_user)
+        await db.commit()
+        await db.refresh(db_user)
         print(f"DEBUG: update_user_profile - db_user.avatar_url (after update and refresh): {db_user.avatar_url}")
     return db_user
 
-def update_user_password(db: Session, user_id: int, new_password: str):
-    db_user = db.query(models.User).filter(models.User.id == user_id).first()
+async def update_user_password(db: AsyncSession, user_id: int, new_password: str, hashed_password: Optional[str] = None):
+    db_user = await get_user(db, user_id)
     if db_user:
-        db_user.hashed_password = auth.get_password_hash(new_password)
-        db.commit()
-        db.refresh(db_user)
+        db_user.hashed_password = hashed_password or await auth.get_password_hash_async(new_password)
+        await db.commit()
+        await db.refresh(db_user)
     return db_user
 
-def update_privacy_settings(db: Session, user_id: int, privacy_update: schemas.PrivacySettingsUpdate):
-    db_user = db.query(models.User).filter(models.User.id == user_id).first()
+async def update_privacy_settings(db: AsyncSession, user_id: int, privacy_update: schemas.PrivacySettingsUpdate):
+    db_user = await get_user(db, user_id)
     if db_user:
         for field, value in privacy_update.model_dump(exclude_unset=True).items():
             setattr(db_user, field, value)
-        db.commit()
-        db.refresh(db_user)
+        await db.commit()
+        await db.refresh(db_user)
     return db_user
 
-def update_notification_settings(db: Session, user_id: int, notification_update: schemas.NotificationSettingsUpdate):
-    db_user = db.query(models.User).filter(models.User.id == user_id).first()
+async def update_notification_settings(db: AsyncSession, user_id: int, notification_update: schemas.NotificationSettingsUpdate):
+    db_user = await get_user(db, user_id)
     if db_user:
         for field, value in notification_update.model_dump(exclude_unset=True).items():
             setattr(db_user, field, value)
-        db.commit()
-        db.refresh(db_user)
+        await db.commit()
+        await db.refresh(db_user)
     return db_user
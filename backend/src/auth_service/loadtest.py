@@ -0,0 +1,102 @@
+"""
+auth-service 부하 테스트 스크립트.
+
+로그인(/token), /users/me/, 설정 조회·변경(/users/me/privacy, /users/me/notifications)을
+동시 요청으로 두드려 엔드포인트별 처리량(req/s)과 지연 시간(p50/p95/p99)을 출력합니다.
+
+동기 Session 버전과 비동기 엔진 버전을 비교하려면 두 리비전을 각각 띄운 뒤 같은 옵션으로 실행합니다.
+
+    python -m src.auth_service.loadtest --base-url http://localhost:8002 \
+        --email loadtest@example.com --password secret --concurrency 50 --duration 30
+"""
+import argparse
+import asyncio
+import time
+
+import httpx
+
+
+async def _ensure_user(client: httpx.AsyncClient, email: str, password: str):
+    # 이미 존재하면 400이 반환되므로 결과는 무시합니다.
+    await client.post("/users/", json={"email": email, "password": password})
+
+
+async def _login(client: httpx.AsyncClient, email: str, password: str) -> str:
+    response = await client.post("/token", data={"username": email, "password": password})
+    response.raise_for_status()
+    return response.json()["access_token"]
+
+
+def _scenarios(email: str, password: str, token: str):
+    headers = {"Authorization": f"Bearer {token}"}
+    return {
+        "login": lambda c: c.post("/token", data={"username": email, "password": password}),
+        "users_me": lambda c: c.get("/users/me/", headers=headers),
+        "privacy_read": lambda c: c.get("/users/me/privacy", headers=headers),
+        "notifications_update": lambda c: c.put(
+            "/users/me/notifications", headers=headers, json={"on_post_like": True}
+        ),
+    }
+
+
+async def _run_scenario(base_url: str, request_fn, concurrency: int, duration: float):
+    latencies = []
+    errors = 0
+    deadline = time.perf_counter() + duration
+
+    async def worker(client: httpx.AsyncClient):
+        nonlocal errors
+        while time.perf_counter() < deadline:
+            started = time.perf_counter()
+            try:
+                response = await request_fn(client)
+                if response.status_code >= 400:
+                    errors += 1
+            except httpx.HTTPError:
+                errors += 1
+            latencies.append(time.perf_counter() - started)
+
+    limits = httpx.Limits(max_connections=concurrency, max_keepalive_connections=concurrency)
+    async with httpx.AsyncClient(base_url=base_url, limits=limits, timeout=30) as client:
+        started = time.perf_counter()
+        await asyncio.gather(*(worker(client) for _ in range(concurrency)))
+        elapsed = time.perf_counter() - started
+    return latencies, errors, elapsed
+
+
+def _percentile(sorted_values, pct):
+    if not sorted_values:
+        return 0.0
+    index = min(len(sorted_values) - 1, int(len(sorted_values) * pct / 100))
+    return sorted_values[index]
+
+
+async def main():
+    parser = argparse.ArgumentParser(description="auth-service load test")
+    parser.add_argument("--base-url", default="http://localhost:8002")
+    parser.add_argument("--email", default="loadtest@example.com")
+    parser.add_argument("--password", default="loadtest-password")
+    parser.add_argument("--concurrency", type=int, default=50)
+    parser.add_argument("--duration", type=float, default=20.0, help="seconds per scenario")
+    parser.add_argument("--only", nargs="*", help="run only the named scenarios")
+    args = parser.parse_args()
+
+    async with httpx.AsyncClient(base_url=args.base_url, timeout=30) as client:
+        await _ensure_user(client, args.email, args.password)
+        token = await _login(client, args.email, args.password)
+
+    print(f"{'scenario':<22}{'requests':>10}{'errors':>8}{'req/s':>10}{'p50 ms':>10}{'p95 ms':>10}{'p99 ms':>10}")
+    for name, request_fn in _scenarios(args.email, args.password, token).items():
+        if args.only and name not in args.only:
+            continue
+        latencies, errors, elapsed = await _run_scenario(args.base_url, request_fn, args.concurrency, args.duration)
+        latencies.sort()
+        print(
+            f"{name:<22}{len(latencies):>10}{errors:>8}{len(latencies) / elapsed:>10.1f}"
+            f"{_percentile(latencies, 50) * 1000:>10.1f}{_percentile(latencies, 95) * 1000:>10.1f}"
+            f"{_percentile(latencies, 99) * 1000:>10.1f}"
+        )
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
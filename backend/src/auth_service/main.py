@@ -2,15 +2,22 @@ from fastapi import FastAPI, File, UploadFile
 from fastapi.staticfiles import StaticFiles
 from fastapi.middleware.cors import CORSMiddleware # Import CORSMiddleware
 from . import models
+from .avatars import AvatarUploadLimitMiddleware, ImmutableStaticFiles, save_avatar, settings as avatar_settings
 from .database import engine
 from .routers import router
 import os
-import shutil
-
-models.Base.metadata.create_all(bind=engine)
 
 app = FastAPI()
 
+@app.on_event("startup")
+async def startup_event():
+    async with engine.begin() as conn:
+        await conn.run_sync(models.Base.metadata.create_all)
+
+@app.on_event("shutdown")
+async def shutdown_event():
+    await engine.dispose()
+
 # Add CORS middleware
 origins = [
     "http://localhost",
@@ -26,21 +33,19 @@ app.add_middleware(
     allow_methods=["*"], # Allow all methods (GET, POST, PUT, DELETE, OPTIONS)
     allow_headers=["*"], # Allow all headers, including Authorization
 )
-
-# Mount static files
-app.mount("/static", StaticFiles(directory="static"), name="static")
+# 아바타 업로드 크기 제한은 multipart 파싱 전에 걸어야 하므로 미들웨어에서 합니다. 실제 파일 바이트 수는 save_avatar에서 다시 확인합니다.
+app.add_middleware(AvatarUploadLimitMiddleware, path="/upload/avatar")
 
 # Ensure the avatars directory exists
-AVATAR_DIR = "static/avatars"
+AVATAR_DIR = avatar_settings.AVATAR_DIR
 os.makedirs(AVATAR_DIR, exist_ok=True)
 
+# Mount static files (avatars are content-addressed, so they get immutable cache headers)
+app.mount("/static/avatars", ImmutableStaticFiles(directory=AVATAR_DIR), name="avatars")
+app.mount("/static", StaticFiles(directory="static"), name="static")
+
 @app.post("/upload/avatar")
 async def upload_avatar(file: UploadFile = File(...)):
-    file_extension = file.filename.split(".").pop()
-    file_name = f"{os.urandom(16).hex()}.{file_extension}"
-    file_path = os.path.join(AVATAR_DIR, file_name)
-    with open(file_path, "wb") as buffer:
-        shutil.copyfileobj(file.file, buffer)
-    return {"filename": file_name, "url": f"/static/avatars/{file_name}"}
+    return await save_avatar(file, url_prefix="/static/avatars")
 
 app.include_router(router)
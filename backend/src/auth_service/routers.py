@@ -1,7 +1,7 @@
 from datetime import timedelta
 from fastapi import APIRouter, Depends, HTTPException, status
 from fastapi.security import OAuth2PasswordRequestForm
-from sqlalchemy.orm import Session
+from sqlalchemy.ext.asyncio import AsyncSession
 from . import auth, crud, schemas, dependencies
 from .database import get_db
 from google.oauth2 import id_token
@@ -11,9 +11,9 @@ import os
 router = APIRouter()
 
 @router.post("/token", response_model=schemas.Token)
-async def login_for_access_token(form_data: OAuth2PasswordRequestForm = Depends(), db: Session = Depends(get_db)):
-    user = crud.get_user_by_email(db, email=form_data.username)
-    if not user or not auth.verify_password(form_data.password, user.hashed_password):
+async def login_for_access_token(form_data: OAuth2PasswordRequestForm = Depends(), db: AsyncSession = Depends(get_db)):
+    user = await crud.get_user_by_email(db, email=form_data.username)
+    if not user or not await auth.verify_password_async(form_data.password, user.hashed_password):
         raise HTTPException(
             status_code=status.HTTP_401_UNAUTHORIZED,
             detail="Incorrect username or password",
@@ -27,31 +27,33 @@ async def login_for_access_token(form_data: OAuth2PasswordRequestForm = Depends(
     return {"access_token": access_token, "token_type": "bearer"}
 
 @router.post("/users/", response_model=schemas.User)
-def create_user(user: schemas.UserCreate, db: Session = Depends(get_db)):
-    db_user = crud.get_user_by_email(db, email=user.email)
+async def create_user(user: schemas.UserCreate, db: AsyncSession = Depends(get_db)):
+    db_user = await crud.get_user_by_email(db, email=user.email)
     if db_user:
         raise HTTPException(status_code=400, detail="Email already registered")
-    return crud.create_user(db=db, user=user)
+    hashed_password = await auth.get_password_hash_async(user.password)
+    return await crud.create_user(db=db, user=user, hashed_password=hashed_password)
 
 @router.get("/users/me/", response_model=schemas.User)
 async def read_users_me(current_user: schemas.User = Depends(dependencies.get_current_active_user)):
     return current_user
 
 @router.put("/users/me/", response_model=schemas.User)
-async def update_user_me(user_update: schemas.UserUpdate, current_user: schemas.User = Depends(dependencies.get_current_active_user), db: Session = Depends(get_db)):
+async def update_user_me(user_update: schemas.UserUpdate, current_user: schemas.User = Depends(dependencies.get_current_active_user), db: AsyncSession = Depends(get_db)):
     print(f"DEBUG: update_user_me - Received update for user: {current_user.email}")
     print(f"DEBUG: update_user_me - user_update data: nickname={user_update.nickname}, avatar_url={user_update.avatar_url}")
-    updated_user = crud.update_user_profile(db, current_user.id, user_update)
+    updated_user = await crud.update_user_profile(db, current_user.id, user_update)
     if not updated_user:
         raise HTTPException(status_code=404, detail="User not found")
     return updated_user
 
 @router.put("/users/me/password")
-async def update_password_me(password_data: schemas.UserCreate, current_user: schemas.User = Depends(dependencies.get_current_active_user), db: Session = Depends(get_db)):
-    if not auth.verify_password(password_data.password, current_user.hashed_password):
+async def update_password_me(password_data: schemas.UserCreate, current_user: schemas.User = Depends(dependencies.get_current_active_user), db: AsyncSession = Depends(get_db)):
+    if not await auth.verify_password_async(password_data.password, current_user.hashed_password):
         raise HTTPException(status_code=400, detail="Incorrect current password")
     
-    crud.update_user_password(db, current_user.id, password_data.password)
+    hashed_password = await auth.get_password_hash_async(password_data.password)
+    await crud.update_user_password(db, current_user.id, password_data.password, hashed_password=hashed_password)
     return {"message": "Password updated successfully"}
 
 @router.get("/users/me/privacy", response_model=schemas.User)
@@ -59,8 +61,8 @@ async def read_privacy_settings(current_user: schemas.User = Depends(dependencie
     return current_user
 
 @router.put("/users/me/privacy", response_model=schemas.User)
-async def update_privacy_settings(privacy_update: schemas.PrivacySettingsUpdate, current_user: schemas.User = Depends(dependencies.get_current_active_user), db: Session = Depends(get_db)):
-    updated_user = crud.update_privacy_settings(db, current_user.id, privacy_update)
+async def update_privacy_settings(privacy_update: schemas.PrivacySettingsUpdate, current_user: schemas.User = Depends(dependencies.get_current_active_user), db: AsyncSession = Depends(get_db)):
+    updated_user = await crud.update_privacy_settings(db, current_user.id, privacy_update)
     if not updated_user:
         raise HTTPException(status_code=404, detail="User not found")
     return updated_user
@@ -70,14 +72,18 @@ async def read_notification_settings(current_user: schemas.User = Depends(depend
     return current_user
 
 @router.put("/users/me/notifications", response_model=schemas.User)
-async def update_notification_settings(notification_update: schemas.NotificationSettingsUpdate, current_user: schemas.User = Depends(dependencies.get_current_active_user), db: Session = Depends(get_db)):
-    updated_user = crud.update_notification_settings(db, current_user.id, notification_update)
+async def update_notification_settings(notification_update: schemas.NotificationSettingsUpdate, current_user: schemas.User = Depends(dependencies.get_current_active_user), db: AsyncSession = Depends(get_db)):
+    updated_user = await crud.update_notification_settings(db, current_user.id, notification_update)
     if not updated_user:
         raise HTTPException(status_code=404, detail="User not found")
     return updated_user
 
+@router.get("/metrics/hash-pool")
+async def read_hash_pool_stats():
+    return auth.get_hash_pool_stats()
+
 @router.post("/auth/google", response_model=schemas.TokenWithUser)
-async def google_auth(request: schemas.GoogleAuthRequest, db: Session = Depends(get_db)):
+async def google_auth(request: schemas.GoogleAuthRequest, db: AsyncSession = Depends(get_db)):
     try:
         CLIENT_ID = auth.settings.GOOGLE_CLIENT_ID
         
@@ -89,7 +95,7 @@ async def google_auth(request: schemas.GoogleAuthRequest, db: Session = Depends(
         name = idinfo.get('name', email.split('@')[0])
         picture = idinfo.get('picture')
 
-        user = crud.get_user_by_email(db, email=email)
+        user = await crud.get_user_by_email(db, email=email)
 
         if user:
             # User exists, just use the existing user data
@@ -98,11 +104,12 @@ async def google_auth(request: schemas.GoogleAuthRequest, db: Session = Depends(
             # Create a new user if not exists
             user_create = schemas.UserCreate(
                 email=email, 
-                password=auth.get_password_hash(os.urandom(16).hex()), # Generate a random password
+                password=os.urandom(16).hex(), # Generate a random password
                 nickname=name, 
                 avatar_url=picture
             )
-            user = crud.create_user(db=db, user=user_create)
+            hashed_password = await auth.get_password_hash_async(user_create.password)
+            user = await crud.create_user(db=db, user=user_create, hashed_password=hashed_password)
 
         # At this point, 'user' is either the existing or newly created user
         # Now, create an access token containing the full user data.
@@ -126,6 +133,8 @@ async def google_auth(request: schemas.GoogleAuthRequest, db: Session = Depends(
             **user_data_for_token
         )
 
+    except HTTPException:
+        raise
     except ValueError as e: # Invalid token
         print(f"ERROR: Google ID token verification failed: {e}")
         raise HTTPException(status_code=status.HTTP_401_UNAUTHORIZED, detail=f"Invalid Google ID token: {e}")
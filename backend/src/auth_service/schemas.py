@@ -6,6 +6,8 @@ class UserBase(BaseModel):
 
 class UserCreate(UserBase):
     password: str
+    nickname: Optional[str] = None
+    avatar_url: Optional[str] = None
 
 class UserUpdate(BaseModel):
     nickname: Optional[str] = None
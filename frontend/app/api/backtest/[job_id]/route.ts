@@ -0,0 +1,19 @@
+import { type NextRequest, NextResponse } from "next/server";
+
+// 백엔드 API 서버의 주소
+const API_URL = process.env.NEXT_PUBLIC_BACKEND_API_URL;
+
+export async function GET(request: NextRequest, { params }: { params: { job_id: string } }) {
+  const { job_id } = params;
+  const offset = new URL(request.url).searchParams.get('offset') || '0';
+  try {
+    const response = await fetch(`${API_URL}/api/backtest/${encodeURIComponent(job_id)}?offset=${offset}`, {
+      cache: 'no-store',
+    });
+    const data = await response.json();
+    return NextResponse.json(data, { status: response.status });
+  } catch (error) {
+    console.error("API Route Error fetching backtest status:", error);
+    return NextResponse.json({ success: false, error: "백테스트 결과 조회 중 오류 발생" }, { status: 500 });
+  }
+}
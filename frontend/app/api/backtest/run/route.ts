@@ -0,0 +1,21 @@
+import { type NextRequest, NextResponse } from "next/server";
+
+// 백엔드 API 서버의 주소
+const API_URL = process.env.NEXT_PUBLIC_BACKEND_API_URL;
+
+export async function POST(request: NextRequest) {
+  try {
+    const body = await request.json();
+    const response = await fetch(`${API_URL}/api/backtest/run`, {
+      method: 'POST',
+      headers: { 'Content-Type': 'application/json' },
+      body: JSON.stringify(body),
+      cache: 'no-store',
+    });
+    const data = await response.json();
+    return NextResponse.json(data, { status: response.status });
+  } catch (error) {
+    console.error("API Route Error submitting backtest:", error);
+    return NextResponse.json({ success: false, error: "백테스트 요청 중 오류 발생" }, { status: 500 });
+  }
+}
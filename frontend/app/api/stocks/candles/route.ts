@@ -0,0 +1,27 @@
+import { type NextRequest, NextResponse } from "next/server";
+
+// 백엔드 API 서버의 주소
+const API_URL = process.env.NEXT_PUBLIC_STOCK_API_URL;
+
+export async function GET(request: NextRequest) {
+  const { searchParams } = new URL(request.url);
+  const code = searchParams.get('code');
+  const interval = searchParams.get('interval') || '1m';
+  const limit = searchParams.get('limit') || '120';
+
+  if (!code) {
+    return NextResponse.json({ success: false, error: 'Stock code is required' }, { status: 400 });
+  }
+
+  try {
+    const response = await fetch(
+      `${API_URL}/api/candles/${encodeURIComponent(code)}?interval=${encodeURIComponent(interval)}&limit=${encodeURIComponent(limit)}`,
+      { cache: 'no-store' }
+    );
+    const data = await response.json();
+    return NextResponse.json(data, { status: response.status });
+  } catch (error) {
+    console.error("API Route Error fetching candles:", error);
+    return NextResponse.json({ success: false, error: "분봉 데이터 조회 중 오류 발생" }, { status: 500 });
+  }
+}
@@ -10,28 +10,40 @@ export async function GET(request: NextRequest) {
   const apiParams = new URLSearchParams();
   
   // 검색어, 테마, 정렬 기준, 페이지네이션 등 모든 파라미터를 추가
+  // 예전 all-companies 호출에서 쓰던 search는 스크리너의 q로 바꿔 넘깁니다.
   searchParams.forEach((value, key) => {
+    if (key === 'search') {
+      if (!searchParams.has('q')) apiParams.append('q', value);
+      return;
+    }
     apiParams.append(key, value);
   });
 
   try {
-    // 백엔드 FastAPI 서버의 /api/all-companies 엔드포인트를 호출합니다.
-    // (엔드포인트 이름이 all-companies 이므로 수정이 필요할 수 있습니다. 
-    //  우선은 all-companies로 가정하고 진행합니다.)
-    const response = await fetch(`${API_URL}/api/all-companies?${apiParams.toString()}`, {
+    // 백엔드 FastAPI 서버의 /api/screener 엔드포인트를 호출합니다.
+    // (market, theme, q, per_min/per_max 등 범위 조건, sort, columns, cursor, limit를 지원하고 요청한 페이지만 돌려줍니다.)
+    // 브라우저가 가진 ETag를 그대로 넘겨서, 바뀐 것이 없으면 백엔드가 본문 없이 304로 답하게 합니다.
+    const ifNoneMatch = request.headers.get('if-none-match');
+    const response = await fetch(`${API_URL}/api/screener?${apiParams.toString()}`, {
         method: 'GET',
         headers: {
             'Content-Type': 'application/json',
+            ...(ifNoneMatch ? { 'If-None-Match': ifNoneMatch } : {}),
         },
-        // Next.js 14 캐싱 전략 설정 (필요에 따라 조정)
+        // Next.js의 fetch 캐시 대신 ETag 재검증을 씁니다.
         cache: 'no-store', 
     });
 
+    const etag = response.headers.get('etag');
+    if (response.status === 304) {
+      return new NextResponse(null, { status: 304, headers: etag ? { ETag: etag } : {} });
+    }
+
     if (!response.ok) {
       const errorData = await response.json().catch(() => ({ error: "Unknown error from backend" }));
       console.error(`API Error from backend: ${response.status}`, errorData);
       return NextResponse.json(
-        { success: false, error: `백엔드 서버 오류: ${errorData.error || response.statusText}` },
+        { success: false, error: `백엔드 서버 오류: ${errorData.error || errorData.detail || response.statusText}` },
         { status: response.status }
       );
     }
@@ -39,7 +51,7 @@ export async function GET(request: NextRequest) {
     const data = await response.json();
 
     // 백엔드에서 받은 데이터를 그대로 클라이언트에 전달
-    return NextResponse.json(data);
+    return NextResponse.json(data, { headers: etag ? { ETag: etag } : {} });
 
   } catch (error) {
     console.error("API Route Error fetching from backend:", error);
@@ -0,0 +1,22 @@
+import { type NextRequest, NextResponse } from "next/server";
+
+// 백엔드 API 서버의 주소
+const API_URL = process.env.NEXT_PUBLIC_STOCK_API_URL;
+
+export async function GET(request: NextRequest) {
+  const { searchParams } = new URL(request.url);
+  const limit = searchParams.get('limit') || '20';
+  const sort = searchParams.get('sort') || 'desc';
+
+  try {
+    const response = await fetch(
+      `${API_URL}/api/themes/performance?limit=${encodeURIComponent(limit)}&sort=${encodeURIComponent(sort)}`,
+      { cache: 'no-store' }
+    );
+    const data = await response.json();
+    return NextResponse.json(data, { status: response.status });
+  } catch (error) {
+    console.error("API Route Error fetching theme performance:", error);
+    return NextResponse.json({ success: false, error: "테마별 등락률 조회 중 오류 발생" }, { status: 500 });
+  }
+}
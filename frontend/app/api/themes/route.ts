@@ -1,18 +1,23 @@
 import { NextResponse } from "next/server";
-import { db } from "@/lib/db";
+
+// 백엔드 API 서버의 주소
+const API_URL = process.env.NEXT_PUBLIC_STOCK_API_URL;
 
 export async function GET() {
-  const client = await db.connect();
   try {
-    // 'theme' 컬럼에서 NULL이 아니고 비어있지 않은 고유한 테마 목록을 조회합니다.
-    // 관련 없는 테마나 너무 긴 테마를 제외하기 위해 theme 컬럼의 길이를 제한할 수 있습니다.
-    const result = await client.query(
-      "SELECT DISTINCT theme FROM stocks WHERE theme IS NOT NULL AND theme != '' AND LENGTH(theme) < 50 ORDER BY theme ASC"
-    );
-    
-    // 데이터베이스에서 반환된 객체 배열에서 테마 이름만 추출하여 문자열 배열로 변환합니다.
-    const themes = result.rows.map((row: any) => row.theme);
-    
+    // 테마 목록은 stock_service가 themes 테이블에서 읽어 Redis에 캐시합니다. (테마 동기화 시 캐시 무효화)
+    const response = await fetch(`${API_URL}/api/themes`, { cache: 'no-store' });
+    const result = await response.json();
+    if (!response.ok || !result.success) {
+      return NextResponse.json(
+        { success: false, error: "테마 목록 조회 중 서버 오류 발생" },
+        { status: response.ok ? 500 : response.status }
+      );
+    }
+
+    // 기존 응답 형태대로 테마 이름만 문자열 배열로 돌려줍니다.
+    const themes = result.data.map((row: any) => row.name);
+
     return NextResponse.json({ success: true, data: themes });
   } catch (error) {
     console.error("API Error fetching themes:", error);
@@ -20,7 +25,5 @@ export async function GET() {
       { success: false, error: "테마 목록 조회 중 서버 오류 발생" },
       { status: 500 }
     );
-  } finally {
-    client.release();
   }
 }
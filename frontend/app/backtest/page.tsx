@@ -1,11 +1,20 @@
 'use client';
 
-import { useState } from 'react';
+import { useState, useRef, useEffect } from 'react';
 import { Button } from '@/components/ui/button';
 import { Input } from '@/components/ui/input';
 import { Card, CardContent, CardHeader, CardTitle } from "@/components/ui/card";
 import { DatePicker } from "@/components/ui/date-picker"; // Assuming you have this component
 
+interface BacktestResult {
+  stock_code: string;
+  params: { fast_ma: number; slow_ma: number };
+  final_value: number;
+  total_return: number;
+  sharpe: number | null;
+  max_drawdown: number;
+}
+
 export default function BacktestPage() {
   const [stockCode, setStockCode] = useState('005930');
   const [startDate, setStartDate] = useState<Date | undefined>(new Date('2022-01-01'));
@@ -13,10 +22,31 @@ export default function BacktestPage() {
   const [fastMa, setFastMa] = useState(10);
   const [slowMa, setSlowMa] = useState(50);
   const [isLoading, setIsLoading] = useState(false);
-  const [results, setResults] = useState(null);
+  const [results, setResults] = useState<BacktestResult[]>([]);
+  const [progress, setProgress] = useState<{ completed: number; total: number } | null>(null);
+  const pollRef = useRef<ReturnType<typeof setTimeout> | null>(null);
+
+  useEffect(() => () => { if (pollRef.current) clearTimeout(pollRef.current); }, []);
+
+  // 부분 결과를 offset 기반으로 이어 받습니다.
+  const pollResults = async (jobId: string, offset: number) => {
+    const response = await fetch(`/api/backtest/${jobId}?offset=${offset}`);
+    const { data } = await response.json();
+    if (data) {
+      setResults(prev => [...prev, ...data.results]);
+      setProgress({ completed: data.completed, total: data.total });
+      if (data.status === 'done' || data.status === 'failed') {
+        setIsLoading(false);
+        return;
+      }
+    }
+    pollRef.current = setTimeout(() => pollResults(jobId, data ? data.next_offset : offset), 1000);
+  };
 
   const handleRunBacktest = async () => {
     setIsLoading(true);
+    setResults([]);
+    setProgress(null);
     const response = await fetch('/api/backtest/run', {
       method: 'POST',
       headers: { 'Content-Type': 'application/json' },
@@ -28,8 +58,11 @@ export default function BacktestPage() {
       }),
     });
     const data = await response.json();
-    // Here you would typically poll for results
-    setIsLoading(false);
+    if (!data.success) {
+      setIsLoading(false);
+      return;
+    }
+    pollResults(data.job_id, 0);
   };
 
   return (
@@ -67,8 +100,27 @@ export default function BacktestPage() {
         <Card className="md:col-span-2">
           <CardHeader><CardTitle>결과</CardTitle></CardHeader>
           <CardContent>
-            {/* Results will be displayed here */}
-            <p>백테스트 결과가 여기에 표시됩니다.</p>
+            {progress && <p className="mb-4">진행률: {progress.completed} / {progress.total}</p>}
+            {results.length === 0 ? (
+              <p>백테스트 결과가 여기에 표시됩니다.</p>
+            ) : (
+              <table className="w-full text-sm">
+                <thead>
+                  <tr><th>종목</th><th>Fast/Slow</th><th>수익률</th><th>샤프</th><th>최대 낙폭</th></tr>
+                </thead>
+                <tbody>
+                  {results.map((r, i) => (
+                    <tr key={i}>
+                      <td>{r.stock_code}</td>
+                      <td>{r.params.fast_ma}/{r.params.slow_ma}</td>
+                      <td>{(r.total_return * 100).toFixed(2)}%</td>
+                      <td>{r.sharpe != null ? r.sharpe.toFixed(2) : '-'}</td>
+                      <td>{(r.max_drawdown * 100).toFixed(2)}%</td>
+                    </tr>
+                  ))}
+                </tbody>
+              </table>
+            )}
           </CardContent>
         </Card>
       </div>
@@ -5,6 +5,7 @@ import { useParams } from 'next/navigation';
 import { Card, CardContent, CardHeader, CardTitle } from "@/components/ui/card";
 import { Table, TableBody, TableCell, TableHead, TableHeader, TableRow } from "@/components/ui/table";
 import { Loader2 } from 'lucide-react';
+import IntradayCandleChart from '@/components/intraday-candle-chart';
 
 interface StockDetails {
   name: string;
@@ -69,6 +70,15 @@ export default function StockDetailPage() {
       <h1 className="text-3xl font-bold mb-2">{details?.name} ({details?.code})</h1>
       <p className="text-xl text-slate-400 mb-8">현재가: {details?.price?.toLocaleString()}원</p>
 
+      <Card className="mb-8">
+        <CardHeader>
+          <CardTitle>장중 분봉</CardTitle>
+        </CardHeader>
+        <CardContent>
+          <IntradayCandleChart code={code} />
+        </CardContent>
+      </Card>
+
       <Card>
         <CardHeader>
           <CardTitle>재무 정보</CardTitle>
@@ -1,26 +1,62 @@
 "use client"
 
-import { BarChart, Bar, XAxis, YAxis, CartesianGrid, Tooltip, Legend, ResponsiveContainer } from 'recharts';
+import { useEffect, useState } from 'react';
+import { BarChart, Bar, XAxis, YAxis, CartesianGrid, Tooltip, Legend, ResponsiveContainer, Cell } from 'recharts';
 import { Card, CardContent, CardHeader, CardTitle } from "@/components/ui/card"
 
-const sectorData = [
-  { name: '반도체', '1개월 수익률': 18.1, '3개월 수익률': 25.5 },
-  { name: '2차전지', '1개월 수익률': -5.2, '3개월 수익률': -8.9 },
-  { name: '바이오', '1개월 수익률': 12.7, '3개월 수익률': 15.3 },
-  { name: '자동차', '1개월 수익률': 8.5, '3개월 수익률': 11.2 },
-  { name: '금융', '1개월 수익률': 3.1, '3개월 수익률': 5.8 },
-];
+interface ThemePerformance {
+  id: number;
+  name: string;
+  avgChangeRate: number;
+  stockCount: number;
+  upCount: number;
+  downCount: number;
+}
+
+const REFRESH_INTERVAL_MS = 5000;
+
+export default function SectorPerformanceChart({ limit = 10 }: { limit?: number }) {
+  const [themes, setThemes] = useState<ThemePerformance[]>([]);
+  const [error, setError] = useState<string | null>(null);
+
+  useEffect(() => {
+    let cancelled = false;
+    // 서버가 틱마다 테마별 합계를 갱신해 두므로, 여기서는 상위 테마만 주기적으로 받아 옵니다.
+    const fetchPerformance = async () => {
+      try {
+        const response = await fetch(`/api/themes/performance?limit=${limit}&sort=desc`);
+        const result = await response.json();
+        if (cancelled) return;
+        if (result.success) {
+          setThemes(result.data);
+          setError(null);
+        } else {
+          setError(result.error || "테마별 등락률을 불러오지 못했습니다.");
+        }
+      } catch (e) {
+        if (!cancelled) setError("테마별 등락률을 불러오지 못했습니다.");
+      }
+    };
+    fetchPerformance();
+    const timer = setInterval(fetchPerformance, REFRESH_INTERVAL_MS);
+    return () => {
+      cancelled = true;
+      clearInterval(timer);
+    };
+  }, [limit]);
+
+  const chartData = themes.map((theme) => ({ ...theme, '평균 등락률': theme.avgChangeRate }));
 
-export default function SectorPerformanceChart() {
   return (
     <Card className="bg-[#1a1a1a] border border-[#333333] text-white rounded-lg shadow-lg">
       <CardHeader className="p-6">
-        <CardTitle className="text-2xl font-bold text-white mb-2 border-b border-blue-600 pb-2">섹터별 수익률 비교</CardTitle>
+        <CardTitle className="text-2xl font-bold text-white mb-2 border-b border-blue-600 pb-2">테마별 실시간 등락률</CardTitle>
       </CardHeader>
       <CardContent className="p-6 pt-0">
+        {error && <p className="text-sm text-red-400 mb-2">{error}</p>}
         <div className="h-[400px] w-full">
           <ResponsiveContainer width="100%" height="100%">
-            <BarChart data={sectorData} margin={{ top: 20, right: 30, left: 0, bottom: 5 }}>
+            <BarChart data={chartData} margin={{ top: 20, right: 30, left: 0, bottom: 5 }}>
               <CartesianGrid strokeDasharray="3 3" stroke="#333333" />
               <XAxis dataKey="name" stroke="#e0e0e0" tick={{ fill: '#e0e0e0' }} />
               <YAxis stroke="#e0e0e0" label={{ value: '%', position: 'insideTopLeft', offset: -10, fill: '#e0e0e0' }} tick={{ fill: '#e0e0e0' }}/>
@@ -29,18 +65,23 @@ export default function SectorPerformanceChart() {
                 contentStyle={{ backgroundColor: '#2a2a2a', border: '1px solid #444444', borderRadius: '5px' }}
                 labelStyle={{ color: '#e2e8f0', fontWeight: 'bold' }}
                 itemStyle={{ color: '#e2e8f0' }}
-                formatter={(value: number) => `${value.toFixed(1)}%`}
+                formatter={(value: number, _name: string, item: any) =>
+                  `${value.toFixed(2)}% (상승 ${item.payload.upCount} / 하락 ${item.payload.downCount} / ${item.payload.stockCount}종목)`
+                }
               />
               <Legend
                 wrapperStyle={{ color: '#e2e8f0', paddingTop: '10px' }}
                 iconType="circle"
               />
-              <Bar dataKey="1개월 수익률" fill="#3b82f6" barSize={30} radius={[5, 5, 0, 0]} />
-              <Bar dataKey="3개월 수익률" fill="#10b981" barSize={30} radius={[5, 5, 0, 0]} />
+              <Bar dataKey="평균 등락률" fill="#3b82f6" barSize={30} radius={[5, 5, 0, 0]}>
+                {chartData.map((theme) => (
+                  <Cell key={theme.id} fill={theme.avgChangeRate >= 0 ? '#ef4444' : '#3b82f6'} />
+                ))}
+              </Bar>
             </BarChart>
           </ResponsiveContainer>
         </div>
       </CardContent>
     </Card>
   );
-}
\ No newline at end of file
+}
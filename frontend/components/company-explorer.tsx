@@ -5,6 +5,7 @@ import { useDebounce } from 'use-debounce';
 import { Input } from '@/components/ui/input';
 import { Tabs, TabsList, TabsTrigger } from "@/components/ui/tabs";
 import { StockInfo } from '@/lib/types';
+import { TICK_SUBPROTOCOL, decodeTicks } from '@/lib/tick-codec';
 import { useVirtualizer } from '@tanstack/react-virtual';
 import { Loader2, AlertTriangle, ArrowUp, ArrowDown, ChevronsUpDown } from 'lucide-react';
 
@@ -88,6 +89,18 @@ export default function CompanyExplorer() {
   const [fetchError, setFetchError] = useState(false);
 
   const socketRef = useRef<WebSocket | null>(null);
+  // 화면에 보이는 종목만 실시간 구독합니다. 소켓이 열릴 때도 이 값을 보냅니다.
+  const visibleCodesRef = useRef<string[]>([]);
+  // 소켓으로 받은 최신 시세. /api/all-companies 응답보다 먼저 도착해도 버리지 않고 목록에 덮어씁니다.
+  const latestQuotesRef = useRef(new Map<string, { price: number; change_rate: number }>());
+  const seqRef = useRef(0);
+
+  const sendSubscriptions = (codes: string[]) => {
+    const socket = socketRef.current;
+    if (socket && socket.readyState === WebSocket.OPEN) {
+      socket.send(JSON.stringify({ action: 'set', codes }));
+    }
+  };
 
   useEffect(() => {
     const fetchInitialData = async () => {
@@ -101,7 +114,11 @@ export default function CompanyExplorer() {
         const result = await response.json();
         // The JSON file is an array of stock objects directly
         if (Array.isArray(result)) {
-          setStocks(result);
+          const latest = latestQuotesRef.current;
+          setStocks(result.map((stock: StockInfo) => {
+            const quote = latest.get(stock.code);
+            return quote ? { ...stock, currentPrice: quote.price, change_rate: quote.change_rate } : stock;
+          }));
         } else {
           setFetchError(true);
         }
@@ -120,24 +137,58 @@ export default function CompanyExplorer() {
       console.log("Market is open. Attempting WebSocket connection...");
       if (!socketRef.current || socketRef.current.readyState === WebSocket.CLOSED) {
         const wsUrl = process.env.NEXT_PUBLIC_STOCK_API_URL?.replace(/^http/, 'ws');
-        const socket = new WebSocket(`${wsUrl}/ws/realtime-price`);
+        // 서버가 바이너리 틱 서브프로토콜을 지원하면 그걸 쓰고, 아니면 JSON 메시지를 받습니다.
+        const socket = new WebSocket(`${wsUrl}/ws/realtime-price`, [TICK_SUBPROTOCOL]);
+        socket.binaryType = 'arraybuffer';
         socketRef.current = socket;
 
         socket.onopen = () => {
           console.log("CompanyExplorer: WebSocket connection successful");
+          sendSubscriptions(visibleCodesRef.current);
+        };
+
+        const applyPrices = (updates: Map<string, { price: number; change_rate: number }>) => {
+          updates.forEach((quote, code) => latestQuotesRef.current.set(code, quote));
+          setStocks(prevStocks =>
+            prevStocks.map(stock => {
+              const update = updates.get(stock.code);
+              return update ? { ...stock, currentPrice: update.price, change_rate: update.change_rate } : stock;
+            })
+          );
+        };
+
+        // 서버는 연결 직후와 구독 종목이 늘 때 스냅샷을 보내고, 이후 메시지(바이너리는 프레임마다)의 seq를 1씩 올립니다.
+        // seq가 건너뛰면 구독 종목 스냅샷을 다시 요청합니다.
+        const checkSeq = (seq: number) => {
+          if (seqRef.current && seq !== seqRef.current + 1) {
+            socket.send(JSON.stringify({ action: 'resync' }));
+          }
+          seqRef.current = seq;
         };
 
         socket.onmessage = (event) => {
           try {
+            if (event.data instanceof ArrayBuffer) {
+              const updates = new Map<string, { price: number; change_rate: number }>();
+              const ticks = decodeTicks(event.data);
+              for (const tick of ticks) {
+                updates.set(tick.code, { price: tick.price, change_rate: tick.changeRate });
+              }
+              seqRef.current += ticks.length; // 바이너리 프레임은 같은 연결에서 순서대로 오므로 개수만큼 seq가 이어집니다.
+              applyPrices(updates);
+              return;
+            }
             const data = JSON.parse(event.data);
-            if (data.type === 'realtime-price') {
-              setStocks(prevStocks =>
-                prevStocks.map(stock =>
-                  stock.code === data.code
-                    ? { ...stock, currentPrice: data.price, change_rate: data.change_rate }
-                    : stock
-                )
-              );
+            if (data.type === 'snapshot') {
+              seqRef.current = data.seq;
+              const updates = new Map<string, { price: number; change_rate: number }>();
+              for (const [code, price, , , changeRate] of data.quotes as [string, number, number, number, number][]) {
+                updates.set(code, { price, change_rate: changeRate });
+              }
+              applyPrices(updates);
+            } else if (data.type === 'realtime-price') {
+              checkSeq(data.seq);
+              applyPrices(new Map([[data.code, { price: data.price, change_rate: data.change_rate }]]));
             }
           } catch (e) {
             console.error('CompanyExplorer: Error processing WebSocket message:', e);
@@ -151,6 +202,7 @@ export default function CompanyExplorer() {
         socket.onclose = (event) => {
           console.log('CompanyExplorer: WebSocket connection closed:', event.reason);
           socketRef.current = null; // Allow reconnection
+          seqRef.current = 0;
         };
       }
     } else {
@@ -208,6 +260,17 @@ export default function CompanyExplorer() {
     overscan: 10,
   });
 
+  const visibleCodes = rowVirtualizer.getVirtualItems()
+    .map(item => sortedAndFilteredCompanies[item.index]?.code)
+    .filter(Boolean)
+    .join(',');
+  const [debouncedVisibleCodes] = useDebounce(visibleCodes, 500);
+
+  useEffect(() => {
+    visibleCodesRef.current = debouncedVisibleCodes ? debouncedVisibleCodes.split(',') : [];
+    sendSubscriptions(visibleCodesRef.current);
+  }, [debouncedVisibleCodes]);
+
   const renderContent = () => {
     if (isLoading) {
       return <div className="flex items-center justify-center h-48"><Loader2 className="animate-spin text-slate-400" size={32} /></div>;
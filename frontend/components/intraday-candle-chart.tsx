@@ -0,0 +1,79 @@
+'use client';
+
+import { useEffect, useState } from 'react';
+import { Tabs, TabsList, TabsTrigger } from "@/components/ui/tabs";
+
+interface Candle {
+  time: number;
+  open: number;
+  high: number;
+  low: number;
+  close: number;
+  volume: number;
+}
+
+const INTERVALS = ['1m', '5m', '15m'] as const;
+const WIDTH = 720;
+const HEIGHT = 240;
+
+export default function IntradayCandleChart({ code }: { code: string }) {
+  const [timeframe, setTimeframe] = useState<(typeof INTERVALS)[number]>('1m');
+  const [candles, setCandles] = useState<Candle[]>([]);
+
+  useEffect(() => {
+    let cancelled = false;
+    const load = async () => {
+      try {
+        const response = await fetch(`/api/stocks/candles?code=${code}&interval=${timeframe}&limit=120`);
+        const result = await response.json();
+        if (!cancelled && result.success) setCandles(result.data);
+      } catch (error) {
+        console.error('Failed to fetch intraday candles:', error);
+      }
+    };
+    load();
+    // 진행 중인 봉이 계속 바뀌므로 주기적으로 다시 가져옵니다.
+    const timer = setInterval(load, 5000);
+    return () => {
+      cancelled = true;
+      clearInterval(timer);
+    };
+  }, [code, timeframe]);
+
+  const high = Math.max(...candles.map(c => c.high));
+  const low = Math.min(...candles.map(c => c.low));
+  const y = (price: number) => (high === low ? HEIGHT / 2 : ((high - price) / (high - low)) * (HEIGHT - 10) + 5);
+  const step = candles.length ? WIDTH / candles.length : WIDTH;
+
+  return (
+    <div>
+      <Tabs value={timeframe} onValueChange={value => setTimeframe(value as (typeof INTERVALS)[number])} className="mb-4">
+        <TabsList>
+          {INTERVALS.map(name => <TabsTrigger key={name} value={name}>{name}</TabsTrigger>)}
+        </TabsList>
+      </Tabs>
+      {candles.length === 0 ? (
+        <p className="text-slate-400">장중 분봉 데이터가 없습니다.</p>
+      ) : (
+        <svg viewBox={`0 0 ${WIDTH} ${HEIGHT}`} className="w-full h-60">
+          {candles.map((c, i) => {
+            const x = i * step + step / 2;
+            const color = c.close >= c.open ? '#f87171' : '#60a5fa';
+            return (
+              <g key={c.time}>
+                <line x1={x} x2={x} y1={y(c.high)} y2={y(c.low)} stroke={color} />
+                <rect
+                  x={x - step * 0.35}
+                  width={step * 0.7}
+                  y={Math.min(y(c.open), y(c.close))}
+                  height={Math.max(1, Math.abs(y(c.open) - y(c.close)))}
+                  fill={color}
+                />
+              </g>
+            );
+          })}
+        </svg>
+      )}
+    </div>
+  );
+}
@@ -133,6 +133,7 @@ export default function RealTimeNews() {
   const [fetchError, setFetchError] = useState(false);
 
   const newsSocketRef = useRef<WebSocket | null>(null);
+  const newsCursorRef = useRef<string | null>(null);
 
   useEffect(() => {
     const fetchNews = async () => {
@@ -163,10 +164,15 @@ export default function RealTimeNews() {
 
     const intervalId = setInterval(fetchNews, 120000); // Refresh every 120 seconds
 
-    // WebSocket for real-time news updates
-    if (!newsSocketRef.current || newsSocketRef.current.readyState === WebSocket.CLOSED) {
+    // WebSocket for real-time news updates.
+    // The server replays everything after `cursor` on reconnect, so we only receive what we missed.
+    let reconnectTimer: ReturnType<typeof setTimeout> | null = null;
+    let unmounted = false;
+
+    const connect = () => {
       const wsUrl = process.env.NEXT_PUBLIC_BACKEND_API_URL?.replace(/^http/, 'ws');
-      const socket = new WebSocket(`${wsUrl}/ws/realtime-news`);
+      const cursor = newsCursorRef.current;
+      const socket = new WebSocket(`${wsUrl}/ws/realtime-news${cursor ? `?cursor=${encodeURIComponent(cursor)}` : ''}`);
       newsSocketRef.current = socket;
 
       socket.onopen = () => {
@@ -175,9 +181,17 @@ export default function RealTimeNews() {
 
       socket.onmessage = (event) => {
         try {
-          const data = JSON.parse(event.data);
-          // Assuming the WebSocket sends individual news items
-          setNews(prevNews => [data, ...prevNews]);
+          const message = JSON.parse(event.data);
+          if (message.type === 'hello') {
+            newsCursorRef.current = message.cursor;
+          } else if (message.type === 'reset') {
+            // Our cursor fell out of the server's replay window; reload the list over REST.
+            fetchNews();
+          } else if (message.type === 'news') {
+            newsCursorRef.current = message.cursor;
+            const item: NewsItem = message.data;
+            setNews(prevNews => prevNews.some(n => n.url === item.url) ? prevNews : [item, ...prevNews]);
+          }
         } catch (e) {
           console.error('RealTimeNews: Error processing WebSocket message:', e);
         }
@@ -189,12 +203,19 @@ export default function RealTimeNews() {
 
       socket.onclose = (event) => {
         console.log('RealTimeNews: WebSocket connection closed:', event.reason);
-        newsSocketRef.current = null; // Allow reconnection
+        newsSocketRef.current = null;
+        if (!unmounted) {
+          reconnectTimer = setTimeout(connect, 3000);
+        }
       };
-    }
+    };
+
+    connect();
 
     return () => {
+      unmounted = true;
       clearInterval(intervalId); // Clean up the interval on component unmount
+      if (reconnectTimer) clearTimeout(reconnectTimer);
       if (newsSocketRef.current && newsSocketRef.current.readyState === WebSocket.OPEN) {
         newsSocketRef.current.close();
       }
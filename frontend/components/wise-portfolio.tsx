@@ -1,6 +1,6 @@
 'use client';
 
-import React, { useState, useMemo, useEffect } from 'react';
+import React, { useState, useMemo, useRef } from 'react';
 import { motion } from 'framer-motion';
 import { Card, CardContent, CardHeader, CardTitle, CardDescription } from "@/components/ui/card";
 import { Slider } from "@/components/ui/slider";
@@ -80,6 +80,47 @@ const calculateScores = (stock: StockInfo): { stabilityScore: number; growthScor
   return { stabilityScore, growthScore };
 };
 
+// 점수 계산에 쓰는 컬럼만 시가총액 순으로 받아 옵니다.
+const SCREENER_COLUMNS = 'code,name,market,currentPrice,change_rate,volume,market_cap';
+const KOSDAQ_TECH_KEYWORDS = ['IT', '소프트', 'AI'];
+
+// 성향별 후보 종목 조회 조건. 시장/종목명/시가총액 조건은 /api/screener에서 걸러 받고,
+// 조건이 없는 성향은 시가총액 상위 종목 안에서 점수를 매깁니다.
+const screenerQueries = (level: number): string[] => {
+  switch (level) {
+    case 3:
+      // KOSPI 안정성 점수는 시가총액 순과 같으므로 상위 3개만 받으면 됩니다.
+      return [
+        'market=KOSPI&limit=3',
+        ...KOSDAQ_TECH_KEYWORDS.map(keyword => `market=KOSDAQ&q=${encodeURIComponent(keyword)}&limit=2000`),
+      ];
+    case 7:
+      return ['market_cap_max=2000&limit=2000'];
+    default:
+      return ['limit=1500'];
+  }
+};
+
+const fetchCandidates = async (queries: string[]): Promise<StockInfo[]> => {
+  const results = await Promise.all(queries.map(async query => {
+    const response = await fetch(
+      `${process.env.NEXT_PUBLIC_STOCK_API_URL}/api/screener?${query}&sort=-market_cap&columns=${SCREENER_COLUMNS}`
+    );
+    if (!response.ok) {
+      throw new Error(`HTTP error! status: ${response.status}`);
+    }
+    const result = await response.json();
+    if (!result.success || !Array.isArray(result.data)) {
+      throw new Error('Unexpected screener response');
+    }
+    return result.data as StockInfo[];
+  }));
+  // 여러 조건의 결과를 합칠 때 겹치는 종목을 빼고 시가총액 순서를 다시 맞춥니다.
+  const byCode = new Map<string, StockInfo>();
+  results.flat().forEach(stock => byCode.set(stock.code, stock));
+  return Array.from(byCode.values()).sort((a, b) => (b.market_cap || 0) - (a.market_cap || 0));
+};
+
 const generateRecommendations = (level: number, stocks: StockInfo[]): RecommendedStock[] => {
   if (!stocks || stocks.length === 0) return [];
 
@@ -100,6 +141,7 @@ const generateRecommendations = (level: number, stocks: StockInfo[]): Recommende
       recommendations = scoredStocks.map(s => ({...s, finalScore: s.stabilityScore * 0.7 + s.growthScore * 0.3})).sort((a, b) => b.finalScore - a.finalScore);
       break;
     case 3:
+      // 서버 검색(q)은 대소문자를 구분하지 않으므로 종목명 조건은 여기서 한 번 더 확인합니다.
       const kospiGiants = scoredStocks.filter(s => s.market === 'KOSPI').sort((a, b) => b.stabilityScore - a.stabilityScore).slice(0, 3);
       const kosdaqTech = scoredStocks.filter(s => s.market === 'KOSDAQ' && (s.name.includes('IT') || s.name.includes('소프트') || s.name.includes('AI'))).sort((a, b) => b.growthScore - a.growthScore).slice(0, 2);
       recommendations = [...kospiGiants, ...kosdaqTech];
@@ -114,6 +156,7 @@ const generateRecommendations = (level: number, stocks: StockInfo[]): Recommende
       recommendations = scoredStocks.map(s => ({...s, finalScore: s.growthScore + (s.volume / 100000)})).sort((a, b) => b.finalScore - a.finalScore);
       break;
     case 7:
+      // market_cap_max는 경계값을 포함하므로 미만 조건은 여기서 한 번 더 확인합니다.
       recommendations = scoredStocks.filter(s => s.market_cap < 2000).sort((a, b) => b.growthScore - a.growthScore);
       break;
     default:
@@ -131,41 +174,34 @@ export default function WisePortfolio() {
   const [recommendedStocks, setRecommendedStocks] = useState<RecommendedStock[] | null>(null);
   const { toast } = useToast();
 
-  const [stocks, setStocks] = useState<StockInfo[]>([]);
-  const [isLoading, setIsLoading] = useState(true);
-  const [fetchError, setFetchError] = useState(false);
-
-  useEffect(() => {
-    const fetchInitialData = async () => {
-      setIsLoading(true);
-      setFetchError(false);
-      try {
-        const response = await fetch(`${process.env.NEXT_PUBLIC_STOCK_API_URL}/api/all-companies?limit=1500`);
-        if (!response.ok) {
-          throw new Error(`HTTP error! status: ${response.status}`);
-        }
-        const result = await response.json();
-        if (result.success && Array.isArray(result.data)) {
-          setStocks(result.data);
-        } else {
-          setFetchError(true);
-        }
-      } catch (error) {
-        console.error("Failed to fetch initial stock data for WisePortfolio:", error);
-        setFetchError(true);
-      } finally {
-        setIsLoading(false);
-      }
-    };
-
-    fetchInitialData();
-  }, []);
+  // 후보 종목은 조회 조건별로 처음 한 번만 받아 오고 이후에는 재사용합니다.
+  const candidatesRef = useRef<Record<string, StockInfo[]>>({});
+  const [isLoading, setIsLoading] = useState(false);
 
   const currentProfile = useMemo(() => portfolioStrategies[riskTolerance[0] - 1], [riskTolerance]);
 
-  const handleRecommendPortfolio = () => {
+  const handleRecommendPortfolio = async () => {
+    const level = currentProfile.level;
+    const queries = screenerQueries(level);
+    const cacheKey = queries.join('|');
+    setIsLoading(true);
+    try {
+      if (!candidatesRef.current[cacheKey]) {
+        candidatesRef.current[cacheKey] = await fetchCandidates(queries);
+      }
+    } catch (error) {
+      console.error("Failed to fetch stock data for WisePortfolio:", error);
+      toast({
+        title: "종목 정보를 불러오지 못했습니다",
+        description: "잠시 후 다시 시도해주세요.",
+        variant: "destructive",
+      });
+      return;
+    } finally {
+      setIsLoading(false);
+    }
     setSelectedStrategy(currentProfile);
-    const recommendations = generateRecommendations(currentProfile.level, stocks);
+    const recommendations = generateRecommendations(level, candidatesRef.current[cacheKey]);
     setRecommendedStocks(recommendations);
     toast({
       title: "투자 전략 및 포트폴리오 생성 완료",
@@ -197,7 +233,7 @@ export default function WisePortfolio() {
               <Slider value={riskTolerance} onValueChange={setRiskTolerance} min={1} max={7} step={1} className="[&>span:first-child]:bg-indigo-600" />
               <div className="flex justify-between text-xs text-slate-500 mt-2"><span>매우 안정</span><span>중립</span><span>매우 공격</span></div>
             </div>
-            <Button onClick={handleRecommendPortfolio} className="w-full max-w-xs bg-indigo-600 hover:bg-indigo-700 text-white font-semibold group">투자 전략 가이드 보기<Gem className="ml-2 h-4 w-4 group-hover:animate-pulse" /></Button>
+            <Button onClick={handleRecommendPortfolio} disabled={isLoading} className="w-full max-w-xs bg-indigo-600 hover:bg-indigo-700 text-white font-semibold group">투자 전략 가이드 보기<Gem className="ml-2 h-4 w-4 group-hover:animate-pulse" /></Button>
           </CardContent>
         </Card>
 
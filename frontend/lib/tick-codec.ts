@@ -0,0 +1,29 @@
+// backend/services/tick_codec.py 와 같은 고정 길이 틱 프레임 (little-endian, 21바이트)
+// B 버전 | 6s 종목코드 | i 현재가 | i 전일대비 | i 체결량 | h 등락률(0.01% 단위)
+export const TICK_SUBPROTOCOL = 'tick.bin.v1';
+const TICK_FRAME_VERSION = 1;
+const TICK_SIZE = 21;
+
+export interface Tick {
+  code: string;
+  price: number;
+  change: number;
+  volume: number;
+  changeRate: number;
+}
+
+export function decodeTicks(buffer: ArrayBuffer): Tick[] {
+  const view = new DataView(buffer);
+  const ticks: Tick[] = [];
+  for (let offset = 0; offset + TICK_SIZE <= buffer.byteLength; offset += TICK_SIZE) {
+    if (view.getUint8(offset) !== TICK_FRAME_VERSION) break;
+    ticks.push({
+      code: String.fromCharCode(...new Uint8Array(buffer, offset + 1, 6)),
+      price: view.getInt32(offset + 7, true),
+      change: view.getInt32(offset + 11, true),
+      volume: view.getInt32(offset + 15, true),
+      changeRate: view.getInt16(offset + 19, true) / 100,
+    });
+  }
+  return ticks;
+}